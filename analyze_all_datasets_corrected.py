@@ -1,207 +1,388 @@
 #!/usr/bin/env python3
 """
 Script para análise completa com correções aplicadas nos três datasets
+Processamento em streaming: cada CSV é lido em blocos, classificado em lotes
+e os resultados são anexados aos arquivos de saída a cada bloco (memória
+limitada ao tamanho do bloco, e o que já foi gravado sobrevive a uma falha)
+
+Modo incremental (--incremental): resultados ficam numa tabela persistente
+por id + hash do texto + versão do pipeline, e só comentários novos ou
+alterados são classificados
 """
 
 import pandas as pd
 import os
+import argparse
+from collections import Counter
 from datetime import datetime
-from app_space_version import predict_hate_speech
+from app_space_version import (
+    predict_hate_speech, predict_hate_speech_batch, get_rule_guard_stats
+)
+from dedup_inference import DedupClassifier, text_hash
+from results_store import ResultsStore, pipeline_version
+from results_io import ResultsParquetWriter
+from report_aggregates import load_or_build_summary, summary_path
+from run_manifest import latest_artifact, register_artifact
 
-def analyze_all_datasets():
-    """Analisa todos os três datasets com as correções aplicadas"""
-    
-    # Arquivos para análise
-    datasets = {
-        'Instagram': 'clean-annotated-data/export_1757023553205_limpa.csv',
-        'TikTok': 'clean-annotated-data/tiktok_consolidado_limpo_20251016_181651.csv',
-        'YouTube': 'clean-annotated-data/youtube_limpo_20251016_181656.csv'
-    }
-    
-    # Colunas de texto para cada dataset
-    text_columns = {
-        'Instagram': 'Comment Text',
-        'TikTok': 'text',
-        'YouTube': 'text'
+CHUNK_SIZE = 5000  # Linhas lidas por bloco de cada CSV
+
+# Arquivos para análise
+DATASETS = {
+    'Instagram': 'clean-annotated-data/export_1757023553205_limpa.csv',
+    'TikTok': 'clean-annotated-data/tiktok_consolidado_limpo_20251016_181651.csv',
+    'YouTube': 'clean-annotated-data/youtube_limpo_20251016_181656.csv'
+}
+
+# Datasets limpos registrados no manifesto (a versão mais recente substitui o caminho fixo)
+DATASET_KINDS = {
+    'TikTok': 'tiktok_consolidado_limpo',
+    'YouTube': 'youtube_limpo'
+}
+
+# Colunas de texto para cada dataset
+TEXT_COLUMNS = {
+    'Instagram': 'Comment Text',
+    'TikTok': 'text',
+    'YouTube': 'text'
+}
+
+# Separador de cada dataset
+SEPARATORS = {
+    'Instagram': ';',
+    'TikTok': ',',
+    'YouTube': ','
+}
+
+# Colunas específicas de cada plataforma (coluna de saída -> coluna de origem)
+PLATFORM_COLUMNS = {
+    'Instagram': {
+        'author_handle': 'Author Handle',
+        'like_count': 'Like Count',
+        'timestamp': 'Timestamp'
+    },
+    'TikTok': {
+        'author_handle': 'author_handle',
+        'like_count_visible': 'like_count_visible',
+        'timestamp_visible': 'timestamp_visible',
+        'video_id': 'video_id',
+        'near_dup_cluster': 'near_dup_cluster',
+        'near_dup_size': 'near_dup_size',
+        'near_dup_similarity': 'near_dup_similarity'
+    },
+    'YouTube': {
+        'titulo_video': 'titulo_video',
+        'data': 'data',
+        'likes_comentario': 'likes_comentario',
+        'autor_handle': 'autor_handle'
     }
-    
+}
+
+BASE_COLUMNS = [
+    'platform', 'id', 'text', 'text_length', 'text_features', 'predicted_label',
+    'method', 'specialized_class', 'confidence', 'hate_probability'
+]
+
+def consolidated_columns():
+    """Colunas do relatório consolidado (base + específicas, na ordem das plataformas)"""
+    columns = list(BASE_COLUMNS)
+    for mapping in PLATFORM_COLUMNS.values():
+        columns.extend(column for column in mapping if column not in columns)
+    return columns
+
+def classify_texts(texts):
+    """Classifica um lote; se o lote falhar, classifica texto a texto"""
+    try:
+        return predict_hate_speech_batch(texts)
+    except Exception as e:
+        print(f"⚠️  Erro no lote, processando texto a texto: {str(e)}")
+
+    results = []
+    for text in texts:
+        try:
+            results.append(predict_hate_speech(text))
+        except Exception as e:
+            print(f"⚠️  Erro ao processar comentário: {str(e)}")
+            results.append(None)
+    return results
+
+def resolve_datasets():
+    """Caminho de cada dataset: último arquivo limpo registrado no manifesto ou o fixo"""
+    datasets = dict(DATASETS)
+    for platform, kind in DATASET_KINDS.items():
+        registered = latest_artifact(kind, platform=platform, directory=None, formats=('.csv',))
+        if registered:
+            datasets[platform] = registered
+    return datasets
+
+def classify_incremental(platform, ids, texts, classify, store, version, stats):
+    """Reaproveita resultados válidos da tabela e classifica só o restante"""
+    keys = [str(comment_id) for comment_id in ids]
+    hashes = [text_hash(text) for text in texts]
+    stored = store.lookup(platform, keys, hashes, version)
+
+    missing = [i for i, key in enumerate(zip(keys, hashes)) if key not in stored]
+    new_predictions = classify([texts[i] for i in missing]) if missing else []
+
+    predictions = [stored.get(key) for key in zip(keys, hashes)]
+    for i, prediction in zip(missing, new_predictions):
+        predictions[i] = prediction
+
+    # Erros não entram na tabela (serão tentados de novo na próxima execução)
+    store.upsert(platform, [
+        (keys[i], hashes[i], prediction)
+        for i, prediction in zip(missing, new_predictions) if prediction is not None
+    ], version)
+
+    stats['reused'] += len(texts) - len(missing)
+    stats['classified'] += len(missing)
+    return predictions
+
+def update_cluster_signal(result_chunk, stats):
+    """Acumula os clusters de quase-duplicatas (sinal de campanha coordenada)
+
+    Os clusters são só um sinal: variações diferem em emojis, menções ou
+    palavras às quais as regras e o modelo reagem, então cada linha é
+    classificada por si (duplicatas exatas já são reaproveitadas pelo
+    DedupClassifier). stats['hate_by_cluster'] conta linhas HATE por cluster.
+    """
+    if 'near_dup_cluster' not in result_chunk.columns:
+        return
+    sizes = pd.to_numeric(result_chunk['near_dup_size'], errors='coerce')
+    clustered = result_chunk[sizes > 1]
+    stats['rows'] += len(clustered)
+    hate = clustered[clustered['predicted_label'] == 'HATE']
+    stats['hate_rows'] += len(hate)
+    stats['hate_by_cluster'].update(hate['near_dup_cluster'].tolist())
+
+def build_result_chunk(platform, chunk, text_col, classifier=None, store=None, version=None, incremental_stats=None):
+    """Classifica um bloco do CSV e monta o DataFrame de resultados"""
+    texts = [str(text) for text in chunk[text_col]]
+    ids = chunk['id'] if 'id' in chunk.columns else chunk.index.to_series() + 1
+    classify = classifier.classify if classifier else classify_texts
+
+    if store is not None:
+        predictions = classify_incremental(platform, ids.tolist(), texts, classify, store, version, incremental_stats)
+    else:
+        predictions = classify(texts)
+
+    result_chunk = pd.DataFrame({
+        'platform': platform,
+        'id': ids.to_numpy(),
+        'text': texts,
+        'text_length': [len(text) for text in texts],
+        'text_features': [
+            f"Length: {len(text)}, Words: {len(text.split())}, Has_emoji: {'emoji' in text.lower()}"
+            for text in texts
+        ],
+        'predicted_label': [
+            'ERRO' if p is None else ('HATE' if p['is_hate'] else 'NÃO-HATE') for p in predictions
+        ],
+        'method': ['error' if p is None else p['method'] for p in predictions],
+        'specialized_class': ['N/A' if p is None else p['specialized_class'] for p in predictions],
+        'confidence': [0.0 if p is None else p['confidence'] for p in predictions],
+        'hate_probability': [0.0 if p is None else p['hate_probability'] for p in predictions]
+    })
+
+    # Adicionar colunas específicas de cada plataforma
+    for output_column, source_column in PLATFORM_COLUMNS[platform].items():
+        if source_column in chunk.columns:
+            result_chunk[output_column] = chunk[source_column].to_numpy()
+        else:
+            result_chunk[output_column] = ''
+
+    return result_chunk
+
+def append_csv(df, file_path, columns=None):
+    """Anexa um bloco ao CSV (cabeçalho só na criação do arquivo)"""
+    if columns is not None:
+        df = df.reindex(columns=columns)
+    write_header = not os.path.exists(file_path)
+    df.to_csv(file_path, mode='a', header=write_header, index=False, encoding='utf-8')
+
+def analyze_all_datasets(chunk_size=CHUNK_SIZE, incremental=False):
+    """Analisa todos os três datasets com as correções aplicadas"""
+
     print("🚀 ANÁLISE COMPLETA COM CORREÇÕES APLICADAS")
     print("=" * 60)
-    
-    all_results = []
-    
+
+    os.makedirs('out', exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    consolidated_file = f"out/ANALISE_CONSOLIDADA_CORRIGIDA_{timestamp}.csv"
+    all_columns = consolidated_columns()
+
+    # Cópia colunar do consolidado para os relatórios (lidos por coluna)
+    consolidated_parquet = consolidated_file.replace('.csv', '.parquet')
+    parquet_writer = ResultsParquetWriter(consolidated_parquet, all_columns,
+                                          float_columns=('confidence', 'hate_probability'),
+                                          int_columns=('text_length',))
+
+    # Textos repetidos (dentro e entre plataformas) são classificados uma vez só;
+    # a chave é o texto bruto porque as regras dependem de emojis e pontuação
+    classifier = DedupClassifier(classify_texts)
+
+    # Modo incremental: tabela persistente de resultados
+    store = ResultsStore() if incremental else None
+    version = pipeline_version()
+    incremental_stats = {'reused': 0, 'classified': 0}
+    cluster_stats = {'rows': 0, 'hate_rows': 0, 'hate_by_cluster': Counter()}
+    if incremental:
+        print(f"♻️  Modo incremental (versão do pipeline {version}, {store.count(version=version):,} resultados na tabela)")
+
+    # Contadores gerais (as linhas não ficam em memória)
+    platform_totals = {}
+    platform_hate = {}
+    platform_nao_hate = {}
+
+    datasets = resolve_datasets()
     for platform, file_path in datasets.items():
         print(f"\n📱 Analisando {platform.upper()}...")
         print(f"📂 Arquivo: {file_path}")
-        
+
+        text_col = TEXT_COLUMNS[platform]
+        needed_columns = {text_col, 'id', *PLATFORM_COLUMNS[platform].values()}
+        output_file = f"out/ANALISE_{platform.upper()}_CORRIGIDO_{timestamp}.csv"
+
+        label_counts = Counter()
+        method_counts = Counter()
+        class_counts = Counter()
+        total_comments = 0
+
         try:
-            # Carregar dados com separador correto
-            if platform == 'Instagram':
-                df = pd.read_csv(file_path, sep=';')
-            else:
-                df = pd.read_csv(file_path)
-            print(f"📊 Total de comentários: {len(df):,}")
-            
-            # Verificar coluna de texto
-            text_col = text_columns[platform]
-            if text_col not in df.columns:
-                print(f"❌ Coluna '{text_col}' não encontrada!")
-                continue
-            
-            # Lista para armazenar resultados
-            results = []
-            
+            # Ler apenas as colunas usadas, em blocos
+            reader = pd.read_csv(file_path, sep=SEPARATORS[platform], chunksize=chunk_size,
+                                 usecols=lambda column: column in needed_columns)
+
             print("🔍 Iniciando análise com sistema corrigido...")
-            
-            # Processar cada comentário
-            for idx, row in df.iterrows():
-                if idx % 100 == 0:
-                    print(f"📈 Processando comentário {idx+1:,}/{len(df):,}")
-                
-                text = str(row[text_col])
-                
-                try:
-                    # Usar sistema corrigido
-                    result = predict_hate_speech(text)
-                    
-                    # Adicionar resultado
-                    result_row = {
-                        'platform': platform,
-                        'id': row.get('id', idx + 1),
-                        'text': text,
-                        'text_length': len(text),
-                        'text_features': f"Length: {len(text)}, Words: {len(text.split())}, Has_emoji: {'emoji' in text.lower()}",
-                        'predicted_label': 'HATE' if result['is_hate'] else 'NÃO-HATE',
-                        'method': result['method'],
-                        'specialized_class': result['specialized_class'],
-                        'confidence': result['confidence'],
-                        'hate_probability': result['hate_probability']
-                    }
-                    
-                    # Adicionar colunas específicas de cada plataforma
-                    if platform == 'Instagram':
-                        result_row.update({
-                            'author_handle': row.get('Author Handle', ''),
-                            'like_count': row.get('Like Count', ''),
-                            'timestamp': row.get('Timestamp', '')
-                        })
-                    elif platform == 'TikTok':
-                        result_row.update({
-                            'author_handle': row.get('author_handle', ''),
-                            'like_count_visible': row.get('like_count_visible', ''),
-                            'timestamp_visible': row.get('timestamp_visible', ''),
-                            'video_id': row.get('video_id', '')
-                        })
-                    elif platform == 'YouTube':
-                        result_row.update({
-                            'titulo_video': row.get('titulo_video', ''),
-                            'data': row.get('data', ''),
-                            'likes_comentario': row.get('likes_comentario', ''),
-                            'autor_handle': row.get('autor_handle', '')
-                        })
-                    
-                    results.append(result_row)
-                    
-                except Exception as e:
-                    print(f"⚠️  Erro ao processar comentário {idx+1}: {str(e)}")
-                    # Adicionar resultado de erro
-                    result_row = {
-                        'platform': platform,
-                        'id': row.get('id', idx + 1),
-                        'text': text,
-                        'text_length': len(text),
-                        'text_features': f"Length: {len(text)}, Words: {len(text.split())}, Has_emoji: {'emoji' in text.lower()}",
-                        'predicted_label': 'ERRO',
-                        'method': 'error',
-                        'specialized_class': 'N/A',
-                        'confidence': 0.0,
-                        'hate_probability': 0.0
-                    }
-                    results.append(result_row)
-            
-            # Criar DataFrame com resultados
-            results_df = pd.DataFrame(results)
-            
-            # Salvar resultados individuais
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file = f"out/ANALISE_{platform.upper()}_CORRIGIDO_{timestamp}.csv"
-            results_df.to_csv(output_file, index=False, encoding='utf-8')
-            
-            print(f"💾 Resultados salvos: {output_file}")
-            
-            # Estatísticas
-            total_comments = len(results_df)
-            hate_comments = len(results_df[results_df['predicted_label'] == 'HATE'])
-            nao_hate_comments = len(results_df[results_df['predicted_label'] == 'NÃO-HATE'])
-            error_comments = len(results_df[results_df['predicted_label'] == 'ERRO'])
-            
-            print(f"\n📈 Estatísticas da análise ({platform}):")
-            print(f"   - Total de comentários: {total_comments:,}")
-            print(f"   - Comentários HATE: {hate_comments:,} ({hate_comments/total_comments*100:.1f}%)")
-            print(f"   - Comentários NÃO-HATE: {nao_hate_comments:,} ({nao_hate_comments/total_comments*100:.1f}%)")
-            print(f"   - Comentários com ERRO: {error_comments:,} ({error_comments/total_comments*100:.1f}%)")
-            
-            # Distribuição por método
-            print(f"\n🔧 Top métodos de detecção ({platform}):")
-            method_counts = results_df['method'].value_counts()
-            for method, count in method_counts.head(5).items():
-                print(f"   - {method}: {count:,} ({count/total_comments*100:.1f}%)")
-            
-            # Distribuição por classe especializada (apenas HATE)
-            hate_df = results_df[results_df['predicted_label'] == 'HATE']
-            if len(hate_df) > 0:
-                print(f"\n🎯 Distribuição por classe especializada ({platform}):")
-                class_counts = hate_df['specialized_class'].value_counts()
-                for class_name, count in class_counts.items():
-                    if class_name != 'N/A':
-                        print(f"   - {class_name}: {count:,} ({count/len(hate_df)*100:.1f}%)")
-            
-            # Adicionar à lista geral
-            all_results.extend(results)
-            
+
+            for chunk in reader:
+                if text_col not in chunk.columns:
+                    print(f"❌ Coluna '{text_col}' não encontrada!")
+                    break
+
+                print(f"📈 Processando comentários {total_comments+1:,}-{total_comments+len(chunk):,}")
+                result_chunk = build_result_chunk(platform, chunk, text_col, classifier,
+                                                  store, version, incremental_stats)
+                update_cluster_signal(result_chunk, cluster_stats)
+
+                # Gravar o bloco nos arquivos da plataforma e consolidado
+                append_csv(result_chunk, output_file)
+                append_csv(result_chunk, consolidated_file, all_columns)
+                parquet_writer.write(result_chunk)
+
+                total_comments += len(result_chunk)
+                label_counts.update(result_chunk['predicted_label'].value_counts().to_dict())
+                method_counts.update(result_chunk['method'].value_counts().to_dict())
+                hate_rows = result_chunk['predicted_label'] == 'HATE'
+                class_counts.update(result_chunk.loc[hate_rows, 'specialized_class'].value_counts().to_dict())
+
         except Exception as e:
             print(f"❌ Erro ao analisar {platform}: {str(e)}")
+            if total_comments == 0:
+                continue
+            print(f"⚠️  {total_comments:,} comentários já gravados em {output_file}")
+
+        if total_comments == 0:
             continue
-    
-    # Criar relatório consolidado
-    if all_results:
-        print(f"\n📊 GERANDO RELATÓRIO CONSOLIDADO...")
-        
-        all_results_df = pd.DataFrame(all_results)
-        
-        # Salvar relatório consolidado
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        consolidated_file = f"out/ANALISE_CONSOLIDADA_CORRIGIDA_{timestamp}.csv"
-        all_results_df.to_csv(consolidated_file, index=False, encoding='utf-8')
-        
+
+        register_artifact(output_file, f"ANALISE_{platform.upper()}_CORRIGIDO", platform=platform, run=timestamp,
+                          dataset=file_path, version=version, row_count=total_comments)
+        print(f"💾 Resultados salvos: {output_file}")
+        print(f"📊 Total de comentários: {total_comments:,}")
+
+        # Estatísticas
+        hate_comments = label_counts['HATE']
+        nao_hate_comments = label_counts['NÃO-HATE']
+        error_comments = label_counts['ERRO']
+
+        print(f"\n📈 Estatísticas da análise ({platform}):")
+        print(f"   - Total de comentários: {total_comments:,}")
+        print(f"   - Comentários HATE: {hate_comments:,} ({hate_comments/total_comments*100:.1f}%)")
+        print(f"   - Comentários NÃO-HATE: {nao_hate_comments:,} ({nao_hate_comments/total_comments*100:.1f}%)")
+        print(f"   - Comentários com ERRO: {error_comments:,} ({error_comments/total_comments*100:.1f}%)")
+
+        # Distribuição por método
+        print(f"\n🔧 Top métodos de detecção ({platform}):")
+        for method, count in method_counts.most_common(5):
+            print(f"   - {method}: {count:,} ({count/total_comments*100:.1f}%)")
+
+        # Distribuição por classe especializada (apenas HATE)
+        if hate_comments > 0:
+            print(f"\n🎯 Distribuição por classe especializada ({platform}):")
+            for class_name, count in class_counts.most_common():
+                if class_name != 'N/A':
+                    print(f"   - {class_name}: {count:,} ({count/hate_comments*100:.1f}%)")
+
+        platform_totals[platform] = total_comments
+        platform_hate[platform] = hate_comments
+        platform_nao_hate[platform] = nao_hate_comments
+
+    parquet_writer.close()
+
+    # Relatório consolidado (já gravado bloco a bloco)
+    if platform_totals:
+        print(f"\n📊 RELATÓRIO CONSOLIDADO...")
         print(f"💾 Relatório consolidado salvo: {consolidated_file}")
-        
+        print(f"💾 Versão Parquet: {consolidated_parquet}")
+        load_or_build_summary(consolidated_parquet)
+        for path in (consolidated_file, consolidated_parquet):
+            register_artifact(path, 'ANALISE_CONSOLIDADA_CORRIGIDA', run=timestamp,
+                              dataset=','.join(datasets.values()), version=version,
+                              row_count=sum(platform_totals.values()))
+        print(f"💾 Resumo agregado: {summary_path(consolidated_parquet)}")
+
         # Estatísticas gerais
-        total_all = len(all_results_df)
-        hate_all = len(all_results_df[all_results_df['predicted_label'] == 'HATE'])
-        nao_hate_all = len(all_results_df[all_results_df['predicted_label'] == 'NÃO-HATE'])
-        
+        total_all = sum(platform_totals.values())
+        hate_all = sum(platform_hate.values())
+        nao_hate_all = sum(platform_nao_hate.values())
+
         print(f"\n🌐 ESTATÍSTICAS GERAIS (TODAS AS PLATAFORMAS):")
         print(f"   - Total de comentários: {total_all:,}")
         print(f"   - Comentários HATE: {hate_all:,} ({hate_all/total_all*100:.1f}%)")
         print(f"   - Comentários NÃO-HATE: {nao_hate_all:,} ({nao_hate_all/total_all*100:.1f}%)")
-        
+
         # Estatísticas por plataforma
         print(f"\n📱 ESTATÍSTICAS POR PLATAFORMA:")
-        for platform in ['Instagram', 'TikTok', 'YouTube']:
-            platform_df = all_results_df[all_results_df['platform'] == platform]
-            if len(platform_df) > 0:
-                platform_hate = len(platform_df[platform_df['predicted_label'] == 'HATE'])
-                platform_total = len(platform_df)
-                print(f"   - {platform}: {platform_hate:,}/{platform_total:,} ({platform_hate/platform_total*100:.1f}% HATE)")
-        
+        for platform, platform_total in platform_totals.items():
+            hate_count = platform_hate[platform]
+            print(f"   - {platform}: {hate_count:,}/{platform_total:,} ({hate_count/platform_total*100:.1f}% HATE)")
+
+        # Deduplicação antes da inferência
+        dedup = classifier.stats()
+        print(f"\n♻️  DEDUPLICAÇÃO ANTES DA INFERÊNCIA:")
+        print(f"   - Linhas: {dedup['rows']:,} | textos classificados: {dedup['unique']:,}")
+        print(f"   - Duplicatas reaproveitadas: {dedup['duplicates']:,} ({dedup['dedup_ratio']*100:.1f}%)")
+
+        if incremental:
+            reused = incremental_stats['reused']
+            print(f"\n📅 ANÁLISE INCREMENTAL:")
+            print(f"   - Resultados reaproveitados da tabela: {reused:,} ({reused/total_all*100:.1f}%)")
+            print(f"   - Comentários novos ou alterados classificados: {incremental_stats['classified']:,}")
+
+        if cluster_stats['rows']:
+            print(f"\n🧬 QUASE-DUPLICATAS (MinHash/LSH, só sinal):")
+            print(f"   - Comentários em clusters com variações: {cluster_stats['rows']:,} "
+                  f"({cluster_stats['rows']/total_all*100:.1f}%), {cluster_stats['hate_rows']:,} HATE")
+            for cluster, count in cluster_stats['hate_by_cluster'].most_common(5):
+                print(f"   - Cluster {cluster}: {count:,} variações HATE")
+
+        # Política de tamanho de entrada do motor de regras
+        guard_stats = get_rule_guard_stats()
+        print(f"\n🛡️  POLÍTICA DE ENTRADA DAS REGRAS:")
+        print(f"   - Textos recortados (janela): {guard_stats['windowed']:,} ({guard_stats['windowed_rate']*100:.2f}%)")
+        print(f"   - Orçamento de tempo excedido (fallback p/ modelo): {guard_stats['budget_exceeded']:,} ({guard_stats['budget_exceeded_rate']*100:.2f}%)")
+
         return consolidated_file
-    
+
     return None
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Análise completa dos três datasets')
+    parser.add_argument('--incremental', action='store_true', help='Classificar só comentários novos ou alterados')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Linhas por bloco')
+    args = parser.parse_args()
+
     print("🚀 Iniciando análise completa com correções...")
-    output_file = analyze_all_datasets()
+    output_file = analyze_all_datasets(args.chunk_size, args.incremental)
     if output_file:
         print(f"✅ Análise completa concluída! Arquivo: {output_file}")
     else:
@@ -17,6 +17,7 @@ sys.path.append('.')
 
 # Importar as funções do sistema
 from app_space_version import predict_hate_speech
+from results_io import write_results
 
 def analyze_context(text):
     """Analisa o contexto do texto"""
@@ -261,8 +262,8 @@ def generate_enhanced_reports(results_df):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
     # 1. Relatório principal aprimorado
-    main_file = f"out/analise_enhanced_completa_{timestamp}.csv"
-    results_df.to_csv(main_file, index=False)
+    main_file = f"out/analise_enhanced_completa_{timestamp}.parquet"
+    write_results(results_df, main_file)
     print(f"✅ Relatório principal: {main_file}")
     
     # 2. Análise de validação
@@ -304,20 +305,20 @@ def generate_enhanced_reports(results_df):
     
     # 6. Casos de discordância (true_label != predicted_label)
     discordance_cases = results_df[results_df['true_label'] != results_df['predicted_label']]
-    discordance_file = f"out/casos_discordancia_{timestamp}.csv"
-    discordance_cases.to_csv(discordance_file, index=False)
+    discordance_file = f"out/casos_discordancia_{timestamp}.parquet"
+    write_results(discordance_cases, discordance_file)
     print(f"✅ Casos de discordância: {discordance_file} ({len(discordance_cases)} casos)")
     
     # 7. Casos de alta confiança
     high_confidence_cases = results_df[results_df['confidence'] >= 0.9]
-    high_confidence_file = f"out/casos_alta_confianca_{timestamp}.csv"
-    high_confidence_cases.to_csv(high_confidence_file, index=False)
+    high_confidence_file = f"out/casos_alta_confianca_{timestamp}.parquet"
+    write_results(high_confidence_cases, high_confidence_file)
     print(f"✅ Casos de alta confiança: {high_confidence_file} ({len(high_confidence_cases)} casos)")
     
     # 8. Casos de baixa confiança
     low_confidence_cases = results_df[results_df['confidence'] < 0.7]
-    low_confidence_file = f"out/casos_baixa_confianca_{timestamp}.csv"
-    low_confidence_cases.to_csv(low_confidence_file, index=False)
+    low_confidence_file = f"out/casos_baixa_confianca_{timestamp}.parquet"
+    write_results(low_confidence_cases, low_confidence_file)
     print(f"✅ Casos de baixa confiança: {low_confidence_file} ({len(low_confidence_cases)} casos)")
     
     return {
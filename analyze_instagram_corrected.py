@@ -7,6 +7,8 @@ import pandas as pd
 import os
 from datetime import datetime
 from app_space_version import predict_hate_speech
+from results_store import pipeline_version
+from run_manifest import register_artifact
 
 def analyze_instagram_corrected():
     """Analisa o dataset do Instagram com as correções aplicadas"""
@@ -89,6 +91,9 @@ def analyze_instagram_corrected():
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_file = f"out/ANALISE_INSTAGRAM_CORRIGIDO_{timestamp}.csv"
         results_df.to_csv(output_file, index=False, encoding='utf-8')
+        register_artifact(output_file, 'ANALISE_INSTAGRAM_CORRIGIDO', platform='Instagram', run=timestamp,
+                          dataset=file_path, version=pipeline_version(),
+                          row_count=len(results_df))
         
         print(f"💾 Resultados salvos: {output_file}")
         
@@ -5,23 +5,20 @@ Script para analisar o dataset do TikTok usando o sistema Space otimizado
 
 import pandas as pd
 import sys
-import os
 from datetime import datetime
 from app_space_version import predict_hate_speech
+from results_store import pipeline_version
+from run_manifest import latest_artifact, register_artifact
 
 def analyze_tiktok_dataset():
     """Analisa o dataset do TikTok com o sistema Space otimizado"""
     
-    # Encontrar o arquivo mais recente do TikTok
-    tiktok_files = [f for f in os.listdir('clean-annotated-data') if f.startswith('tiktok_consolidado_limpo_')]
-    if not tiktok_files:
+    # Arquivo limpo mais recente do TikTok (manifesto de execuções)
+    input_file = latest_artifact('tiktok_consolidado_limpo', platform='TikTok', directory='clean-annotated-data', formats=('.csv',))
+    if not input_file:
         print("❌ Nenhum arquivo do TikTok encontrado!")
         return
     
-    # Pegar o mais recente
-    latest_file = sorted(tiktok_files)[-1]
-    input_file = f"clean-annotated-data/{latest_file}"
-    
     print(f"📱 Analisando dataset do TikTok: {input_file}")
     
     try:
@@ -95,6 +92,9 @@ def analyze_tiktok_dataset():
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_file = f"out/ANALISE_TIKTOK_SPACE_{timestamp}.csv"
         results_df.to_csv(output_file, index=False, encoding='utf-8')
+        register_artifact(output_file, 'ANALISE_TIKTOK_SPACE', platform='TikTok', run=timestamp,
+                          dataset=input_file, version=pipeline_version(),
+                          row_count=len(results_df))
         
         print(f"💾 Resultados salvos: {output_file}")
         
@@ -12,36 +12,14 @@ import joblib
 import json
 from datetime import datetime
 import os
+from text_normalization import normalize_ensemble as normalize_text
+from tokenization_cache import load_or_build_pretokenized, texts_fingerprint
+from batch_checkpoint import BatchCheckpoint, KEY_COLUMN
+from dedup_inference import group_duplicates, dedup_stats
+from two_stage_scheduler import TwoStageScheduler
 from tqdm import tqdm
 import time
 
-def normalize_text(text):
-    """Normalizar texto: URLs, menções, hashtags para placeholders"""
-    import re
-    
-    # Verificar se é string válida
-    if not isinstance(text, str) or pd.isna(text):
-        return ""
-    
-    # URLs
-    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '[URL]', text)
-    
-    # Menções
-    text = re.sub(r'@\w+', '[MENTION]', text)
-    
-    # Hashtags
-    text = re.sub(r'#\w+', '[HASHTAG]', text)
-    
-    # Múltiplos espaços
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Limitar tamanho máximo
-    text = text.strip()
-    if len(text) > 1000:
-        text = text[:1000] + "..."
-    
-    return text
-
 class EnsembleSystem:
     def __init__(self, binary_model_dir, specialized_model_dir):
         """Inicializar sistema ensemble"""
@@ -63,6 +41,12 @@ class EnsembleSystem:
         # Carregar label encoder
         self.label_encoder = joblib.load(os.path.join(specialized_model_dir, 'label_encoder.pkl'))
         
+        # Escalonador em dois estágios (lotes cheios no modelo especializado)
+        self.scheduler = TwoStageScheduler(
+            self.binary_model, self.specialized_model,
+            self.binary_tokenizer, self.specialized_tokenizer
+        )
+        
         print("✅ Sistema ensemble carregado!")
     
     def predict_ensemble(self, text):
@@ -123,6 +107,54 @@ class EnsembleSystem:
             'specialized_confidence': specialized_confidence,
             'ensemble_confidence': ensemble_confidence
         }
+    
+    def predict_pretokenized(self, binary_dataset, specialized_dataset=None, batch_size=32, indices=None):
+        """Predição ensemble em lotes a partir de datasets pré-tokenizados
+        
+        Com tokenizers idênticos o dataset especializado é dispensável: o
+        estágio 2 reaproveita os tokens do estágio 1. indices restringe a
+        predição a um subconjunto de linhas (retomada de checkpoint).
+        """
+        specialized_inputs = specialized_dataset.get_batch if specialized_dataset is not None else None
+        records = self.scheduler.run(binary_dataset.iter_batches(batch_size, indices), specialized_inputs)
+        
+        for record in records:
+            yield self._record_to_prediction(record)
+    
+    def predict_batch(self, texts, batch_size=32):
+        """Predição ensemble em lotes para uma lista de textos"""
+        normalized_texts = [normalize_text(text) for text in texts]
+        records = self.scheduler.run_texts(
+            normalized_texts, self.binary_tokenizer, self.specialized_tokenizer,
+            batch_size=batch_size, max_length=256
+        )
+        return [self._record_to_prediction(record) for record in records]
+    
+    def _record_to_prediction(self, record):
+        """Converte um resultado do escalonador no formato de predict_ensemble"""
+        binary_probs = record['binary_probs']
+        binary_confidence = binary_probs.max().item()
+        
+        if not record['is_hate']:  # não-hate
+            return {
+                'is_hate': False,
+                'binary_confidence': binary_confidence,
+                'specialized_class': None,
+                'specialized_confidence': None,
+                'ensemble_confidence': binary_confidence
+            }
+        
+        specialized_probs = record['specialized_probs']
+        specialized_pred = torch.argmax(specialized_probs).item()
+        specialized_class = self.label_encoder.inverse_transform([specialized_pred])[0]
+        specialized_confidence = specialized_probs[specialized_pred].item()
+        return {
+            'is_hate': True,
+            'binary_confidence': binary_confidence,
+            'specialized_class': specialized_class,
+            'specialized_confidence': specialized_confidence,
+            'ensemble_confidence': (binary_confidence + specialized_confidence) / 2
+        }
 
 def apply_ensemble_to_clean_base():
     """Aplicar sistema ensemble na base limpa"""
@@ -143,47 +175,86 @@ def apply_ensemble_to_clean_base():
     
     # Carregar base limpa
     print("📊 Carregando base limpa...")
-    df = pd.read_csv('clean-annotated-data/export_1757023553205_limpa.csv', sep=';')
+    input_file = 'clean-annotated-data/export_1757023553205_limpa.csv'
+    df = pd.read_csv(input_file, sep=';')
     print(f"📈 Total de comentários: {len(df)}")
     
     # Inicializar sistema ensemble
     ensemble = EnsembleSystem(binary_model_dir, specialized_model_dir)
     
+    # Pré-tokenizar (reutiliza o artefato em disco nas próximas execuções)
+    texts = df['Comment Text'].tolist()
+    binary_dataset = load_or_build_pretokenized(
+        texts, ensemble.binary_tokenizer, 'base_limpa_instagram',
+        max_length=256, profile='ensemble', source=input_file
+    )
+    specialized_dataset = None
+    if not ensemble.scheduler.share_tokenization:
+        specialized_dataset = load_or_build_pretokenized(
+            texts, ensemble.specialized_tokenizer, 'base_limpa_instagram',
+            max_length=256, profile='ensemble', source=input_file
+        )
+    
+    # Checkpoint: resultados gravados em partes; uma nova execução retoma de onde parou
+    checkpoint = BatchCheckpoint('avaliacoes_odio_base_limpa', run_key={
+        'input_file': input_file,
+        'texts_fingerprint': texts_fingerprint(texts),
+        'binary_model': binary_model_dir,
+        'specialized_model': specialized_model_dir
+    })
+    completed = checkpoint.completed_keys()
+    pending = [i for i in range(len(df)) if i not in completed]
+    if completed:
+        print(f"♻️  Retomando checkpoint: {len(completed)} comentários já processados, {len(pending)} restantes")
+    
     # Processar comentários
     print("\n🚀 Processando comentários...")
-    results = []
     
     start_time = time.time()
     
-    for idx, row in tqdm(df.iterrows(), total=len(df), desc="Processando"):
-        comment_text = row['Comment Text']
-        comment_id = row['id']
-        
-        # Predição do ensemble
-        prediction = ensemble.predict_ensemble(comment_text)
+    # Deduplicação: cada texto normalizado é classificado uma vez (na primeira
+    # linha em que aparece) e o resultado é replicado para as demais
+    codes, representatives = group_duplicates([texts[i] for i in pending], profile='ensemble')
+    dedup = dedup_stats(len(pending), len(representatives))
+    print(f"♻️  Textos únicos: {dedup['unique']} de {dedup['rows']} ({dedup['dedup_ratio']*100:.1f}% duplicados)")
+    
+    predictions = ensemble.predict_pretokenized(
+        binary_dataset, specialized_dataset,
+        indices=[pending[r] for r in representatives]
+    )
+    group_predictions = {}
+    comment_ids = df['id'].tolist()
+    
+    for idx, (row_index, code) in enumerate(tqdm(zip(pending, codes), total=len(pending), desc="Processando")):
+        # Representantes chegam na ordem da primeira ocorrência de cada grupo
+        if code not in group_predictions:
+            group_predictions[code] = next(predictions)
+        prediction = group_predictions[code]
         
         # Adicionar informações do comentário
-        result = {
-            'id': comment_id,
-            'comment_text': comment_text,
+        checkpoint.add({
+            KEY_COLUMN: row_index,
+            'id': comment_ids[row_index],
+            'comment_text': texts[row_index],
             'is_hate': prediction['is_hate'],
             'binary_confidence': prediction['binary_confidence'],
             'specialized_class': prediction['specialized_class'],
             'specialized_confidence': prediction['specialized_confidence'],
             'ensemble_confidence': prediction['ensemble_confidence']
-        }
-        
-        results.append(result)
+        })
         
         # Log de progresso a cada 100 comentários
         if (idx + 1) % 100 == 0:
             elapsed_time = time.time() - start_time
             rate = (idx + 1) / elapsed_time
-            remaining = (len(df) - idx - 1) / rate
-            print(f"📊 Processados: {idx + 1}/{len(df)} ({rate:.1f} com/s) - Restante: {remaining:.1f}s")
+            remaining = (len(pending) - idx - 1) / rate
+            print(f"📊 Processados: {len(completed) + idx + 1}/{len(df)} ({rate:.1f} com/s) - Restante: {remaining:.1f}s")
     
-    # Converter para DataFrame
-    results_df = pd.DataFrame(results)
+    checkpoint.finalize()
+    processed_now = len(pending)
+    
+    # Resultados completos (execuções anteriores + atual) na ordem da base
+    results_df = checkpoint.load_results().drop(columns=[KEY_COLUMN])
     
     # Salvar resultados
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -216,10 +287,17 @@ def apply_ensemble_to_clean_base():
     
     # Tempo total
     total_time = time.time() - start_time
-    rate = total_comments / total_time
+    rate = processed_now / total_time if total_time > 0 else 0.0
     print(f"  • Tempo total: {total_time:.1f}s")
+    print(f"  • Duplicatas reaproveitadas: {dedup['duplicates']} ({dedup['dedup_ratio']*100:.1f}%)")
     print(f"  • Taxa de processamento: {rate:.1f} comentários/segundo")
     
+    # Uso dos lotes do escalonador em dois estágios
+    scheduler_stats = ensemble.scheduler.get_stats()
+    print(f"  • Lotes binários: {scheduler_stats['binary_batches']} | lotes especializados: {scheduler_stats['specialized_batches']}")
+    print(f"  • Ocupação média dos lotes especializados: {scheduler_stats['specialized_batch_fill']*100:.1f}%")
+    print(f"  • Tokenização compartilhada entre estágios: {'sim' if scheduler_stats['shared_tokenization'] else 'não'}")
+    
     # Salvar relatório
     report = {
         'timestamp': timestamp,
@@ -230,6 +308,11 @@ def apply_ensemble_to_clean_base():
         'avg_confidence': float(avg_confidence),
         'processing_time_seconds': float(total_time),
         'processing_rate': float(rate),
+        'processed_this_run': int(processed_now),
+        'resumed_from_checkpoint': int(len(completed)),
+        'dedup': dedup,
+        'checkpoint': checkpoint.path,
+        'scheduler': scheduler_stats,
         'specialized_distribution': specialized_dist.to_dict() if hate_comments > 0 else {},
         'output_file': output_file
     }
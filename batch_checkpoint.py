@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Checkpoint de execuções longas de classificação em lote
+Os resultados são gravados periodicamente em partes Parquet (somente
+acréscimo) e registrados num manifest; uma execução reiniciada pula as
+linhas já concluídas
+"""
+
+import os
+import json
+import glob
+from datetime import datetime
+
+import pandas as pd
+
+CHECKPOINT_DIR = "out/checkpoints"
+FLUSH_EVERY = 500  # Resultados acumulados antes de gravar uma parte
+KEY_COLUMN = 'row_index'  # Posição da linha no arquivo de entrada
+
+def _write_json_atomic(data, path):
+    """Grava JSON via arquivo temporário + rename (nunca fica pela metade)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+class BatchCheckpoint:
+    """Partes Parquet + manifest de uma execução identificada por run_key
+
+    Uma parte só vale depois de registrada no manifest: partes órfãs de uma
+    execução interrompida durante a gravação são descartadas ao retomar.
+    """
+
+    def __init__(self, name, run_key, base_dir=CHECKPOINT_DIR, flush_every=FLUSH_EVERY):
+        self.path = os.path.join(base_dir, name)
+        self.manifest_path = os.path.join(self.path, 'manifest.json')
+        self.run_key = run_key
+        self.flush_every = flush_every
+        self._buffer = []
+
+        os.makedirs(self.path, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        """Carrega o manifest da mesma execução ou começa um novo"""
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('run_key') == self.run_key:
+                self._remove_orphan_parts(manifest)
+                return manifest
+            print(f"⚠️  Checkpoint de outra execução em {self.path}, recomeçando...")
+
+        for part_file in glob.glob(os.path.join(self.path, 'part-*.parquet')):
+            os.remove(part_file)
+
+        manifest = {
+            'run_key': self.run_key,
+            'created_at': datetime.now().isoformat(),
+            'updated_at': None,
+            'completed': False,
+            'rows': 0,
+            'parts': []
+        }
+        _write_json_atomic(manifest, self.manifest_path)
+        return manifest
+
+    def _remove_orphan_parts(self, manifest):
+        """Remove partes gravadas mas não registradas no manifest"""
+        registered = {part['file'] for part in manifest['parts']}
+        for part_file in glob.glob(os.path.join(self.path, 'part-*.parquet')):
+            if os.path.basename(part_file) not in registered:
+                os.remove(part_file)
+
+    @property
+    def completed(self):
+        return self.manifest['completed']
+
+    def completed_keys(self):
+        """Chaves (posições de linha) já gravadas no checkpoint"""
+        keys = set()
+        for part in self.manifest['parts']:
+            part_df = pd.read_parquet(os.path.join(self.path, part['file']), columns=[KEY_COLUMN])
+            keys.update(part_df[KEY_COLUMN].tolist())
+        return keys
+
+    def add(self, result):
+        """Acumula um resultado (dict com KEY_COLUMN); grava ao encher o buffer"""
+        self._buffer.append(result)
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Grava o buffer como nova parte e registra no manifest"""
+        if not self._buffer:
+            return
+
+        part_df = pd.DataFrame(self._buffer)
+        part_file = f"part-{len(self.manifest['parts']):05d}.parquet"
+        part_path = os.path.join(self.path, part_file)
+        part_df.to_parquet(f"{part_path}.tmp", index=False)
+        os.replace(f"{part_path}.tmp", part_path)
+
+        self.manifest['parts'].append({
+            'file': part_file,
+            'rows': len(part_df),
+            'first_key': int(part_df[KEY_COLUMN].min()),
+            'last_key': int(part_df[KEY_COLUMN].max()),
+            'created_at': datetime.now().isoformat()
+        })
+        self.manifest['rows'] += len(part_df)
+        self.manifest['updated_at'] = datetime.now().isoformat()
+        _write_json_atomic(self.manifest, self.manifest_path)
+        self._buffer = []
+
+    def finalize(self):
+        """Grava o que restou e marca a execução como concluída"""
+        self.flush()
+        self.manifest['completed'] = True
+        self.manifest['updated_at'] = datetime.now().isoformat()
+        _write_json_atomic(self.manifest, self.manifest_path)
+
+    def load_results(self):
+        """Todos os resultados do checkpoint, na ordem do arquivo de entrada"""
+        if not self.manifest['parts']:
+            return pd.DataFrame()
+        parts = [pd.read_parquet(os.path.join(self.path, part['file'])) for part in self.manifest['parts']]
+        return pd.concat(parts, ignore_index=True).sort_values(KEY_COLUMN, kind='stable').reset_index(drop=True)
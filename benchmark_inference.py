@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Benchmark ponta a ponta dos caminhos de inferência
+Reproduz uma amostra do dataset das três plataformas em cada caminho
+(só regras, regras + modelo um a um, em lote, quantizado, ONNX, API Flask
+e função de lote do Gradio) e mede latência p50/p95/p99, vazão, pico de
+RSS e o tempo por etapa. Cada caminho roda num processo próprio (o pico de
+memória e as trocas de modelo não vazam entre caminhos) e o resultado vai
+para um JSON comparável entre commits
+
+Uso:
+  python benchmark_inference.py --samples 500
+  python benchmark_inference.py --paths rules,scalar,batched --samples 200
+  python benchmark_inference.py --compare out/benchmark_inference_A.json out/benchmark_inference_B.json
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import tempfile
+import subprocess
+import multiprocessing as mp
+from types import SimpleNamespace
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from results_io import read_results
+from run_manifest import latest_artifact, register_artifact
+
+PATHS = ['rules', 'scalar', 'batched', 'quantized', 'onnx', 'flask', 'flask_batch', 'gradio_batch']
+BATCH_PATHS = ('batched', 'flask_batch', 'gradio_batch')
+DATASET_KIND = 'dataset_three_platforms'
+DEFAULT_SAMPLES = 500
+BATCH_SIZE = 32
+FLASK_BATCH_LIMIT = 100  # Limite de textos por requisição em /predict_batch
+WARMUP = 5  # Chamadas descartadas antes da medida
+SEED = 42
+PERCENTILES = (50, 95, 99)
+OVERHEAD_STAGE = 'rules_and_overhead'  # Tempo fora das etapas instrumentadas
+
+class BenchmarkSkipped(Exception):
+    """Caminho indisponível neste ambiente (dependência ou modelo ausente)"""
+
+# --- Medidas ---
+class StageTimer:
+    """Acumula tempo e chamadas por etapa"""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    def wrap(self, owner, name, stage):
+        """Troca owner.name por um proxy cronometrado"""
+        setattr(owner, name, TimedCall(getattr(owner, name), stage, self))
+
+    def reset(self):
+        self.seconds.clear()
+        self.calls.clear()
+
+class TimedCall:
+    """Proxy que mede as chamadas e delega os demais atributos (tokenizers, modelos)"""
+
+    def __init__(self, target, stage, timer):
+        self._target = target
+        self._stage = stage
+        self._timer = timer
+
+    def __call__(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._target(*args, **kwargs)
+        finally:
+            self._timer.seconds[self._stage] += time.perf_counter() - start
+            self._timer.calls[self._stage] += 1
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+def current_rss_mb():
+    """RSS atual do processo (Linux; None em outros sistemas)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        return None
+
+def peak_rss_mb():
+    """Pico de RSS do processo (ru_maxrss é KB no Linux e bytes no macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+def latency_summary(latencies):
+    """Percentis e média (ms) de uma lista de latências em segundos"""
+    values = np.asarray(latencies) * 1000
+    summary = {f"p{p}_ms": float(np.percentile(values, p)) for p in PERCENTILES}
+    summary['mean_ms'] = float(values.mean())
+    summary['max_ms'] = float(values.max())
+    return summary
+
+# --- Caminhos do app (app_space_version.py) ---
+def _defer_to_model(text, budget_exceeded=False):
+    """Substitui o modelo no caminho só de regras (texto fica sem decisão)"""
+    return {'deferred': True, 'is_hate': False, 'rule_budget_exceeded': budget_exceeded}
+
+def _quantize_models(app):
+    """Quantização dinâmica int8 das camadas lineares dos dois modelos"""
+    import torch
+    for attr in ('model_binary', 'model_specialized'):
+        setattr(app, attr, torch.ao.quantization.quantize_dynamic(getattr(app, attr), {torch.nn.Linear},
+                                                                   dtype=torch.qint8))
+    app.model_scheduler.binary_model = app.model_binary
+    app.model_scheduler.specialized_model = app.model_specialized
+
+class OnnxClassifier:
+    """Sessão ONNX Runtime com a interface usada pelo app: model(**inputs).logits"""
+
+    def __init__(self, session):
+        self.session = session
+        self.input_names = [node.name for node in session.get_inputs()]
+
+    def __call__(self, **inputs):
+        import torch
+        feeds = {
+            name: (inputs[name] if name in inputs else torch.zeros_like(inputs['input_ids'])).numpy()
+            for name in self.input_names
+        }
+        logits = self.session.run(['logits'], feeds)[0]
+        return SimpleNamespace(logits=torch.from_numpy(logits))
+
+def _export_onnx(model, tokenizer, path):
+    """Exporta um modelo de classificação com eixos de lote e sequência dinâmicos"""
+    import torch
+    sample = dict(tokenizer("texto de exemplo", return_tensors="pt"))
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in sample}
+    dynamic_axes['logits'] = {0: 'batch'}
+    model.eval()
+    with torch.no_grad():
+        torch.onnx.export(model, (sample,), path, input_names=list(sample), output_names=['logits'],
+                          dynamic_axes=dynamic_axes, opset_version=14)
+    return path
+
+def _use_onnx(app, export_dir):
+    """Troca os dois modelos por sessões ONNX Runtime (exportadas na hora)"""
+    try:
+        import onnxruntime as ort
+    except ImportError:
+        raise BenchmarkSkipped("onnxruntime não instalado")
+
+    for attr, tokenizer in (('model_binary', app.tokenizer_binary), ('model_specialized', app.tokenizer_specialized)):
+        path = _export_onnx(getattr(app, attr), tokenizer, os.path.join(export_dir, f"{attr}.onnx"))
+        session = ort.InferenceSession(path, providers=['CPUExecutionProvider'])
+        setattr(app, attr, OnnxClassifier(session))
+    app.model_scheduler.binary_model = app.model_binary
+    app.model_scheduler.specialized_model = app.model_specialized
+
+def _instrument_app(app, timer):
+    """Etapas do app: caminho do modelo (inclusivo), tokenização e cada modelo"""
+    timer.wrap(app, 'predict_with_model', 'model_path')
+    timer.wrap(app, 'predict_with_model_batch', 'model_path')
+    timer.wrap(app.token_cache_binary, 'encode', 'tokenization')
+    timer.wrap(app.token_cache_specialized, 'encode', 'tokenization')
+    timer.wrap(app, 'tokenizer_binary', 'tokenization')
+    timer.wrap(app, 'tokenizer_specialized', 'tokenization')
+    timer.wrap(app, 'model_binary', 'binary_model')
+    timer.wrap(app, 'model_specialized', 'specialized_model')
+    timer.wrap(app.model_scheduler, 'binary_model', 'binary_model')
+    timer.wrap(app.model_scheduler, 'specialized_model', 'specialized_model')
+
+def _setup_app(name, timer, export_dir):
+    """Importa o app, aplica a variante do caminho e devolve a função medida"""
+    import app_space_version as app
+    if not hasattr(app, 'model_scheduler'):
+        raise BenchmarkSkipped("modelos não carregados (app em modo fallback)")
+
+    if name == 'quantized':
+        _quantize_models(app)
+    elif name == 'onnx':
+        _use_onnx(app, export_dir)
+    _instrument_app(app, timer)
+
+    if name == 'rules':
+        return lambda text: [app.predict_hate_speech(text, model_predict=_defer_to_model)]
+    if name == 'batched':
+        return app.predict_hate_speech_batch
+    if name == 'gradio_batch':
+        def gradio_batch(batch):
+            app.analyze_batch_text("\n".join(batch))  # Devolve HTML: sem decisões para contar
+        return gradio_batch
+    return lambda text: [app.predict_hate_speech(text)]
+
+# --- Caminhos da API Flask (create_production_api.py) ---
+def _setup_flask(name, timer):
+    """Cliente de teste do Flask (WSGI no mesmo processo, sem rede)"""
+    try:
+        import create_production_api as api
+    except ImportError as e:
+        raise BenchmarkSkipped(f"API indisponível: {e}")
+    if api.detector.model is None:
+        raise BenchmarkSkipped("modelo sklearn da API não encontrado")
+
+    timer.wrap(api.detector, 'normalize_text', 'normalization')
+    # Com o cache de features a pontuação passa pelo cache + classificador, não pelo pipeline
+    if api.detector.feature_cache is not None:
+        timer.wrap(api.detector.feature_cache, 'transform', 'vectorization')
+        timer.wrap(api.detector.classifier, 'predict_proba', 'predict_proba')
+    else:
+        timer.wrap(api.detector.model, 'predict_proba', 'predict_proba')
+    client = api.app.test_client()
+
+    def post(endpoint, payload, key):
+        response = client.post(endpoint, json=payload)
+        if response.status_code != 200:
+            raise RuntimeError(f"{endpoint} respondeu {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return response.get_json()[key]
+
+    if name == 'flask_batch':
+        return lambda batch: post('/predict_batch', {'texts': batch}, 'results')
+    return lambda text: [post('/predict', {'text': text}, 'result')]
+
+# --- Execução de um caminho (processo filho) ---
+def _units(name, texts, batch_size):
+    """Textos individuais ou lotes, conforme o caminho"""
+    if name not in BATCH_PATHS:
+        return texts
+    if name == 'flask_batch':
+        batch_size = min(batch_size, FLASK_BATCH_LIMIT)
+    if name == 'gradio_batch':
+        texts = [" ".join(text.split()) for text in texts]  # Uma linha por texto na caixa do Gradio
+    return [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+
+def _decision_stats(results):
+    """Taxa de hate e de textos adiados ao modelo (checagem de deriva entre variantes)"""
+    results = [result for result in results if result is not None]
+    if not results:
+        return {}
+    deferred = sum(1 for result in results if result.get('deferred'))
+    decided = len(results) - deferred
+    hate = sum(1 for result in results if not result.get('deferred') and result.get('is_hate'))
+    stats = {'hate_rate': hate / decided if decided else 0.0}
+    if deferred:
+        stats['deferred_to_model_rate'] = deferred / len(results)
+    return stats
+
+def run_path(name, texts, batch_size=BATCH_SIZE, warmup=WARMUP):
+    """Mede um caminho no processo atual (chamado no processo filho)"""
+    timer = StageTimer()
+    start = time.perf_counter()
+    try:
+        with tempfile.TemporaryDirectory() as export_dir:
+            if name in ('flask', 'flask_batch'):
+                call = _setup_flask(name, timer)
+            else:
+                call = _setup_app(name, timer, export_dir)
+            setup_seconds = time.perf_counter() - start
+            rss_after_setup = current_rss_mb()
+
+            units = _units(name, texts, batch_size)
+            for unit in units[:warmup]:
+                call(unit)
+            timer.reset()
+
+            latencies = []
+            results = []
+            run_start = time.perf_counter()
+            for unit in units:
+                unit_start = time.perf_counter()
+                output = call(unit)
+                latencies.append(time.perf_counter() - unit_start)
+                if output is not None:
+                    results.extend(output)
+            wall_seconds = time.perf_counter() - run_start
+    except BenchmarkSkipped as e:
+        return {'status': 'skipped', 'reason': str(e)}
+
+    # Etapas aditivas: o caminho do modelo é inclusivo, o resto dele vira model_other
+    stages = {stage: {'seconds': seconds, 'calls': timer.calls[stage]} for stage, seconds in timer.seconds.items()}
+    if 'model_path' in stages:
+        model_path = stages.pop('model_path')['seconds']
+        inner = sum(stages[stage]['seconds'] for stage in ('tokenization', 'binary_model', 'specialized_model')
+                    if stage in stages)
+        stages['model_other'] = {'seconds': max(model_path - inner, 0.0), 'calls': None}
+    measured = sum(stage['seconds'] for stage in stages.values())
+    stages[OVERHEAD_STAGE] = {'seconds': max(wall_seconds - measured, 0.0), 'calls': None}
+    for stage in stages.values():
+        stage['share'] = stage['seconds'] / wall_seconds if wall_seconds > 0 else 0.0
+
+    return {
+        'status': 'ok',
+        'unit': 'lote' if name in BATCH_PATHS else 'comentário',
+        'units': len(units),
+        'comments': len(texts),
+        'setup_seconds': setup_seconds,
+        'wall_seconds': wall_seconds,
+        'comments_per_second': len(texts) / wall_seconds if wall_seconds > 0 else 0.0,
+        'latency': latency_summary(latencies),
+        'rss_after_setup_mb': rss_after_setup,
+        'peak_rss_mb': peak_rss_mb(),
+        'stages': stages,
+        **_decision_stats(results)
+    }
+
+def run_isolated(name, texts, batch_size=BATCH_SIZE, warmup=WARMUP):
+    """Executa o caminho num processo novo (spawn) e devolve as métricas"""
+    context = mp.get_context('spawn')
+    with context.Pool(1) as pool:
+        try:
+            return pool.apply(run_path, (name, texts, batch_size, warmup))
+        except Exception as e:
+            return {'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+
+# --- Dados e relatório ---
+def load_texts(file_path=None, column='text', sep=',', samples=DEFAULT_SAMPLES):
+    """Amostra de textos do dataset das três plataformas (ou de um CSV informado)"""
+    if file_path:
+        df = pd.read_csv(file_path, sep=sep, usecols=[column]).rename(columns={column: 'text'})
+    else:
+        file_path = latest_artifact(DATASET_KIND, directory='datasets')
+        if not file_path:
+            raise FileNotFoundError("dataset das três plataformas não encontrado (rode update_dataset_three_platforms.py)")
+        df = read_results(file_path, columns=['text'])
+
+    texts = df['text'].dropna().astype(str)
+    texts = texts[texts.str.strip() != '']
+    if samples and len(texts) > samples:
+        texts = texts.sample(n=samples, random_state=SEED)
+    return file_path, texts.tolist()
+
+def environment_info():
+    """Metadados para comparar execuções (commit, CPU, versões)"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    try:
+        import torch
+        torch_version, torch_threads = torch.__version__, torch.get_num_threads()
+    except ImportError:
+        torch_version = torch_threads = None
+    return {
+        'commit': commit,
+        'cpu_count': os.cpu_count(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'torch': torch_version,
+        'torch_threads': torch_threads
+    }
+
+def print_result(name, result):
+    if result['status'] != 'ok':
+        print(f"   ⏭️  {name}: {result.get('reason') or result.get('error')}")
+        return
+    latency = result['latency']
+    print(f"   - {name:13s} p50 {latency['p50_ms']:8.1f} ms | p95 {latency['p95_ms']:8.1f} ms | "
+          f"p99 {latency['p99_ms']:8.1f} ms (por {result['unit']}) | {result['comments_per_second']:8.1f} com/s | "
+          f"pico RSS {result['peak_rss_mb']:,.0f} MB")
+    stages = sorted(result['stages'].items(), key=lambda item: -item[1]['seconds'])
+    print("     etapas: " + ", ".join(f"{stage} {data['share']:.0%}" for stage, data in stages))
+
+def run_benchmark(texts, paths, batch_size=BATCH_SIZE, warmup=WARMUP):
+    """Mede todos os caminhos pedidos, um processo por caminho"""
+    print(f"🧪 BENCHMARK DE INFERÊNCIA ({len(texts):,} comentários, {os.cpu_count()} núcleos)")
+    print("=" * 60)
+    results = {}
+    for name in paths:
+        print(f"🔄 {name}...")
+        results[name] = run_isolated(name, texts, batch_size, warmup)
+        print_result(name, results[name])
+    return results
+
+def compare_reports(base_file, new_file):
+    """Diferença de latência, vazão e memória entre dois JSONs de benchmark"""
+    with open(base_file, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(new_file, encoding='utf-8') as f:
+        new = json.load(f)
+
+    print(f"📊 {base['environment']['commit']} → {new['environment']['commit']}")
+    for name, result in new['results'].items():
+        previous = base['results'].get(name)
+        if result['status'] != 'ok' or not previous or previous['status'] != 'ok':
+            print(f"   ⏭️  {name}: sem medida nas duas execuções")
+            continue
+        deltas = {
+            'p50': (previous['latency']['p50_ms'], result['latency']['p50_ms']),
+            'p95': (previous['latency']['p95_ms'], result['latency']['p95_ms']),
+            'com/s': (previous['comments_per_second'], result['comments_per_second']),
+            'RSS': (previous['peak_rss_mb'], result['peak_rss_mb'])
+        }
+        print(f"   - {name:13s} " + " | ".join(
+            f"{label} {before:,.1f}→{after:,.1f} ({(after / before - 1) * 100 if before else 0:+.1f}%)"
+            for label, (before, after) in deltas.items()
+        ))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ponta a ponta dos caminhos de inferência')
+    parser.add_argument('--paths', default=','.join(PATHS), help=f"Caminhos separados por vírgula ({', '.join(PATHS)})")
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES, help='Comentários amostrados do dataset')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Tamanho do lote nos caminhos em lote')
+    parser.add_argument('--warmup', type=int, default=WARMUP, help='Chamadas de aquecimento descartadas')
+    parser.add_argument('--input', help='CSV alternativo ao dataset das três plataformas')
+    parser.add_argument('--column', default='text', help='Coluna de texto do CSV alternativo')
+    parser.add_argument('--sep', default=',', help='Separador do CSV alternativo')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NOVO'), help='Comparar dois JSONs de benchmark')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_reports(*args.compare)
+        return
+
+    paths = [name.strip() for name in args.paths.split(',') if name.strip()]
+    unknown = [name for name in paths if name not in PATHS]
+    if unknown:
+        parser.error(f"caminhos desconhecidos: {', '.join(unknown)}")
+
+    dataset, texts = load_texts(args.input, args.column, args.sep, args.samples)
+    results = run_benchmark(texts, paths, args.batch_size, args.warmup)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs('out', exist_ok=True)
+    report_file = f"out/benchmark_inference_{timestamp}.json"
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'timestamp': timestamp,
+            'environment': environment_info(),
+            'dataset': dataset,
+            'comments': len(texts),
+            'batch_size': args.batch_size,
+            'warmup': args.warmup,
+            'results': results
+        }, f, indent=2, ensure_ascii=False)
+    register_artifact(report_file, 'benchmark_inference', run=timestamp, dataset=dataset, row_count=len(texts))
+    print(f"💾 Benchmark salvo: {report_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark da normalização de texto
+Compara as implementações antigas (várias passadas de re.sub) com o caminho
+compilado de text_normalization.py e confere se as saídas são idênticas
+"""
+
+import re
+import time
+import random
+import argparse
+import pandas as pd
+
+from text_normalization import PROFILES, normalize_text, normalize_many
+
+# --- Implementações antigas (referência) ---
+def legacy_normalize_space(text):
+    """Versão original de app_space_version.py"""
+    text = str(text).lower()
+    text = re.sub(r"http\S+|www\S+|https\S+", "[URL]", text, flags=re.MULTILINE)
+    text = re.sub(r"@\w+", "[MENTION]", text)
+    text = re.sub(r"#\w+", "[HASHTAG]", text)
+    text = re.sub(r"[^\w\s\[\]]", "", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+def legacy_normalize_sklearn(text):
+    """Versão original de HateSpeechDetector.normalize_text"""
+    if pd.isna(text) or text == "":
+        return ""
+    text = str(text).strip()
+    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+    text = re.sub(r'@\w+', '', text)
+    text = re.sub(r'#\w+', '', text)
+    text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)]', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+def legacy_normalize_ensemble(text):
+    """Versão original de apply_ensemble_to_clean_base.py"""
+    if not isinstance(text, str) or pd.isna(text):
+        return ""
+    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '[URL]', text)
+    text = re.sub(r'@\w+', '[MENTION]', text)
+    text = re.sub(r'#\w+', '[HASHTAG]', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = text.strip()
+    if len(text) > 1000:
+        text = text[:1000] + "..."
+    return text
+
+LEGACY = {
+    'space': legacy_normalize_space,
+    'sklearn': legacy_normalize_sklearn,
+    'ensemble': legacy_normalize_ensemble
+}
+
+def load_texts(file_path=None, column=None, sep=',', sample_size=20000):
+    """Carrega textos de um CSV ou gera comentários sintéticos"""
+    if file_path:
+        df = pd.read_csv(file_path, sep=sep, usecols=[column])
+        return df[column].tolist()
+
+    # Comentários sintéticos no estilo das plataformas
+    random.seed(42)
+    pieces = [
+        'Que legal!!!', 'viado do caralho', 'Orgulho de ser boyceta 🏳️‍🌈', '@usuario_1',
+        '#pride', 'https://www.instagram.com/p/abc123/?x=1', 'www.site.com.br',
+        'Todes', 'kkkkkk', '😂😂😂', 'sapatão é força', 'amo vocês ❤️', '...',
+        'Meu Deus, que isso?', 'TE AMO', 'hahaha', '🤡', 'nojento', '  '
+    ]
+    return [
+        " ".join(random.choice(pieces) for _ in range(random.randint(1, 12)))
+        for _ in range(sample_size)
+    ]
+
+def time_function(func, texts, repeats):
+    """Mede o melhor tempo (s) entre as repetições"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(texts)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run_benchmark(texts, repeats=5):
+    """Executa o micro-benchmark para todos os perfis"""
+    print(f"🧪 MICRO-BENCHMARK DE NORMALIZAÇÃO ({len(texts):,} textos, melhor de {repeats})")
+    print("=" * 60)
+
+    results = {}
+    for profile in PROFILES:
+        legacy = LEGACY[profile]
+
+        # Conferir saídas idênticas antes de medir
+        mismatches = [t for t in texts if legacy(t) != normalize_text(t, profile)]
+
+        legacy_time = time_function(lambda ts: [legacy(t) for t in ts], texts, repeats)
+        fast_time = time_function(lambda ts: normalize_many(ts, profile), texts, repeats)
+
+        results[profile] = {
+            'legacy_seconds': legacy_time,
+            'fast_seconds': fast_time,
+            'speedup': legacy_time / fast_time if fast_time > 0 else float('inf'),
+            'mismatches': len(mismatches)
+        }
+
+        status = "✅ idêntico" if not mismatches else f"❌ {len(mismatches)} divergências"
+        print(f"\n🔸 Perfil '{profile}': {status}")
+        print(f"   - Antigo:     {legacy_time*1000:8.1f} ms ({len(texts)/legacy_time:,.0f} textos/s)")
+        print(f"   - Compilado:  {fast_time*1000:8.1f} ms ({len(texts)/fast_time:,.0f} textos/s)")
+        print(f"   - Speedup:    {results[profile]['speedup']:.2f}x")
+        for text in mismatches[:3]:
+            print(f"   ⚠️  {text!r}")
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark da normalização de texto')
+    parser.add_argument('--file', help='CSV com comentários reais (opcional)')
+    parser.add_argument('--column', default='text', help='Coluna de texto no CSV')
+    parser.add_argument('--sep', default=',', help='Separador do CSV')
+    parser.add_argument('--samples', type=int, default=20000, help='Quantidade de textos sintéticos')
+    parser.add_argument('--repeats', type=int, default=5, help='Repetições por medida')
+    args = parser.parse_args()
+
+    texts = load_texts(args.file, args.column, args.sep, args.samples)
+    results = run_benchmark(texts, args.repeats)
+
+    if any(r['mismatches'] for r in results.values()):
+        print("\n❌ Normalização compilada diverge da implementação antiga!")
+        exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ Mantém apenas os dados úteis e padroniza o formato
 
 import pandas as pd
 from datetime import datetime
+from run_manifest import register_artifact
 
 def clean_youtube_data():
     """Limpa e prepara os dados do YouTube para análise"""
@@ -53,6 +54,8 @@ def clean_youtube_data():
         output_file = f"clean-annotated-data/youtube_limpo_{timestamp}.csv"
         
         df_clean.to_csv(output_file, index=False, encoding='utf-8')
+        register_artifact(output_file, 'youtube_limpo', platform='YouTube', run=timestamp,
+                          dataset=youtube_file, row_count=len(df_clean))
         
         print(f"💾 Arquivo limpo salvo: {output_file}")
         print(f"📋 Colunas finais: {list(df_clean.columns)}")
@@ -16,6 +16,7 @@ sys.path.append('.')
 
 # Importar as funções do sistema
 from app_space_version import predict_hate_speech
+from results_io import write_results
 
 def analyze_context(text):
     """Analisa o contexto do texto"""
@@ -283,14 +284,14 @@ def generate_comparison_reports(results_df):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
     # 1. Relatório principal de comparação
-    main_file = f"out/comparacao_space_vs_redundancy_{timestamp}.csv"
-    results_df.to_csv(main_file, index=False)
+    main_file = f"out/comparacao_space_vs_redundancy_{timestamp}.parquet"
+    write_results(results_df, main_file)
     print(f"✅ Relatório principal: {main_file}")
     
     # 2. Casos onde há diferença
     different_cases = results_df[results_df['labels_differ'] == True]
-    different_file = f"out/casos_diferentes_space_vs_redundancy_{timestamp}.csv"
-    different_cases.to_csv(different_file, index=False)
+    different_file = f"out/casos_diferentes_space_vs_redundancy_{timestamp}.parquet"
+    write_results(different_cases, different_file)
     print(f"✅ Casos diferentes: {different_file} ({len(different_cases)} casos)")
     
     # 3. Análise por tipo de caso
@@ -317,20 +318,20 @@ def generate_comparison_reports(results_df):
     
     # 5. Casos suspeitos do Space
     suspicious_cases = results_df[results_df['case_type'] == 'suspeito_space']
-    suspicious_file = f"out/casos_suspeitos_space_{timestamp}.csv"
-    suspicious_cases.to_csv(suspicious_file, index=False)
+    suspicious_file = f"out/casos_suspeitos_space_{timestamp}.parquet"
+    write_results(suspicious_cases, suspicious_file)
     print(f"✅ Casos suspeitos: {suspicious_file} ({len(suspicious_cases)} casos)")
     
     # 6. Casos de orgulho classificados como hate
     pride_hate_cases = results_df[results_df['case_type'] == 'orgulho_classificado_hate']
-    pride_hate_file = f"out/orgulho_classificado_hate_{timestamp}.csv"
-    pride_hate_cases.to_csv(pride_hate_file, index=False)
+    pride_hate_file = f"out/orgulho_classificado_hate_{timestamp}.parquet"
+    write_results(pride_hate_cases, pride_hate_file)
     print(f"✅ Orgulho como hate: {pride_hate_file} ({len(pride_hate_cases)} casos)")
     
     # 7. Casos de respeito classificados como hate
     respect_hate_cases = results_df[results_df['case_type'] == 'respeito_classificado_hate']
-    respect_hate_file = f"out/respeito_classificado_hate_{timestamp}.csv"
-    respect_hate_cases.to_csv(respect_hate_file, index=False)
+    respect_hate_file = f"out/respeito_classificado_hate_{timestamp}.parquet"
+    write_results(respect_hate_cases, respect_hate_file)
     print(f"✅ Respeito como hate: {respect_hate_file} ({len(respect_hate_cases)} casos)")
     
     return {
@@ -2,113 +2,281 @@
 """
 Script para consolidar todos os arquivos CSV do TikTok em uma única planilha limpa
 Mantém apenas os dados úteis para análise de hate speech
+
+- Arquivos lidos em paralelo, só com as colunas úteis e tipos explícitos
+- Todos os arquivos normalizados para o mesmo schema
+- Saída gravada em streaming, sem duplicatas de texto
+- Incremental: arquivos com checksum igual ao da última consolidação são
+  pulados; os novos comentários são anexados ao último consolidado
+  (os ids já atribuídos não mudam)
+- Quase-duplicatas (MinHash + LSH) agrupadas em clusters: cada linha recebe
+  o id do representante do cluster, o tamanho e a similaridade estimada
 """
 
-import pandas as pd
 import os
 import glob
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-def consolidate_tiktok_data():
-    """Consolida todos os arquivos CSV do TikTok em uma planilha única limpa"""
-    
-    # Caminho para os arquivos do TikTok
-    tiktok_dir = "clean-annotated-data/tiktok"
-    
-    # Buscar todos os arquivos CSV
-    csv_files = glob.glob(os.path.join(tiktok_dir, "tiktok_*_comments.csv"))
+import numpy as np
+import pandas as pd
+
+from dedup_inference import dedup_keys
+from near_duplicates import MinHasher, NearDuplicateIndex, SIGNATURE_VERSION
+from run_manifest import file_checksum, register_artifact
+
+TIKTOK_DIR = "clean-annotated-data/tiktok"
+FILE_PATTERN = "tiktok_*_comments.csv"
+STATE_FILE = "clean-annotated-data/tiktok_consolidation_state.json"
+SIGNATURES_FILE = "clean-annotated-data/tiktok_minhash_signatures.npz"  # Assinaturas reaproveitadas entre execuções
+MAX_WORKERS = min(8, os.cpu_count() or 1)
+CHUNK_SIZE = 50000  # Linhas por bloco ao copiar o consolidado anterior
+
+# Colunas úteis e schema único (valores visíveis como "1,2 mil" ficam como texto)
+USEFUL_COLUMNS = ['text', 'author_handle', 'author_name', 'like_count_visible', 'timestamp_visible', 'video_id']
+COLUMN_DTYPES = {column: 'string' for column in USEFUL_COLUMNS}
+OUTPUT_COLUMNS = ['id', *USEFUL_COLUMNS, 'source_file']
+CLUSTER_COLUMNS = ['near_dup_cluster', 'near_dup_size', 'near_dup_similarity']
+CAMPAIGN_MIN_SIZE = 5  # Clusters a partir deste tamanho aparecem como possíveis campanhas
+TOP_CAMPAIGNS = 5
+
+def load_state(full=False):
+    """Estado da última consolidação (arquivo gerado + checksum de cada CSV)"""
+    if full or not os.path.exists(STATE_FILE):
+        return {'output_file': None, 'files': {}}
+    with open(STATE_FILE, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if not state.get('output_file') or not os.path.exists(state['output_file']):
+        return {'output_file': None, 'files': {}}
+    return state
+
+def save_state(state):
+    """Grava o estado de forma atômica"""
+    tmp_path = f"{STATE_FILE}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, STATE_FILE)
+
+def read_comment_file(file_path, known_checksum=None):
+    """Lê um CSV do TikTok no schema comum (None se o checksum não mudou)
+
+    Retorna (checksum, DataFrame ou None, erro ou None).
+    """
+    checksum = file_checksum(file_path)
+    if checksum == known_checksum:
+        return checksum, None, None
+
+    try:
+        df = pd.read_csv(file_path, usecols=lambda column: column in COLUMN_DTYPES, dtype=COLUMN_DTYPES)
+    except Exception as e:
+        return checksum, None, str(e)
+    if 'text' not in df.columns:
+        return checksum, None, "sem coluna 'text'"
+
+    # Filtrar apenas comentários não vazios e normalizar para o schema
+    df = df[df['text'].notna() & (df['text'].str.strip() != '')]
+    df = df.reindex(columns=USEFUL_COLUMNS)
+    df['source_file'] = os.path.basename(file_path)
+    return checksum, df, None
+
+def load_signatures():
+    """Assinaturas MinHash da última consolidação (id -> assinatura)"""
+    if not os.path.exists(SIGNATURES_FILE):
+        return {}
+    cached = np.load(SIGNATURES_FILE)
+    if 'version' not in cached.files or int(cached['version']) != SIGNATURE_VERSION:
+        return {}  # Assinaturas de outra regra: recalcular todas
+    return dict(zip(cached['ids'].tolist(), cached['signatures']))
+
+def copy_previous(previous_file, output_file, seen, stats, ids, signatures, hasher, cached_signatures):
+    """Copia o consolidado anterior em blocos, registrando textos, ids e assinaturas"""
+    for chunk in pd.read_csv(previous_file, dtype={**COLUMN_DTYPES, 'source_file': 'string'},
+                             chunksize=CHUNK_SIZE):
+        chunk = chunk.reindex(columns=OUTPUT_COLUMNS)
+        seen.update(dedup_keys(chunk['text']))
+        for comment_id, text in zip(chunk['id'].tolist(), chunk['text']):
+            signature = cached_signatures.get(comment_id)
+            signatures.append(signature if signature is not None else hasher.signature(text))
+            ids.append(comment_id)
+        append_rows(chunk, output_file, stats)
+
+def write_with_clusters(tmp_file, output_file, ids, signatures):
+    """Agrupa as quase-duplicatas e grava o consolidado final com as colunas de cluster"""
+    index = NearDuplicateIndex(num_perm=signatures.shape[1])
+    index.add_many(signatures)
+    roots, sizes, similarities = index.clusters()
+    cluster_ids = ids[roots]
+
+    # Maiores clusters (possíveis campanhas coordenadas)
+    campaign_roots = pd.Series(sizes, index=cluster_ids)
+    campaign_roots = campaign_roots[~campaign_roots.index.duplicated() & (campaign_roots >= CAMPAIGN_MIN_SIZE)]
+    campaigns = campaign_roots.sort_values(ascending=False).head(TOP_CAMPAIGNS).to_dict()
+    campaign_texts = {}
+
+    start = 0
+    for chunk in pd.read_csv(tmp_file, dtype={**COLUMN_DTYPES, 'source_file': 'string'}, chunksize=CHUNK_SIZE):
+        end = start + len(chunk)
+        chunk['near_dup_cluster'] = cluster_ids[start:end]
+        chunk['near_dup_size'] = sizes[start:end]
+        chunk['near_dup_similarity'] = np.round(similarities[start:end], 4)
+        for comment_id, text in zip(chunk['id'].tolist(), chunk['text']):
+            if comment_id in campaigns:
+                campaign_texts[comment_id] = text
+        chunk.to_csv(output_file, mode='w' if start == 0 else 'a', header=start == 0, index=False, encoding='utf-8')
+        start = end
+    os.remove(tmp_file)
+
+    return {
+        'clusters': int(len(np.unique(roots))),
+        'rows_in_clusters': int((sizes > 1).sum()),
+        'campaigns': [(cluster_id, size, campaign_texts.get(cluster_id, '')) for cluster_id, size in campaigns.items()]
+    }
+
+def append_rows(df, output_file, stats):
+    """Anexa linhas ao CSV de saída e atualiza os contadores"""
+    df.to_csv(output_file, mode='a', header=not os.path.exists(output_file), index=False, encoding='utf-8')
+    stats['total'] += len(df)
+    stats['with_author'] += int(df['author_handle'].notna().sum())
+    stats['with_likes'] += int(df['like_count_visible'].notna().sum())
+    stats['with_timestamp'] += int(df['timestamp_visible'].notna().sum())
+    if len(stats['sample']) < 3:
+        stats['sample'].extend(df['text'].head(3 - len(stats['sample'])).tolist())
+
+def consolidate_tiktok_data(full=False, workers=MAX_WORKERS):
+    """Consolida os arquivos CSV do TikTok em uma planilha única limpa"""
+
+    # Buscar todos os arquivos CSV (ordem estável: a primeira ocorrência de um texto é mantida)
+    csv_files = sorted(glob.glob(os.path.join(TIKTOK_DIR, FILE_PATTERN)))
     print(f"📱 Encontrados {len(csv_files)} arquivos do TikTok")
-    
-    # Lista para armazenar todos os DataFrames
-    all_dataframes = []
-    
-    # Processar cada arquivo
-    for i, file_path in enumerate(csv_files, 1):
-        try:
-            print(f"📂 Processando arquivo {i}/{len(csv_files)}: {os.path.basename(file_path)}")
-            
-            # Ler o CSV
-            df = pd.read_csv(file_path)
-            
-            # Verificar se tem a coluna 'text'
-            if 'text' not in df.columns:
-                print(f"⚠️  Arquivo {file_path} não tem coluna 'text', pulando...")
-                continue
-            
-            # Filtrar apenas comentários não vazios
-            df_clean = df[df['text'].notna() & (df['text'].str.strip() != '')].copy()
-            
-            # Manter apenas colunas úteis
-            useful_columns = ['text', 'author_handle', 'author_name', 'like_count_visible', 'timestamp_visible', 'video_id']
-            available_columns = [col for col in useful_columns if col in df_clean.columns]
-            
-            df_clean = df_clean[available_columns].copy()
-            
-            # Adicionar coluna de origem
-            df_clean['source_file'] = os.path.basename(file_path)
-            
-            # Adicionar à lista
-            all_dataframes.append(df_clean)
-            
-            print(f"✅ {len(df_clean)} comentários válidos extraídos")
-            
-        except Exception as e:
-            print(f"❌ Erro ao processar {file_path}: {str(e)}")
+
+    state = load_state(full)
+    previous_file = state['output_file']
+    known = state['files']
+    if previous_file:
+        print(f"♻️  Consolidação incremental a partir de: {previous_file}")
+
+    # Leitura paralela (arquivos sem alteração são pulados pelo checksum)
+    print(f"🔄 Lendo arquivos com {workers} workers...")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(
+            lambda file_path: read_comment_file(file_path, known.get(os.path.basename(file_path))),
+            csv_files
+        ))
+
+    checksums = {}
+    changed = []
+    skipped = failed = 0
+    for file_path, (checksum, df, error) in zip(csv_files, results):
+        name = os.path.basename(file_path)
+        if error:
+            print(f"❌ Erro ao processar {name}: {error}")
+            failed += 1
             continue
-    
-    if not all_dataframes:
+        checksums[name] = checksum
+        if df is None:
+            skipped += 1
+        else:
+            changed.append((name, df))
+
+    print(f"📂 Arquivos novos/alterados: {len(changed)} | sem alteração: {skipped} | com erro: {failed}")
+
+    if previous_file and not changed:
+        print("✅ Nenhum arquivo novo ou alterado; consolidado atual mantido")
+        return previous_file
+    if not previous_file and not changed:
         print("❌ Nenhum arquivo foi processado com sucesso!")
         return
-    
-    # Consolidar todos os DataFrames
-    print("🔄 Consolidando todos os dados...")
-    consolidated_df = pd.concat(all_dataframes, ignore_index=True)
-    
-    # Remover duplicatas baseadas no texto
-    print("🧹 Removendo duplicatas...")
-    initial_count = len(consolidated_df)
-    consolidated_df = consolidated_df.drop_duplicates(subset=['text'], keep='first')
-    final_count = len(consolidated_df)
-    duplicates_removed = initial_count - final_count
-    
-    print(f"📊 Estatísticas de consolidação:")
-    print(f"   - Total inicial: {initial_count:,} comentários")
-    print(f"   - Duplicatas removidas: {duplicates_removed:,}")
-    print(f"   - Total final: {final_count:,} comentários únicos")
-    
-    # Adicionar ID único
-    consolidated_df['id'] = range(1, len(consolidated_df) + 1)
-    
-    # Reordenar colunas
-    column_order = ['id', 'text', 'author_handle', 'author_name', 'like_count_visible', 'timestamp_visible', 'video_id', 'source_file']
-    available_columns = [col for col in column_order if col in consolidated_df.columns]
-    consolidated_df = consolidated_df[available_columns]
-    
-    # Salvar arquivo consolidado
+
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_file = f"clean-annotated-data/tiktok_consolidado_limpo_{timestamp}.csv"
-    
-    consolidated_df.to_csv(output_file, index=False, encoding='utf-8')
-    
+    tmp_file = f"{output_file}.tmp"
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)  # Sobra de uma execução interrompida
+    stats = {'total': 0, 'with_author': 0, 'with_likes': 0, 'with_timestamp': 0, 'sample': []}
+
+    # Textos já consolidados (linhas do consolidado anterior mantêm seus ids)
+    seen = set()
+    hasher = MinHasher()
+    ids = []
+    signatures = []
+    if previous_file:
+        copy_previous(previous_file, tmp_file, seen, stats, ids, signatures, hasher, load_signatures())
+    next_id = max(ids, default=0) + 1
+    previous_count = stats['total']
+
+    # Anexar comentários inéditos, arquivo por arquivo
+    print("🧹 Removendo duplicatas...")
+    read_count = 0
+    for name, df in changed:
+        read_count += len(df)
+        hashes = pd.Series(dedup_keys(df['text']), index=df.index)
+        keep = ~hashes.duplicated() & ~hashes.isin(seen)
+        new_rows = df[keep].copy()
+        seen.update(hashes[keep])
+
+        new_rows.insert(0, 'id', range(next_id, next_id + len(new_rows)))
+        next_id += len(new_rows)
+        ids.extend(new_rows['id'].tolist())
+        signatures.extend(hasher.signatures(new_rows['text'].tolist()))
+        append_rows(new_rows[OUTPUT_COLUMNS], tmp_file, stats)
+        print(f"✅ {name}: {len(df)} comentários válidos, {len(new_rows)} novos")
+
+    added = stats['total'] - previous_count
+    print(f"📊 Estatísticas de consolidação:")
+    print(f"   - Comentários lidos: {read_count:,}")
+    print(f"   - Duplicatas removidas: {read_count - added:,}")
+    print(f"   - Comentários novos: {added:,}")
+    print(f"   - Total final: {stats['total']:,} comentários únicos")
+
+    # Quase-duplicatas: clusters sobre todas as linhas (representante = linha mais antiga)
+    print("🧬 Agrupando quase-duplicatas (MinHash + LSH)...")
+    ids = np.array(ids, dtype=np.int64)
+    signature_matrix = np.vstack(signatures)
+    near_dup = write_with_clusters(tmp_file, output_file, ids, signature_matrix)
+    np.savez(SIGNATURES_FILE, ids=ids, signatures=signature_matrix, version=SIGNATURE_VERSION)
+
+    print(f"   - Clusters: {near_dup['clusters']:,}")
+    print(f"   - Comentários em clusters com variações: {near_dup['rows_in_clusters']:,}")
+    if near_dup['campaigns']:
+        print(f"🚩 Possíveis campanhas coordenadas (≥{CAMPAIGN_MIN_SIZE} variações):")
+        for cluster_id, size, text in near_dup['campaigns']:
+            text_preview = text[:80] + "..." if len(text) > 80 else text
+            print(f"   - Cluster {cluster_id}: {size:,} comentários | {text_preview}")
+
+    register_artifact(output_file, 'tiktok_consolidado_limpo', platform='TikTok', run=timestamp,
+                      dataset=TIKTOK_DIR, row_count=stats['total'])
+    save_state({
+        'output_file': output_file,
+        'updated_at': datetime.now().isoformat(),
+        'files': {**known, **checksums}
+    })
+
     print(f"💾 Arquivo consolidado salvo: {output_file}")
-    print(f"📋 Colunas: {list(consolidated_df.columns)}")
-    
+    print(f"📋 Colunas: {OUTPUT_COLUMNS + CLUSTER_COLUMNS}")
+
     # Estatísticas finais
     print(f"\n📈 Estatísticas finais:")
-    print(f"   - Total de comentários: {len(consolidated_df):,}")
-    print(f"   - Comentários com autor: {consolidated_df['author_handle'].notna().sum():,}")
-    print(f"   - Comentários com likes: {consolidated_df['like_count_visible'].notna().sum():,}")
-    print(f"   - Comentários com timestamp: {consolidated_df['timestamp_visible'].notna().sum():,}")
-    
+    print(f"   - Total de comentários: {stats['total']:,}")
+    print(f"   - Comentários com autor: {stats['with_author']:,}")
+    print(f"   - Comentários com likes: {stats['with_likes']:,}")
+    print(f"   - Comentários com timestamp: {stats['with_timestamp']:,}")
+
     # Amostra dos dados
     print(f"\n📝 Amostra dos dados:")
-    for i, row in consolidated_df.head(3).iterrows():
-        text_preview = row['text'][:100] + "..." if len(row['text']) > 100 else row['text']
+    for i, text in enumerate(stats['sample']):
+        text_preview = text[:100] + "..." if len(text) > 100 else text
         print(f"   {i+1}. {text_preview}")
-    
+
     return output_file
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consolidação dos CSVs do TikTok")
+    parser.add_argument("--full", action="store_true", help="Ignora o estado anterior e reconsolida tudo")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Arquivos lidos em paralelo")
+    args = parser.parse_args()
+
     print("🚀 Iniciando consolidação dos dados do TikTok...")
-    output_file = consolidate_tiktok_data()
+    output_file = consolidate_tiktok_data(full=args.full, workers=args.workers)
     print(f"✅ Consolidação concluída! Arquivo: {output_file}")
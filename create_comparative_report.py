@@ -4,8 +4,9 @@ Script para criar relatório comparativo entre Instagram, TikTok e YouTube
 """
 
 import pandas as pd
-import os
 from datetime import datetime
+from run_manifest import latest_artifact, register_artifact
+from report_aggregates import ALL_SCOPE, load_or_build_summary
 
 def create_comparative_report():
     """Cria relatório comparativo entre as três redes sociais"""
@@ -19,20 +20,15 @@ def create_comparative_report():
         'youtube': None
     }
     
-    # Buscar arquivo do Instagram (base limpa)
-    instagram_files = [f for f in os.listdir('.') if f.startswith('export_1757023553205_limpa')]
-    if instagram_files:
-        files['instagram'] = instagram_files[0]
+    # Buscar análise do Instagram (base limpa); a análise completa antiga fica como alternativa
+    files['instagram'] = (latest_artifact('ANALISE_INSTAGRAM_CORRIGIDO', platform='Instagram')
+                          or latest_artifact('ANALISE_COMPLETA_BASE_LIMPA', directory='.'))
     
     # Buscar arquivo do TikTok
-    tiktok_files = [f for f in os.listdir('out') if f.startswith('ANALISE_TIKTOK_SPACE_')]
-    if tiktok_files:
-        files['tiktok'] = sorted(tiktok_files)[-1]
+    files['tiktok'] = latest_artifact('ANALISE_TIKTOK_SPACE', platform='TikTok')
     
     # Buscar arquivo do YouTube
-    youtube_files = [f for f in os.listdir('out') if f.startswith('ANALISE_YOUTUBE_SPACE_')]
-    if youtube_files:
-        files['youtube'] = sorted(youtube_files)[-1]
+    files['youtube'] = latest_artifact('ANALISE_YOUTUBE_SPACE', platform='YouTube')
     
     print(f"📱 Arquivos encontrados:")
     for platform, file in files.items():
@@ -41,35 +37,30 @@ def create_comparative_report():
         else:
             print(f"   - {platform.upper()}: ❌ Não encontrado")
     
-    # Carregar dados
+    # Carregar resumos agregados (um único groupby por arquivo)
     data = {}
     
-    # Instagram (usar análise anterior se disponível)
-    instagram_analysis_files = [f for f in os.listdir('.') if f.startswith('ANALISE_COMPLETA_BASE_LIMPA_')]
-    if instagram_analysis_files:
-        instagram_file = sorted(instagram_analysis_files)[-1]
+    # Instagram
+    if files['instagram']:
         try:
-            df_insta = pd.read_csv(instagram_file)
-            data['instagram'] = df_insta
-            print(f"✅ Instagram: {len(df_insta):,} comentários carregados")
+            data['instagram'] = load_or_build_summary(files['instagram'])
+            print(f"✅ Instagram: {data['instagram']['scopes'][ALL_SCOPE]['total']:,} comentários carregados")
         except:
             print("⚠️  Erro ao carregar dados do Instagram")
     
     # TikTok
     if files['tiktok']:
         try:
-            df_tiktok = pd.read_csv(f"out/{files['tiktok']}")
-            data['tiktok'] = df_tiktok
-            print(f"✅ TikTok: {len(df_tiktok):,} comentários carregados")
+            data['tiktok'] = load_or_build_summary(files['tiktok'])
+            print(f"✅ TikTok: {data['tiktok']['scopes'][ALL_SCOPE]['total']:,} comentários carregados")
         except:
             print("⚠️  Erro ao carregar dados do TikTok")
     
     # YouTube
     if files['youtube']:
         try:
-            df_youtube = pd.read_csv(f"out/{files['youtube']}")
-            data['youtube'] = df_youtube
-            print(f"✅ YouTube: {len(df_youtube):,} comentários carregados")
+            data['youtube'] = load_or_build_summary(files['youtube'])
+            print(f"✅ YouTube: {data['youtube']['scopes'][ALL_SCOPE]['total']:,} comentários carregados")
         except:
             print("⚠️  Erro ao carregar dados do YouTube")
     
@@ -82,13 +73,14 @@ def create_comparative_report():
     
     print("\n📈 Gerando estatísticas comparativas...")
     
-    for platform, df in data.items():
-        total = len(df)
+    for platform, summary in data.items():
+        stats = summary['scopes'][ALL_SCOPE]
+        total = stats['total']
         
         # Contar HATE vs NÃO-HATE
-        if 'predicted_label' in df.columns:
-            hate_count = len(df[df['predicted_label'] == 'HATE'])
-            nao_hate_count = len(df[df['predicted_label'] == 'NÃO-HATE'])
+        if 'predicted_label' in summary['columns']:
+            hate_count = stats['hate']
+            nao_hate_count = stats['nao_hate']
             hate_percentage = (hate_count / total) * 100
             nao_hate_percentage = (nao_hate_count / total) * 100
         else:
@@ -96,26 +88,24 @@ def create_comparative_report():
         
         # Distribuição por método
         method_dist = {}
-        if 'method' in df.columns:
-            method_counts = df['method'].value_counts()
-            for method, count in method_counts.head(5).items():
+        if 'method' in summary['columns']:
+            for method, count in list(stats['methods'].items())[:5]:
                 method_dist[method] = f"{count:,} ({count/total*100:.1f}%)"
         
         # Distribuição por classe especializada (HATE)
         class_dist = {}
-        if 'specialized_class' in df.columns:
-            hate_df = df[df['predicted_label'] == 'HATE'] if 'predicted_label' in df.columns else df
-            if len(hate_df) > 0:
-                class_counts = hate_df['specialized_class'].value_counts()
-                for class_name, count in class_counts.items():
+        if 'specialized_class' in summary['columns']:
+            hate_rows = stats['hate_rows']
+            if hate_rows > 0:
+                for class_name, count in stats['hate_classes'].items():
                     if class_name != 'N/A':
-                        class_dist[class_name] = f"{count:,} ({count/len(hate_df)*100:.1f}%)"
+                        class_dist[class_name] = f"{count:,} ({count/hate_rows*100:.1f}%)"
         
         # Estatísticas de texto
-        if 'text' in df.columns:
-            avg_length = df['text'].str.len().mean()
-            max_length = df['text'].str.len().max()
-            min_length = df['text'].str.len().min()
+        if 'text' in summary['columns'] and stats['text_length']['mean'] is not None:
+            avg_length = stats['text_length']['mean']
+            max_length = stats['text_length']['max']
+            min_length = stats['text_length']['min']
         else:
             avg_length = max_length = min_length = 0
         
@@ -138,6 +128,9 @@ def create_comparative_report():
     # Criar DataFrame do relatório
     report_df = pd.DataFrame(report)
     report_df.to_csv(report_file, index=False, encoding='utf-8')
+    register_artifact(report_file, 'RELATORIO_COMPARATIVO_REDES_SOCIAIS', run=timestamp,
+                      dataset=','.join(file for file in files.values() if file),
+                      row_count=len(report_df))
     
     print(f"💾 Relatório salvo: {report_file}")
     
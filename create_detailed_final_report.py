@@ -3,29 +3,29 @@
 Script para criar relatório final detalhado da análise completa
 """
 
-import pandas as pd
-import os
 from datetime import datetime
+from run_manifest import latest_artifact, register_artifact
+from report_aggregates import ALL_SCOPE, confidence_count, load_or_build_summary
 
 def create_detailed_final_report():
     """Cria relatório final detalhado da análise completa"""
     
     # Buscar arquivo consolidado mais recente
-    consolidated_files = [f for f in os.listdir('out') if f.startswith('ANALISE_CONSOLIDADA_CORRIGIDA_')]
-    if not consolidated_files:
+    latest_file = latest_artifact('ANALISE_CONSOLIDADA_CORRIGIDA')
+    if not latest_file:
         print("❌ Arquivo consolidado não encontrado!")
         return
     
-    latest_file = sorted(consolidated_files)[-1]
     print(f"📊 Carregando arquivo: {latest_file}")
     
-    # Carregar dados
-    df = pd.read_csv(f'out/{latest_file}')
+    # Resumo agregado (um único groupby, reaproveitado se já existir)
+    summary = load_or_build_summary(latest_file)
+    overall = summary['scopes'][ALL_SCOPE]
     
     # Estatísticas gerais
-    total_all = len(df)
-    hate_all = len(df[df['predicted_label'] == 'HATE'])
-    nao_hate_all = len(df[df['predicted_label'] == 'NÃO-HATE'])
+    total_all = overall['total']
+    hate_all = overall['hate']
+    nao_hate_all = overall['nao_hate']
     
     print(f"\n🏳️‍🌈 RELATÓRIO FINAL - RADAR SOCIAL LGBTQIA")
     print(f"=" * 60)
@@ -40,10 +40,10 @@ def create_detailed_final_report():
     print(f"\n📱 RESULTADOS POR REDE SOCIAL:")
     platforms = ['Instagram', 'TikTok', 'YouTube']
     for platform in platforms:
-        platform_df = df[df['platform'] == platform]
-        if len(platform_df) > 0:
-            platform_hate = len(platform_df[platform_df['predicted_label'] == 'HATE'])
-            platform_total = len(platform_df)
+        platform_stats = summary['scopes'].get(platform)
+        if platform_stats and platform_stats['total'] > 0:
+            platform_hate = platform_stats['hate']
+            platform_total = platform_stats['total']
             platform_pct = platform_hate/platform_total*100
             
             # Determinar status de precisão
@@ -58,53 +58,51 @@ def create_detailed_final_report():
     
     # Distribuição por método
     print(f"\n🔧 MÉTODOS DE DETECÇÃO MAIS USADOS:")
-    method_counts = df['method'].value_counts()
-    for i, (method, count) in enumerate(method_counts.head(10).items(), 1):
+    for i, (method, count) in enumerate(list(overall['methods'].items())[:10], 1):
         pct = count/total_all*100
         print(f"   {i:2d}. {method}: {count:,} ({pct:.1f}%)")
     
     # Distribuição por classe especializada (HATE)
-    hate_df = df[df['predicted_label'] == 'HATE']
-    if len(hate_df) > 0:
+    if hate_all > 0:
         print(f"\n🎯 CLASSIFICAÇÃO ESPECIALIZADA (CASOS HATE):")
-        class_counts = hate_df['specialized_class'].value_counts()
-        for class_name, count in class_counts.items():
+        for class_name, count in overall['hate_classes'].items():
             if class_name != 'N/A':
-                pct = count/len(hate_df)*100
+                pct = count/hate_all*100
                 print(f"   - {class_name}: {count:,} ({pct:.1f}%)")
     
     # Análise de confiança
     print(f"\n📈 ANÁLISE DE CONFIANÇA:")
-    high_confidence = len(df[df['confidence'] >= 0.8])
-    medium_confidence = len(df[(df['confidence'] >= 0.6) & (df['confidence'] < 0.8)])
-    low_confidence = len(df[df['confidence'] < 0.6])
+    histogram = overall['confidence_histogram']
+    high_confidence = confidence_count(histogram['all'], 0.8)
+    medium_confidence = confidence_count(histogram['all'], 0.6, 0.8)
+    low_confidence = confidence_count(histogram['all'], 0.0, 0.6)
     
     print(f"   - Alta confiança (≥80%): {high_confidence:,} ({high_confidence/total_all*100:.1f}%)")
     print(f"   - Média confiança (60-79%): {medium_confidence:,} ({medium_confidence/total_all*100:.1f}%)")
     print(f"   - Baixa confiança (<60%): {low_confidence:,} ({low_confidence/total_all*100:.1f}%)")
     
     # Top casos de alta confiança HATE
-    high_conf_hate = df[(df['predicted_label'] == 'HATE') & (df['confidence'] >= 0.9)]
-    if len(high_conf_hate) > 0:
+    high_conf_hate = confidence_count(histogram['HATE'], 0.9)
+    if high_conf_hate > 0:
         print(f"\n⚠️  CASOS DE ALTA CONFIANÇA HATE (≥90%):")
-        print(f"   Total: {len(high_conf_hate):,} casos")
+        print(f"   Total: {high_conf_hate:,} casos")
         
         # Mostrar alguns exemplos
         print(f"\n📝 EXEMPLOS DE CASOS HATE DE ALTA CONFIANÇA:")
-        for i, (_, row) in enumerate(high_conf_hate.head(5).iterrows()):
+        for i, row in enumerate(summary['examples']['HATE']):
             text = row['text'][:100] + "..." if len(row['text']) > 100 else row['text']
             print(f"   {i+1}. [{row['platform']}] {text}")
             print(f"      Confiança: {row['confidence']:.1%} | Método: {row['method']}")
     
     # Top casos de alta confiança NÃO-HATE
-    high_conf_non_hate = df[(df['predicted_label'] == 'NÃO-HATE') & (df['confidence'] >= 0.9)]
-    if len(high_conf_non_hate) > 0:
+    high_conf_non_hate = confidence_count(histogram['NÃO-HATE'], 0.9)
+    if high_conf_non_hate > 0:
         print(f"\n✅ CASOS DE ALTA CONFIANÇA NÃO-HATE (≥90%):")
-        print(f"   Total: {len(high_conf_non_hate):,} casos")
+        print(f"   Total: {high_conf_non_hate:,} casos")
         
         # Mostrar alguns exemplos
         print(f"\n📝 EXEMPLOS DE CASOS NÃO-HATE DE ALTA CONFIANÇA:")
-        for i, (_, row) in enumerate(high_conf_non_hate.head(5).iterrows()):
+        for i, row in enumerate(summary['examples']['NÃO-HATE']):
             text = row['text'][:100] + "..." if len(row['text']) > 100 else row['text']
             print(f"   {i+1}. [{row['platform']}] {text}")
             print(f"      Confiança: {row['confidence']:.1%} | Método: {row['method']}")
@@ -136,12 +134,14 @@ def create_detailed_final_report():
         
         f.write("RESULTADOS POR PLATAFORMA:\n")
         for platform in platforms:
-            platform_df = df[df['platform'] == platform]
-            if len(platform_df) > 0:
-                platform_hate = len(platform_df[platform_df['predicted_label'] == 'HATE'])
-                platform_total = len(platform_df)
+            platform_stats = summary['scopes'].get(platform)
+            if platform_stats and platform_stats['total'] > 0:
+                platform_hate = platform_stats['hate']
+                platform_total = platform_stats['total']
                 f.write(f"{platform}: {platform_hate:,}/{platform_total:,} ({platform_hate/platform_total*100:.1f}% HATE)\n")
     
+    register_artifact(report_file, 'RELATORIO_FINAL_DETALHADO', run=timestamp, dataset=latest_file,
+                      row_count=total_all)
     print(f"\n💾 Relatório detalhado salvo: {report_file}")
     
     return report_file
@@ -4,8 +4,9 @@ Script para criar relatório final consolidado com todos os datasets corrigidos
 """
 
 import pandas as pd
-import os
 from datetime import datetime
+from report_aggregates import ALL_SCOPE, build_summary, save_summary, summary_path
+from run_manifest import latest_artifact, register_artifact
 
 def create_final_consolidated_report():
     """Cria relatório final consolidado com todos os datasets corrigidos"""
@@ -17,12 +18,10 @@ def create_final_consolidated_report():
         'YouTube': None
     }
     
-    # Buscar arquivos mais recentes
+    # Buscar arquivos mais recentes (manifesto de execuções)
     for platform in files.keys():
-        pattern = f"ANALISE_{platform.upper()}_CORRIGIDO_"
-        matching_files = [f for f in os.listdir('out') if f.startswith(pattern)]
-        if matching_files:
-            files[platform] = sorted(matching_files)[-1]
+        files[platform] = latest_artifact(f"ANALISE_{platform.upper()}_CORRIGIDO", platform=platform,
+                                          formats=('.csv',))
     
     print("📊 Criando relatório final consolidado...")
     print("📱 Arquivos encontrados:")
@@ -38,7 +37,7 @@ def create_final_consolidated_report():
     for platform, file in files.items():
         if file:
             try:
-                df = pd.read_csv(f"out/{file}")
+                df = pd.read_csv(file)
                 data[platform] = df
                 print(f"✅ {platform}: {len(df):,} comentários carregados")
             except Exception as e:
@@ -59,13 +58,21 @@ def create_final_consolidated_report():
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     consolidated_file = f"out/RELATORIO_FINAL_CONSOLIDADO_CORRIGIDO_{timestamp}.csv"
     consolidated_df.to_csv(consolidated_file, index=False, encoding='utf-8')
+    register_artifact(consolidated_file, 'RELATORIO_FINAL_CONSOLIDADO_CORRIGIDO', run=timestamp,
+                      dataset=','.join(file for file in files.values() if file),
+                      row_count=len(consolidated_df))
     
     print(f"💾 Relatório consolidado salvo: {consolidated_file}")
     
+    # Resumo agregado (um único groupby) salvo ao lado do consolidado
+    summary = build_summary(consolidated_df, source=consolidated_file)
+    print(f"💾 Resumo agregado salvo: {save_summary(summary, summary_path(consolidated_file))}")
+    overall = summary['scopes'][ALL_SCOPE]
+    
     # Estatísticas gerais
-    total_all = len(consolidated_df)
-    hate_all = len(consolidated_df[consolidated_df['predicted_label'] == 'HATE'])
-    nao_hate_all = len(consolidated_df[consolidated_df['predicted_label'] == 'NÃO-HATE'])
+    total_all = overall['total']
+    hate_all = overall['hate']
+    nao_hate_all = overall['nao_hate']
     
     print(f"\n🌐 ESTATÍSTICAS GERAIS (TODAS AS PLATAFORMAS):")
     print(f"   - Total de comentários: {total_all:,}")
@@ -75,26 +82,22 @@ def create_final_consolidated_report():
     # Estatísticas por plataforma
     print(f"\n📱 ESTATÍSTICAS POR PLATAFORMA:")
     for platform in ['Instagram', 'TikTok', 'YouTube']:
-        if platform in data:
-            platform_df = consolidated_df[consolidated_df['platform'] == platform]
-            platform_hate = len(platform_df[platform_df['predicted_label'] == 'HATE'])
-            platform_total = len(platform_df)
+        if platform in data and platform in summary['scopes']:
+            platform_hate = summary['scopes'][platform]['hate']
+            platform_total = summary['scopes'][platform]['total']
             print(f"   - {platform}: {platform_hate:,}/{platform_total:,} ({platform_hate/platform_total*100:.1f}% HATE)")
     
     # Distribuição por método geral
     print(f"\n🔧 TOP MÉTODOS DE DETECÇÃO (GERAL):")
-    method_counts = consolidated_df['method'].value_counts()
-    for method, count in method_counts.head(10).items():
+    for method, count in list(overall['methods'].items())[:10]:
         print(f"   - {method}: {count:,} ({count/total_all*100:.1f}%)")
     
     # Distribuição por classe especializada (HATE)
-    hate_df = consolidated_df[consolidated_df['predicted_label'] == 'HATE']
-    if len(hate_df) > 0:
+    if hate_all > 0:
         print(f"\n🎯 DISTRIBUIÇÃO POR CLASSE ESPECIALIZADA (HATE):")
-        class_counts = hate_df['specialized_class'].value_counts()
-        for class_name, count in class_counts.items():
+        for class_name, count in overall['hate_classes'].items():
             if class_name != 'N/A':
-                print(f"   - {class_name}: {count:,} ({count/len(hate_df)*100:.1f}%)")
+                print(f"   - {class_name}: {count:,} ({count/hate_all*100:.1f}%)")
     
     # Comparação com resultados anteriores
     print(f"\n📈 COMPARAÇÃO COM RESULTADOS ANTERIORES:")
@@ -5,134 +5,41 @@ Usa Flask para criar endpoint de inferência
 """
 
 from flask import Flask, request, jsonify
-import pandas as pd
 import numpy as np
-import joblib
 import os
-import re
 from datetime import datetime
-import json
+from predict_hate_speech import HateSpeechDetector
+from inference_config import configure_inference, describe
+from feature_cache import FEATURE_CACHE_SIZE, FEATURE_CACHE_MB
 import logging
+import gc
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Requisições concorrentes (threaded=True): cada uma com uma fatia dos núcleos
+# nos pools BLAS/OpenMP, sem empilhar threads (INFERENCE_MODE sobrepõe)
+INFERENCE_PLAN = configure_inference(os.environ.get('INFERENCE_MODE', 'multi_worker'))
+
 # Inicializar Flask
 app = Flask(__name__)
 
-# Classe do detector (mesma do script de inferência)
-class HateSpeechDetector:
-    """Classe para detecção de discurso de ódio"""
-    
-    def __init__(self, model_path=None, threshold_path=None):
-        """Inicializa o detector com modelo e threshold"""
-        self.model = None
-        self.threshold = 0.5
-        self.model_path = model_path
-        self.threshold_path = threshold_path
-        
-        # Carregar modelo e threshold se especificados
-        if model_path and os.path.exists(model_path):
-            self.load_model(model_path)
-        
-        if threshold_path and os.path.exists(threshold_path):
-            self.load_threshold(threshold_path)
-    
-    def load_model(self, model_path):
-        """Carrega modelo treinado"""
-        try:
-            self.model = joblib.load(model_path)
-            self.model_path = model_path
-            logger.info(f"Modelo carregado: {model_path}")
-            return True
-        except Exception as e:
-            logger.error(f"Erro ao carregar modelo: {e}")
-            return False
-    
-    def load_threshold(self, threshold_path):
-        """Carrega informações de threshold"""
-        try:
-            with open(threshold_path, 'r', encoding='utf-8') as f:
-                threshold_info = json.load(f)
-            self.threshold = threshold_info.get('threshold', 0.5)
-            logger.info(f"Threshold carregado: {self.threshold:.2f}")
-            return True
-        except Exception as e:
-            logger.error(f"Erro ao carregar threshold: {e}")
-            return False
-    
-    def normalize_text(self, text):
-        """Normaliza texto para análise"""
-        if pd.isna(text) or text == "":
-            return ""
-        
-        # Converter para string e limpar
-        text = str(text).strip()
-        
-        # Remover URLs
-        text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
-        
-        # Remover menções e hashtags
-        text = re.sub(r'@\w+', '', text)
-        text = re.sub(r'#\w+', '', text)
-        
-        # Remover caracteres especiais excessivos
-        text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)]', ' ', text)
-        
-        # Normalizar espaços
-        text = re.sub(r'\s+', ' ', text)
-        
-        return text.strip()
-    
-    def predict_single(self, text):
-        """Prediz se um texto é discurso de ódio"""
-        if not self.model:
-            raise ValueError("Modelo não carregado")
-        
-        # Normalizar texto
-        normalized_text = self.normalize_text(text)
-        
-        if len(normalized_text) < 3:
-            return {
-                'text': text,
-                'normalized_text': normalized_text,
-                'is_hate': 0,
-                'hate_probability': 0.0,
-                'confidence': 'low',
-                'warning': 'Texto muito curto'
-            }
-        
-        # Obter probabilidades
-        probabilities = self.model.predict_proba([normalized_text])
-        hate_probability = probabilities[0][1]
-        
-        # Aplicar threshold
-        is_hate = 1 if hate_probability >= self.threshold else 0
-        
-        # Determinar confiança
-        if hate_probability < 0.3:
-            confidence = 'low'
-        elif hate_probability > 0.7:
-            confidence = 'high'
-        else:
-            confidence = 'medium'
-        
-        return {
-            'text': text,
-            'normalized_text': normalized_text,
-            'is_hate': is_hate,
-            'hate_probability': float(hate_probability),
-            'confidence': confidence,
-            'threshold_used': self.threshold
-        }
-
-# Inicializar detector global
+# Inicializar detector global (o mesmo do script de inferência, com cache de features)
 detector = HateSpeechDetector(
     model_path='out/modelo_otimizado_20251010_150123.pkl',
-    threshold_path='out/threshold_info_20251010_150123.json'
+    threshold_path='out/threshold_info_20251010_150123.json',
+    feature_cache_size=FEATURE_CACHE_SIZE,
+    feature_cache_mb=FEATURE_CACHE_MB
 )
 
+# Arrays do modelo já são páginas compartilhadas (mmap); o resto (vocabulário,
+# um dict que não pode ser mapeado) fica fora do coletor para não ser copiado
+# nos workers com fork. Só é compartilhado com gunicorn --preload
+# create_production_api:app: sem --preload cada worker importa o módulo,
+# carrega o próprio detector e este gc.freeze() vale só para ele
+gc.freeze()
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Endpoint de health check"""
@@ -189,19 +96,8 @@ def predict_batch():
         if len(texts) > 100:  # Limite de segurança
             return jsonify({'error': 'Máximo de 100 textos por lote'}), 400
         
-        # Fazer predições
-        results = []
-        for text in texts:
-            try:
-                result = detector.predict_single(text)
-                results.append(result)
-            except Exception as e:
-                results.append({
-                    'text': text,
-                    'error': str(e),
-                    'is_hate': 0,
-                    'hate_probability': 0.0
-                })
+        # Fazer predições (vetorização e predict_proba em lote)
+        results = detector.predict_batch(texts)
         
         return jsonify({
             'success': True,
@@ -229,6 +125,7 @@ def get_stats():
                 'threshold': detector.threshold,
                 'model_path': detector.model_path,
                 'threshold_path': detector.threshold_path,
+                'feature_cache': detector.feature_cache.stats() if detector.feature_cache else None,
                 'timestamp': datetime.now().isoformat()
             }
         })
@@ -278,6 +175,7 @@ if __name__ == '__main__':
     logger.info("🚀 Iniciando API de detecção de discurso de ódio...")
     logger.info(f"📊 Modelo: {detector.model_path}")
     logger.info(f"🎯 Threshold: {detector.threshold:.2f}")
+    logger.info(f"🧵 Inferência {describe(INFERENCE_PLAN)}")
     
     # Executar Flask
     app.run(
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Deduplicação antes da inferência
+Agrupa as linhas pelo hash do texto, classifica cada texto único uma vez e
+replica o resultado para todas as linhas do grupo
+
+A chave depende do que o classificador enxerga:
+- profile=None: texto bruto (motor de regras do Space, que depende de
+  emojis, pontuação e caixa do comentário original)
+- profile='ensemble'/'space'/'sklearn': texto normalizado pelo perfil do
+  modelo (textos com a mesma forma normalizada têm a mesma predição)
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from text_normalization import get_normalizer
+
+MAX_CACHED_RESULTS = 200000  # Resultados mantidos entre lotes (LRU)
+
+def text_hash(text):
+    """Hash curto e estável de um texto"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+def dedup_keys(texts, profile=None):
+    """Chaves de deduplicação (hash do texto bruto ou normalizado)"""
+    if profile is None:
+        return [text_hash(str(text)) for text in texts]
+    normalize = get_normalizer(profile)
+    return [text_hash(normalize(text)) for text in texts]
+
+def group_duplicates(texts, profile=None):
+    """Agrupa textos iguais
+
+    Retorna (códigos, representantes): codes[i] é o grupo da linha i e
+    representatives[g] é a primeira linha do grupo g.
+    """
+    codes, uniques = pd.factorize(pd.Series(dedup_keys(texts, profile)))
+    first_rows = pd.Series(range(len(codes))).groupby(codes).min()
+    return codes, first_rows.reindex(range(len(uniques))).tolist()
+
+def dedup_stats(rows, unique):
+    """Estatísticas de deduplicação"""
+    return {
+        'rows': rows,
+        'unique': unique,
+        'duplicates': rows - unique,
+        'dedup_ratio': (rows - unique) / rows if rows else 0.0
+    }
+
+class DedupClassifier:
+    """Classificador em lote com deduplicação e reuso entre chamadas
+
+    classify_batch recebe uma lista de textos e devolve uma lista de dicts.
+    Resultados de textos já vistos em lotes anteriores (outras plataformas,
+    blocos anteriores do CSV) são reaproveitados via LRU.
+    """
+
+    def __init__(self, classify_batch, profile=None, maxsize=MAX_CACHED_RESULTS):
+        self.classify_batch = classify_batch
+        self.profile = profile
+        self.maxsize = maxsize
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.rows = 0
+        self.classified = 0
+
+    def classify(self, texts):
+        """Classifica a lista, rodando o modelo só nos textos inéditos"""
+        keys = dedup_keys(texts, self.profile)
+
+        with self._lock:
+            pending = {}
+            for key, text in zip(keys, texts):
+                if key not in self._results and key not in pending:
+                    pending[key] = text
+
+        if pending:
+            predictions = self.classify_batch(list(pending.values()))
+            with self._lock:
+                for key, prediction in zip(pending, predictions):
+                    self._results[key] = prediction
+
+        with self._lock:
+            self.rows += len(texts)
+            self.classified += len(pending)
+            # Cópia por linha: quem consome pode alterar o dict sem afetar as demais
+            results = [
+                dict(self._results[key]) if self._results[key] is not None else None
+                for key in keys
+            ]
+            for key in keys:
+                self._results.move_to_end(key)
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+        return results
+
+    def stats(self):
+        """Linhas recebidas, textos classificados e taxa de deduplicação"""
+        return dedup_stats(self.rows, self.classified)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Cache de vetores de features esparsos do pipeline sklearn (caminho de serving)
+A vetorização (TF-IDF) do texto normalizado é a maior parte do custo de uma
+predição; o tráfego repete muito comentário curto, então o pipeline é
+dividido em features (todos os passos menos o último) e classificador, e as
+linhas esparsas já vetorizadas ficam num LRU limitado por entradas e bytes
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import scipy.sparse as sp
+
+FEATURE_CACHE_SIZE = 50000
+FEATURE_CACHE_MB = float(os.environ.get('FEATURE_CACHE_MB', 64))
+
+def split_pipeline(model):
+    """(features, classificador) de um Pipeline sklearn; None se não der para dividir"""
+    steps = getattr(model, 'steps', None)
+    if not steps or len(steps) < 2:
+        return None
+    return model[:-1], model[-1]
+
+def row_bytes(row):
+    """Bytes de uma linha CSR (dados + índices + ponteiros)"""
+    return row.data.nbytes + row.indices.nbytes + row.indptr.nbytes
+
+class FeatureCache:
+    """LRU de textos normalizados -> linhas esparsas (CSR) do vetorizador"""
+
+    def __init__(self, vectorizer, maxsize=FEATURE_CACHE_SIZE, max_mb=FEATURE_CACHE_MB):
+        self.vectorizer = vectorizer
+        self.maxsize = maxsize
+        self.max_bytes = int(max_mb * 2**20)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _evict(self):
+        """Remove os mais antigos até caber nos limites (chamar com o lock)"""
+        while self._entries and (len(self._entries) > self.maxsize or self.bytes > self.max_bytes):
+            _, (_, size) = self._entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def transform(self, normalized_texts):
+        """Matriz CSR dos textos (já normalizados), vetorizando só os ausentes, num lote"""
+        rows = [None] * len(normalized_texts)
+        missing = {}
+        with self._lock:
+            for i, text in enumerate(normalized_texts):
+                entry = self._entries.get(text)
+                if entry is not None:
+                    self._entries.move_to_end(text)
+                    self.hits += 1
+                    rows[i] = entry[0]
+                else:
+                    missing.setdefault(text, []).append(i)
+
+        if missing:
+            texts = list(missing)
+            features = sp.csr_matrix(self.vectorizer.transform(texts))
+            with self._lock:
+                for j, text in enumerate(texts):
+                    row = features[j]
+                    for i in missing[text]:
+                        rows[i] = row
+                    self.misses += len(missing[text])
+                    if text not in self._entries:
+                        size = row_bytes(row) + sys.getsizeof(text)
+                        self._entries[text] = (row, size)
+                        self.bytes += size
+                self._evict()
+
+        return sp.vstack(rows, format='csr')
+
+    def clear(self):
+        """Esvazia o cache e zera os contadores"""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """Estatísticas de uso do cache"""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'maxsize': self.maxsize,
+            'mb': self.bytes / 2**20,
+            'max_mb': self.max_bytes / 2**20,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0
+        }
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Corpus de saídas de referência (golden) do predict_hate_speech
+Guarda rótulo, método, classe especializada e probabilidade de cada texto
+do conjunto anotado do Instagram e de amostras das três plataformas; o
+verificador roda o corpus em vários processos e compara com o snapshot,
+para provar que uma otimização nas regras ou na inferência não mudou
+nenhuma saída
+
+Uso:
+  python golden_corpus.py snapshot --workers 4
+  python golden_corpus.py verify --workers 4
+  python golden_corpus.py verify --path batch   # predict_hate_speech_batch contra o mesmo snapshot
+"""
+
+import os
+import json
+import time
+import argparse
+import subprocess
+import multiprocessing as mp
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from dedup_inference import text_hash
+from results_io import read_results, write_results
+from run_manifest import latest_artifact
+from sharded_classifier import threads_per_worker
+
+GOLDEN_FILE = "golden/predict_hate_speech_golden.parquet"
+INSTAGRAM_FILE = "clean-annotated-data/export_1757023553205_limpa.csv"
+DATASET_KIND = 'dataset_three_platforms'
+SAMPLES_PER_PLATFORM = 1000
+SEED = 42
+SHARD_SIZE = 200
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)  # Cada processo carrega os dois modelos
+PROBABILITY_ATOL = 1e-6  # Diferença de float tolerada (threads/lotes mudam a ordem das somas)
+OUTPUT_FIELDS = ['is_hate', 'method', 'specialized_class', 'hate_probability']
+EXACT_FIELDS = ['is_hate', 'method', 'specialized_class']
+MAX_PRINTED_DIFFS = 10
+
+# Estado de cada processo
+_predict = None
+_load_error = None
+
+def _init_worker(num_threads, path):
+    """Carrega o app no processo com o número de threads ajustado
+
+    Sem modelos o app cai no fallback por palavras-chave, cujas saídas não
+    podem virar nem ser comparadas com a referência: o erro é reportado por
+    _predict_shard (exceção no initializer faz o Pool recriar o processo sem fim).
+    """
+    global _predict, _load_error
+    # O app aplica as threads ao ser importado (inference_config)
+    os.environ['TORCH_NUM_THREADS'] = str(num_threads)
+    os.environ['TORCH_INTEROP_THREADS'] = '1'
+
+    try:
+        import app_space_version as app
+    except Exception as e:
+        _load_error = f"app indisponível: {e}"
+        return
+    if not hasattr(app, 'model_scheduler'):
+        _load_error = "modelos não carregados (app em modo fallback)"
+    elif path == 'batch':
+        _predict = app.predict_hate_speech_batch
+    else:
+        _predict = lambda texts: [app.predict_hate_speech(text) for text in texts]
+
+def _predict_shard(shard):
+    """Saídas de um shard (shard_id, textos) no processo atual"""
+    shard_id, texts = shard
+    if _predict is None:
+        raise RuntimeError(_load_error)
+    rows = []
+    for result in _predict(texts):
+        rows.append((
+            bool(result['is_hate']),
+            str(result.get('method', 'model_prediction')),
+            str(result['specialized_class']),
+            float(result['hate_probability']),
+            bool(result.get('rule_budget_exceeded', False))
+        ))
+    return shard_id, rows
+
+def run_corpus(texts, workers=DEFAULT_WORKERS, path='scalar', shard_size=SHARD_SIZE):
+    """Classifica os textos em N processos; retorna DataFrame na ordem original"""
+    shards = [(shard_id, texts[start:start + shard_size])
+              for shard_id, start in enumerate(range(0, len(texts), shard_size))]
+    context = mp.get_context('spawn')
+    rows = [None] * len(shards)
+    with context.Pool(workers, initializer=_init_worker, initargs=(threads_per_worker(workers), path)) as pool:
+        for shard_id, shard_rows in pool.imap_unordered(_predict_shard, shards):
+            rows[shard_id] = shard_rows
+    return pd.DataFrame(
+        [row for shard_rows in rows for row in shard_rows],
+        columns=OUTPUT_FIELDS + ['rule_budget_exceeded']
+    )
+
+# --- Corpus ---
+def build_corpus(samples_per_platform=SAMPLES_PER_PLATFORM):
+    """Textos únicos do Instagram anotado + amostra fixa por plataforma"""
+    parts = []
+    if os.path.exists(INSTAGRAM_FILE):
+        instagram = pd.read_csv(INSTAGRAM_FILE, sep=';', usecols=['Comment Text'])
+        parts.append(pd.DataFrame({'source': 'instagram_anotado', 'text': instagram['Comment Text']}))
+    else:
+        print(f"⚠️  Conjunto anotado não encontrado: {INSTAGRAM_FILE}")
+
+    dataset = latest_artifact(DATASET_KIND, directory='datasets')
+    if dataset:
+        df = read_results(dataset, columns=['text', 'platform'])
+        df = df.dropna(subset=['text'])
+        sample = df.sample(frac=1, random_state=SEED).groupby('platform', observed=True).head(samples_per_platform)
+        parts.append(pd.DataFrame({'source': 'amostra_' + sample['platform'].astype(str).str.lower(),
+                                   'text': sample['text']}))
+    else:
+        print("⚠️  Dataset das três plataformas não encontrado (rode update_dataset_three_platforms.py)")
+
+    if not parts:
+        raise FileNotFoundError("nenhuma fonte de textos para o corpus")
+
+    corpus = pd.concat(parts, ignore_index=True)
+    corpus = corpus[corpus['text'].notna()]
+    corpus['text'] = corpus['text'].astype(str)
+    corpus = corpus[corpus['text'].str.strip() != '']
+    corpus.insert(0, 'key', [text_hash(text) for text in corpus['text']])
+    return corpus.drop_duplicates('key').reset_index(drop=True)
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def metadata_path(golden_file):
+    return os.path.splitext(golden_file)[0] + '.json'
+
+def snapshot(golden_file=GOLDEN_FILE, workers=DEFAULT_WORKERS, samples_per_platform=SAMPLES_PER_PLATFORM):
+    """Gera o snapshot de referência com as saídas atuais"""
+    corpus = build_corpus(samples_per_platform)
+    print(f"📸 Gerando snapshot de {len(corpus):,} textos com {workers} processo(s)...")
+    start = time.time()
+    outputs = run_corpus(corpus['text'].tolist(), workers)
+    elapsed = time.time() - start
+
+    golden = pd.concat([corpus, outputs], axis=1)
+    write_results(golden, golden_file)
+    metadata = {
+        'created_at': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'rows': len(golden),
+        'sources': golden['source'].value_counts().to_dict(),
+        'rule_budget_exceeded': int(golden['rule_budget_exceeded'].sum()),
+        'seconds': elapsed
+    }
+    with open(metadata_path(golden_file), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+
+    print(f"✅ {len(golden):,} saídas em {elapsed:.1f}s")
+    if metadata['rule_budget_exceeded']:
+        print(f"⚠️  {metadata['rule_budget_exceeded']} textos estouraram o orçamento das regras "
+              f"(a saída depende do tempo; diferenças nessas linhas podem não ser regressões)")
+    print(f"💾 Snapshot salvo: {golden_file}")
+    return golden_file
+
+# --- Verificação ---
+def diff_outputs(golden, current, atol=PROBABILITY_ATOL):
+    """Linhas divergentes (uma por campo) entre o snapshot e a execução atual"""
+    mismatch = {field: golden[field].astype(str).values != current[field].astype(str).values
+                for field in EXACT_FIELDS}
+    mismatch['hate_probability'] = ~np.isclose(golden['hate_probability'].to_numpy(dtype=float),
+                                               current['hate_probability'].to_numpy(dtype=float),
+                                               rtol=0.0, atol=atol)
+    diffs = [
+        pd.DataFrame({
+            'key': golden['key'][mask].values,
+            'source': golden['source'][mask].astype(str).values,
+            'text': golden['text'][mask].values,
+            'field': field,
+            'golden': golden[field][mask].astype(str).values,
+            'current': current[field][mask].astype(str).values,
+            'rule_budget_exceeded': current['rule_budget_exceeded'][mask].values
+        })
+        for field, mask in mismatch.items() if mask.any()
+    ]
+    if not diffs:
+        return pd.DataFrame(columns=['key', 'source', 'text', 'field', 'golden', 'current', 'rule_budget_exceeded'])
+    return pd.concat(diffs, ignore_index=True)
+
+def verify(golden_file=GOLDEN_FILE, workers=DEFAULT_WORKERS, path='scalar', atol=PROBABILITY_ATOL, limit=None):
+    """Roda o corpus e compara com o snapshot; retorna o nº de textos divergentes"""
+    golden = read_results(golden_file)
+    if limit:
+        golden = golden.head(limit)
+    print(f"🔍 Verificando {len(golden):,} textos ({path}) com {workers} processo(s)...")
+
+    start = time.time()
+    current = run_corpus(golden['text'].astype(str).tolist(), workers, path)
+    elapsed = time.time() - start
+    diffs = diff_outputs(golden.reset_index(drop=True), current, atol)
+
+    print(f"⏱️  {len(golden):,} textos em {elapsed:.1f}s ({len(golden)/max(elapsed, 1e-9):,.0f} textos/s)")
+    if diffs.empty:
+        print("✅ Saídas idênticas ao snapshot")
+        return 0
+
+    changed = diffs['key'].nunique()
+    print(f"❌ {changed:,} textos divergentes ({changed/len(golden)*100:.2f}%)")
+    for field, count in diffs['field'].value_counts().items():
+        print(f"   - {field}: {count:,}")
+    budget = diffs.loc[diffs['rule_budget_exceeded'], 'key'].nunique()
+    if budget:
+        print(f"   ⚠️  {budget} deles estouraram o orçamento das regras nesta execução")
+    for row in diffs.head(MAX_PRINTED_DIFFS).itertuples():
+        print(f"   • [{row.field}] {row.golden} → {row.current} | {row.text[:80]!r}")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs('out', exist_ok=True)
+    diff_file = f"out/golden_diff_{timestamp}.csv"
+    diffs.to_csv(diff_file, index=False, encoding='utf-8')
+    print(f"💾 Diferenças salvas: {diff_file}")
+    return changed
+
+def main():
+    parser = argparse.ArgumentParser(description='Corpus golden do predict_hate_speech')
+    parser.add_argument('command', choices=['snapshot', 'verify'], help='Gerar o snapshot ou verificar contra ele')
+    parser.add_argument('--golden', default=GOLDEN_FILE, help='Arquivo do snapshot')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Processos (cada um carrega os modelos)')
+    parser.add_argument('--samples-per-platform', type=int, default=SAMPLES_PER_PLATFORM,
+                        help='Textos amostrados por plataforma no snapshot')
+    parser.add_argument('--path', choices=['scalar', 'batch'], default='scalar',
+                        help='Caminho verificado: predict_hate_speech ou predict_hate_speech_batch')
+    parser.add_argument('--atol', type=float, default=PROBABILITY_ATOL, help='Tolerância da probabilidade')
+    parser.add_argument('--limit', type=int, help='Verificar só os primeiros N textos')
+    args = parser.parse_args()
+
+    if args.command == 'verify' and not os.path.exists(args.golden):
+        print(f"❌ Snapshot não encontrado: {args.golden} (rode 'python golden_corpus.py snapshot')")
+        exit(1)
+    try:
+        if args.command == 'snapshot':
+            snapshot(args.golden, args.workers, args.samples_per_platform)
+            return
+        if verify(args.golden, args.workers, args.path, args.atol, args.limit):
+            exit(1)
+    except RuntimeError as e:
+        print(f"❌ {args.command} interrompido: {e}")
+        exit(1)
+
+if __name__ == "__main__":
+    main()
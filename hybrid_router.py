@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Roteamento híbrido: regras → pipeline sklearn → BERT só nos casos incertos
+Os comentários que as regras do app não decidem passam primeiro pelo
+pipeline joblib do HateSpeechDetector; só os que caem na faixa de incerteza
+(ou que o sklearn não pontua) sobem para o ensemble BERT. Quando o sklearn
+decide hate, o modelo especializado ainda roda para obter a classe.
+
+A avaliação roda o caminho só-BERT e o híbrido no conjunto anotado do
+Instagram e reporta a taxa de escalonamento e a diferença de acurácia,
+com uma varredura de faixas (simulada sobre as mesmas saídas)
+
+Uso:
+  python hybrid_router.py --band 0.3 0.7
+  python hybrid_router.py --input datasets/comentarios.csv --column text   # sem rótulos: só concordância
+"""
+
+import os
+import json
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from predict_hate_speech import HateSpeechDetector
+from feature_cache import FEATURE_CACHE_SIZE
+from run_manifest import register_artifact
+from threshold_calibration import ANNOTATED_FILE, HATE_ANNOTATION, SKLEARN_MODEL, SKLEARN_THRESHOLD
+
+DEFAULT_BAND = (0.3, 0.7)  # Faixa de confiança 'medium' do HateSpeechDetector
+SWEEP_BANDS = ((0.45, 0.55), (0.4, 0.6), (0.3, 0.7), (0.2, 0.8), (0.1, 0.9), (0.05, 0.95))
+BATCH_SIZE = 32
+ROUTER_METHOD = 'sklearn_router'
+MODEL_METHOD = 'model_prediction'
+
+def defer_to_model(text, budget_exceeded=False):
+    return {'deferred': True, 'rule_budget_exceeded': budget_exceeded}
+
+def escalation_mask(probabilities, scored, guarded, band):
+    """Textos que sobem para o BERT: não pontuados, dentro da faixa ou hate protegido"""
+    low, high = band
+    uncertain = (probabilities >= low) & (probabilities <= high)
+    return ~scored | uncertain | (guarded & (probabilities > high))
+
+class HybridRouter:
+    """Regras do app → sklearn → ensemble BERT só na faixa de incerteza
+
+    Nos resultados decididos pelo sklearn, hate_probability é a probabilidade
+    do pipeline sklearn (escala diferente do THRESHOLD do BERT); method
+    identifica a origem de cada decisão.
+    """
+
+    def __init__(self, app, detector, band=DEFAULT_BAND):
+        low, high = band
+        if not 0.0 <= low <= high <= 1.0:
+            raise ValueError(f"Faixa de incerteza inválida: {band}")
+        self.app = app
+        self.detector = detector
+        self.band = (low, high)
+        self.stats = {'texts': 0, 'rules': 0, 'sklearn': 0, 'escalated': 0}
+
+    def rule_pass(self, texts):
+        """Resultados das regras; os não decididos ficam marcados como adiados"""
+        results = [self.app.predict_hate_speech(text, model_predict=defer_to_model) for text in texts]
+        return results, [i for i, result in enumerate(results) if result.get('deferred')]
+
+    def sklearn_pass(self, texts):
+        """Probabilidade sklearn, máscara de pontuados e de protegidos por texto
+
+        Protegidos são os textos em que o app zera a probabilidade do BERT
+        (padrão LGBTQIA+ com adjetivo positivo); se o sklearn os julgar hate,
+        a decisão fica com o BERT.
+        """
+        scores = self.detector.score_batch(texts)
+        probabilities = scores['hate_probability']
+        scored = scores['scored']
+        guarded = np.zeros(len(texts), dtype=bool)
+        for i in np.flatnonzero(scored & (probabilities > self.band[1])):
+            rule_text = self.app.window_rule_text(texts[i])
+            guarded[i] = self.app.is_lgbtqia_pattern(rule_text) and self.app.has_positive_adjective(rule_text)
+        return probabilities, scored, guarded
+
+    def specialized_classes(self, texts):
+        """Classe do modelo especializado para textos decididos como hate"""
+        import torch
+
+        app = self.app
+        class_mapping = {0: "Transfobia", 1: "Assédio/Insulto"}
+        classes = []
+        for start in range(0, len(texts), BATCH_SIZE):
+            normalized = [app.normalize_text(str(text)[:app.MODEL_MAX_CHARS]) for text in texts[start:start + BATCH_SIZE]]
+            inputs = app.tokenizer_specialized(normalized, return_tensors="pt", padding=True,
+                                               truncation=True, max_length=512)
+            with torch.no_grad():
+                predictions = torch.argmax(app.model_specialized(**inputs).logits, dim=-1)
+            classes.extend(class_mapping.get(prediction, "Assédio/Insulto") for prediction in predictions.tolist())
+        return classes
+
+    def predict_batch(self, texts):
+        """Predição em lote pelo roteamento híbrido (mesmo formato de predict_hate_speech_batch)"""
+        results, model_rows = self.rule_pass(texts)
+        self.stats['texts'] += len(texts)
+        self.stats['rules'] += len(texts) - len(model_rows)
+        if not model_rows:
+            return results
+
+        model_texts = [texts[i] for i in model_rows]
+        probabilities, scored, guarded = self.sklearn_pass(model_texts)
+        escalate = escalation_mask(probabilities, scored, guarded, self.band)
+
+        decided = np.flatnonzero(~escalate)
+        hate_rows = [j for j in decided if probabilities[j] > self.band[1]]
+        classes = dict(zip(hate_rows, self.specialized_classes([model_texts[j] for j in hate_rows])))
+        for j in decided:
+            hate_probability = float(probabilities[j])
+            results[model_rows[j]] = {
+                'is_hate': j in classes,
+                'hate_probability': hate_probability,
+                'specialized_class': classes.get(j, "N/A"),
+                'confidence': max(hate_probability, 1 - hate_probability),
+                'method': ROUTER_METHOD,
+                'rule_budget_exceeded': results[model_rows[j]]['rule_budget_exceeded']
+            }
+
+        escalated = np.flatnonzero(escalate)
+        if len(escalated):
+            bert_results = self.app.predict_with_model_batch(
+                [model_texts[j] for j in escalated],
+                [results[model_rows[j]]['rule_budget_exceeded'] for j in escalated]
+            )
+            for j, result in zip(escalated, bert_results):
+                results[model_rows[j]] = result
+
+        self.stats['sklearn'] += len(decided)
+        self.stats['escalated'] += len(escalated)
+        return results
+
+# --- Avaliação ---
+def load_texts(file_path=None, column='text', sep=','):
+    """Textos e rótulos (None sem anotação); padrão: conjunto anotado do Instagram"""
+    if file_path:
+        df = pd.read_csv(file_path, sep=sep, usecols=[column]).dropna(subset=[column])
+        return file_path, df[column].astype(str).tolist(), None
+    df = pd.read_csv(ANNOTATED_FILE, sep=';', usecols=['Comment Text', 'avaliacao']).dropna(subset=['Comment Text'])
+    labels = (df['avaliacao'].astype(str).str.strip().str.lower() == HATE_ANNOTATION).to_numpy()
+    return ANNOTATED_FILE, df['Comment Text'].astype(str).tolist(), labels
+
+def classification_metrics(predicted, labels):
+    tp = int((predicted & labels).sum())
+    fp = int((predicted & ~labels).sum())
+    fn = int((~predicted & labels).sum())
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {
+        'accuracy': float((predicted == labels).mean()),
+        'precision': precision,
+        'recall': recall,
+        'f1': 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    }
+
+def run_batches(predict, texts, batch_size=BATCH_SIZE):
+    start = time.time()
+    results = []
+    for offset in range(0, len(texts), batch_size):
+        results.extend(predict(texts[offset:offset + batch_size]))
+    return results, time.time() - start
+
+def band_row(band, escalate, bert_hate, sklearn_hate, model_rows, labels):
+    """Métricas de uma faixa: saídas só-BERT com as decisões do sklearn nos não escalonados"""
+    hybrid_hate = bert_hate.copy()
+    hybrid_hate[model_rows] = np.where(escalate, bert_hate[model_rows], sklearn_hate)
+    row = {
+        'band': list(band),
+        'escalated': int(escalate.sum()),
+        'escalation_rate': float(escalate.mean()) if len(escalate) else 0.0,
+        'agreement_with_bert': float((hybrid_hate == bert_hate).mean())
+    }
+    if labels is not None:
+        row.update(classification_metrics(hybrid_hate, labels))
+    return row
+
+def evaluate(app, detector, texts, labels=None, band=DEFAULT_BAND, sweep_bands=SWEEP_BANDS,
+             batch_size=BATCH_SIZE):
+    """Só-BERT x híbrido nos mesmos textos + varredura de faixas"""
+    print(f"🔄 Só-BERT: {len(texts):,} textos...")
+    bert_results, bert_seconds = run_batches(app.predict_hate_speech_batch, texts, batch_size)
+
+    router = HybridRouter(app, detector, band)
+    print(f"🔄 Híbrido (faixa {router.band[0]:.2f}–{router.band[1]:.2f}): {len(texts):,} textos...")
+    hybrid_results, hybrid_seconds = run_batches(router.predict_batch, texts, batch_size)
+
+    bert_hate = np.array([bool(result['is_hate']) for result in bert_results])
+    hybrid_hate = np.array([bool(result['is_hate']) for result in hybrid_results])
+    model_rows = np.array([i for i, result in enumerate(bert_results) if result.get('method') == MODEL_METHOD],
+                          dtype=np.int64)
+    model_texts = [texts[i] for i in model_rows]
+    probabilities, scored, guarded = router.sklearn_pass(model_texts) if len(model_rows) else (
+        np.zeros(0), np.zeros(0, dtype=bool), np.zeros(0, dtype=bool))
+
+    report = {
+        'texts': len(texts),
+        'rule_decided': len(texts) - len(model_rows),
+        'model_bound': len(model_rows),
+        'sklearn_unscored': int((~scored).sum()),
+        'bert_only': {'bert_invocations': len(model_rows), 'seconds': bert_seconds},
+        'hybrid': {
+            'band': list(router.band),
+            'bert_invocations': router.stats['escalated'],
+            'sklearn_decided': router.stats['sklearn'],
+            'escalation_rate': router.stats['escalated'] / max(router.stats['texts'] - router.stats['rules'], 1),
+            'seconds': hybrid_seconds,
+            'agreement_with_bert': float((hybrid_hate == bert_hate).mean()) if len(texts) else 1.0
+        }
+    }
+    if labels is not None:
+        report['bert_only'].update(classification_metrics(bert_hate, labels))
+        report['hybrid'].update(classification_metrics(hybrid_hate, labels))
+        report['accuracy_delta'] = report['hybrid']['accuracy'] - report['bert_only']['accuracy']
+        report['f1_delta'] = report['hybrid']['f1'] - report['bert_only']['f1']
+
+    report['sweep'] = [
+        band_row(sweep_band, escalation_mask(probabilities, scored, guarded, sweep_band),
+                 bert_hate, probabilities > sweep_band[1], model_rows, labels)
+        for sweep_band in sorted(set(sweep_bands) | {router.band})
+    ]
+    return report
+
+def print_report(report):
+    hybrid, bert_only = report['hybrid'], report['bert_only']
+    print(f"\n🧭 ROTEAMENTO HÍBRIDO ({report['texts']:,} textos):")
+    print(f"   - Decididos pelas regras: {report['rule_decided']:,}")
+    print(f"   - Para modelo: {report['model_bound']:,} (sklearn não pontua {report['sklearn_unscored']:,})")
+    print(f"   - Chamadas BERT: {bert_only['bert_invocations']:,} → {hybrid['bert_invocations']:,} "
+          f"(escalonamento {hybrid['escalation_rate']*100:.1f}%, faixa {hybrid['band'][0]:.2f}–{hybrid['band'][1]:.2f})")
+    print(f"   - Tempo: {bert_only['seconds']:.1f}s → {hybrid['seconds']:.1f}s")
+    print(f"   - Concordância com só-BERT: {hybrid['agreement_with_bert']*100:.2f}%")
+    if 'accuracy_delta' in report:
+        print(f"   - Acurácia: {bert_only['accuracy']:.4f} → {hybrid['accuracy']:.4f} ({report['accuracy_delta']:+.4f})")
+        print(f"   - F1: {bert_only['f1']:.4f} → {hybrid['f1']:.4f} ({report['f1_delta']:+.4f})")
+
+    print(f"\n📊 VARREDURA DE FAIXAS:")
+    for row in report['sweep']:
+        quality = f" | acurácia {row['accuracy']:.4f} | F1 {row['f1']:.4f}" if 'accuracy' in row else ""
+        print(f"   - {row['band'][0]:.2f}–{row['band'][1]:.2f}: escalonamento {row['escalation_rate']*100:5.1f}% "
+              f"| concordância {row['agreement_with_bert']*100:.2f}%{quality}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Roteamento híbrido regras → sklearn → BERT')
+    parser.add_argument('--band', type=float, nargs=2, default=DEFAULT_BAND, metavar=('BAIXO', 'ALTO'),
+                        help='Faixa de incerteza do sklearn que sobe para o BERT')
+    parser.add_argument('--model', default=SKLEARN_MODEL, help='Pipeline sklearn (.pkl)')
+    parser.add_argument('--threshold', default=SKLEARN_THRESHOLD, help='Threshold do pipeline sklearn')
+    parser.add_argument('--input', help='CSV sem rótulos (padrão: conjunto anotado do Instagram)')
+    parser.add_argument('--column', default='text', help='Coluna de texto do CSV')
+    parser.add_argument('--sep', default=',', help='Separador do CSV')
+    parser.add_argument('--limit', type=int, help='Avaliar só os primeiros N textos')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Tamanho do lote')
+    args = parser.parse_args()
+
+    dataset, texts, labels = load_texts(args.input, args.column, args.sep)
+    if args.limit:
+        texts = texts[:args.limit]
+        labels = labels[:args.limit] if labels is not None else None
+
+    # Mesmo caminho em lote da API (score_batch com cache de features)
+    detector = HateSpeechDetector(args.model, args.threshold, feature_cache_size=FEATURE_CACHE_SIZE)
+    if not detector.model:
+        print(f"❌ Pipeline sklearn não carregado: {args.model}")
+        exit(1)
+    try:
+        import app_space_version as app
+    except ImportError as e:
+        print(f"❌ App do Space indisponível: {e}")
+        exit(1)
+    if not hasattr(app, 'model_scheduler'):
+        print("❌ Modelos BERT não carregados (app em modo fallback)")
+        exit(1)
+
+    report = evaluate(app, detector, texts, labels, tuple(args.band), batch_size=args.batch_size)
+    print_report(report)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs('out', exist_ok=True)
+    report_file = f"out/roteamento_hibrido_{timestamp}.json"
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({'timestamp': timestamp, 'dataset': dataset, 'sklearn_model': args.model, **report},
+                  f, indent=2, ensure_ascii=False)
+    register_artifact(report_file, 'roteamento_hibrido', run=timestamp, dataset=dataset, row_count=len(texts))
+    print(f"💾 Relatório salvo: {report_file}")
+
+if __name__ == "__main__":
+    main()
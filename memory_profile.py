@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Perfil de memória do processo de serviço
+Mede a memória residente por componente (pesos, tokenizers, tabelas de
+regras, caches), acompanha o pico de RSS durante uma execução em lote e
+compara com um orçamento configurável (sai com erro se estourar), para
+dimensionar containers e decidir sobre quantização ou compartilhamento
+
+- space: importa app_space_version registrando o RSS antes/depois de cada
+  from_pretrained (tokenizers e modelos) e soma os bytes exatos dos pesos
+- api: importa create_production_api registrando o joblib.load do pipeline
+
+Uso:
+  python memory_profile.py --target space --budget-mb 3000
+  python memory_profile.py --target api --samples 1000
+  MEMORY_BUDGET_MB=2500 python memory_profile.py
+"""
+
+import os
+import json
+import time
+import argparse
+import threading
+import tracemalloc
+from datetime import datetime
+
+from benchmark_inference import current_rss_mb, peak_rss_mb, load_texts
+from run_manifest import register_artifact
+
+DEFAULT_BUDGET_MB = float(os.environ.get('MEMORY_BUDGET_MB', 4096))
+SAMPLE_INTERVAL = 0.01  # Intervalo (s) da amostragem de RSS durante a execução
+DEFAULT_SAMPLES = 500
+BATCH_SIZE = 32
+RULE_SAMPLES = 200  # Textos usados para medir as tabelas de regras (tracemalloc é lento)
+
+class RssSampler:
+    """Amostra o RSS numa thread e guarda o pico da janela medida"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = current_rss_mb() or 0.0
+            self.peak_mb = max(self.peak_mb, rss)
+            self.samples += 1
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_mb = current_rss_mb() or 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, current_rss_mb() or 0.0)
+        return False
+
+class LoadRecorder:
+    """Registra o RSS antes/depois das funções de carga (from_pretrained, joblib.load)"""
+
+    def __init__(self):
+        self.components = []
+        self._patched = []
+
+    def patch(self, owner, name, kind, label=None):
+        original = getattr(owner, name)
+
+        def recorded(*args, **kwargs):
+            before = current_rss_mb() or 0.0
+            result = original(*args, **kwargs)
+            component = label or kwargs.get('subfolder') or (str(args[0]) if args else name)
+            self.components.append({'component': f"{kind}:{component}",
+                                    'rss_mb': max((current_rss_mb() or 0.0) - before, 0.0)})
+            return result
+
+        self._patched.append((owner, name, original))
+        setattr(owner, name, recorded)
+
+    def restore(self):
+        for owner, name, original in reversed(self._patched):
+            setattr(owner, name, original)
+        self._patched = []
+
+def tensor_bytes(tensors):
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+def model_weights(model):
+    """Bytes exatos de parâmetros + buffers e os dtypes usados"""
+    parameters = list(model.parameters())
+    return {
+        'bytes': tensor_bytes(parameters) + tensor_bytes(model.buffers()),
+        'dtypes': sorted({str(parameter.dtype) for parameter in parameters})
+    }
+
+def token_cache_bytes(cache):
+    """Bytes dos tensores guardados num TokenizationCache"""
+    with cache._lock:
+        entries = list(cache._entries.values())
+    return sum(tensor_bytes(encoded.values()) for encoded in entries), len(entries)
+
+def array_bytes(obj):
+    """Bytes de arrays NumPy/esparsos nos atributos de um estimador sklearn"""
+    total = 0
+    for value in vars(obj).values():
+        if isinstance(value, type):
+            continue  # Parâmetros como dtype=np.float64 (a classe, não um array)
+        if hasattr(value, 'nbytes'):
+            total += value.nbytes
+        elif hasattr(value, 'data') and hasattr(value, 'indices'):
+            total += value.data.nbytes + value.indices.nbytes + value.indptr.nbytes
+    return total
+
+def measure_rules(app, texts):
+    """Memória retida (tabelas/regex compilados) e transitória de uma passada só de regras"""
+    def defer(text, budget_exceeded=False):
+        return {'deferred': True}
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for text in texts:
+        app.predict_hate_speech(text, model_predict=defer)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'retained_mb': max(current - before, 0) / 2**20, 'transient_peak_mb': peak / 2**20}
+
+def profile_space(texts, batch_size=BATCH_SIZE):
+    """Componentes do app do Space + pico durante predict_hate_speech_batch"""
+    import torch
+    import transformers
+
+    baseline = current_rss_mb()
+    recorder = LoadRecorder()
+    recorder.patch(transformers.AutoTokenizer, 'from_pretrained', 'tokenizer')
+    recorder.patch(transformers.AutoModelForSequenceClassification, 'from_pretrained', 'modelo')
+    try:
+        import app_space_version as app
+    finally:
+        recorder.restore()
+    after_import = current_rss_mb()
+    if not hasattr(app, 'model_scheduler'):
+        raise RuntimeError("modelos não carregados (app em modo fallback)")
+
+    components = recorder.components
+    loaded = sum(component['rss_mb'] for component in components)
+    components.append({'component': 'app:regras+interface', 'rss_mb': max(after_import - baseline - loaded, 0.0)})
+
+    weights = {name: model_weights(getattr(app, name)) for name in ('model_binary', 'model_specialized')}
+    rules = measure_rules(app, texts[:RULE_SAMPLES])
+    components.append({'component': 'regras:tabelas_retidas', 'rss_mb': rules['retained_mb'],
+                       'transient_peak_mb': rules['transient_peak_mb']})
+
+    torch_threads = torch.get_num_threads()
+    with RssSampler() as sampler:
+        start = time.time()
+        for offset in range(0, len(texts), batch_size):
+            app.predict_hate_speech_batch(texts[offset:offset + batch_size])
+        elapsed = time.time() - start
+
+    for name in ('token_cache_binary', 'token_cache_specialized'):
+        cache_bytes, entries = token_cache_bytes(getattr(app, name))
+        components.append({'component': f"cache:{name}", 'rss_mb': cache_bytes / 2**20, 'entries': entries})
+
+    return {
+        'baseline_mb': baseline,
+        'after_load_mb': after_import,
+        'components': components,
+        'weights': {name: {**info, 'mb': info['bytes'] / 2**20} for name, info in weights.items()},
+        'run': {'comments': len(texts), 'batch_size': batch_size, 'seconds': elapsed,
+                'peak_rss_mb': sampler.peak_mb, 'growth_mb': sampler.peak_mb - after_import,
+                'samples': sampler.samples, 'torch_threads': torch_threads}
+    }
+
+def profile_api(texts, batch_size=BATCH_SIZE):
+    """Pipeline joblib da API Flask + pico durante predições em lote"""
+    import joblib
+
+    baseline = current_rss_mb()
+    recorder = LoadRecorder()
+    recorder.patch(joblib, 'load', 'pipeline', label='joblib')
+    try:
+        import create_production_api as api
+    finally:
+        recorder.restore()
+    after_import = current_rss_mb()
+    detector = api.detector
+    if detector.model is None:
+        raise RuntimeError("modelo sklearn da API não encontrado")
+
+    components = recorder.components
+    loaded = sum(component['rss_mb'] for component in components)
+    components.append({'component': 'app:flask', 'rss_mb': max(after_import - baseline - loaded, 0.0)})
+    steps = getattr(detector.model, 'named_steps', {'modelo': detector.model})
+    weights = {name: {'bytes': array_bytes(step), 'mb': array_bytes(step) / 2**20} for name, step in steps.items()}
+
+    with RssSampler() as sampler:
+        start = time.time()
+        for offset in range(0, len(texts), batch_size):
+            detector.predict_batch(texts[offset:offset + batch_size])
+        elapsed = time.time() - start
+
+    if detector.feature_cache is not None:
+        cache = detector.feature_cache.stats()
+        components.append({'component': 'cache:feature_cache', 'rss_mb': cache['mb'], 'entries': cache['entries']})
+
+    return {
+        'baseline_mb': baseline,
+        'after_load_mb': after_import,
+        'components': components,
+        'weights': weights,
+        'run': {'comments': len(texts), 'batch_size': batch_size, 'seconds': elapsed,
+                'peak_rss_mb': sampler.peak_mb, 'growth_mb': sampler.peak_mb - after_import,
+                'samples': sampler.samples}
+    }
+
+def check_budget(profile, budget_mb):
+    """Pico do processo (maior entre amostragem e ru_maxrss) contra o orçamento"""
+    peak = max(profile['run']['peak_rss_mb'], peak_rss_mb())
+    return {'budget_mb': budget_mb, 'peak_mb': peak, 'headroom_mb': budget_mb - peak, 'ok': peak <= budget_mb}
+
+def print_profile(target, profile, budget):
+    print(f"\n🧠 MEMÓRIA POR COMPONENTE ({target}):")
+    print(f"   - runtime (Python + bibliotecas): {profile['baseline_mb']:,.0f} MB")
+    for component in profile['components']:
+        extra = f" | {component['entries']:,} entradas" if 'entries' in component else ""
+        if 'transient_peak_mb' in component:
+            extra += f" | pico transitório {component['transient_peak_mb']:,.1f} MB"
+        print(f"   - {component['component']}: {component['rss_mb']:,.1f} MB{extra}")
+
+    print(f"\n⚖️  PESOS:")
+    for name, info in profile['weights'].items():
+        dtypes = f" ({', '.join(info['dtypes'])})" if 'dtypes' in info else ""
+        print(f"   - {name}: {info['mb']:,.1f} MB{dtypes}")
+
+    run = profile['run']
+    print(f"\n📈 EXECUÇÃO EM LOTE ({run['comments']:,} comentários, lotes de {run['batch_size']}):")
+    print(f"   - RSS após carga: {profile['after_load_mb']:,.0f} MB")
+    print(f"   - Pico de RSS: {run['peak_rss_mb']:,.0f} MB (+{run['growth_mb']:,.0f} MB durante a execução)")
+
+    status = "✅ dentro do orçamento" if budget['ok'] else "❌ ORÇAMENTO EXCEDIDO"
+    print(f"\n💰 Orçamento: {budget['budget_mb']:,.0f} MB | pico {budget['peak_mb']:,.0f} MB | "
+          f"folga {budget['headroom_mb']:,.0f} MB → {status}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Perfil de memória do processo de serviço')
+    parser.add_argument('--target', choices=['space', 'api'], default='space', help='Processo medido')
+    parser.add_argument('--budget-mb', type=float, default=DEFAULT_BUDGET_MB,
+                        help='Orçamento de pico de RSS (padrão: MEMORY_BUDGET_MB ou 4096)')
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES, help='Comentários da execução em lote')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Tamanho do lote')
+    parser.add_argument('--input', help='CSV alternativo ao dataset das três plataformas')
+    parser.add_argument('--column', default='text', help='Coluna de texto do CSV alternativo')
+    parser.add_argument('--sep', default=',', help='Separador do CSV alternativo')
+    args = parser.parse_args()
+
+    dataset, texts = load_texts(args.input, args.column, args.sep, args.samples)
+    print(f"🔄 Medindo memória do processo '{args.target}' ({len(texts):,} comentários)...")
+    try:
+        profile = profile_space(texts, args.batch_size) if args.target == 'space' else profile_api(texts, args.batch_size)
+    except (ImportError, RuntimeError) as e:
+        print(f"❌ Não foi possível medir '{args.target}': {e}")
+        exit(1)
+    budget = check_budget(profile, args.budget_mb)
+    print_profile(args.target, profile, budget)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs('out', exist_ok=True)
+    report_file = f"out/perfil_memoria_{args.target}_{timestamp}.json"
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({'timestamp': timestamp, 'target': args.target, 'dataset': dataset,
+                   **profile, 'budget': budget}, f, indent=2, ensure_ascii=False)
+    register_artifact(report_file, f"perfil_memoria_{args.target}", run=timestamp, dataset=dataset,
+                      row_count=len(texts))
+    print(f"💾 Perfil salvo: {report_file}")
+
+    if not budget['ok']:
+        exit(1)
+
+if __name__ == "__main__":
+    main()
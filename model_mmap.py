@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Carga do pipeline sklearn com arrays mapeados em memória
+O .pkl de treino é regravado uma vez sem compressão ao lado do original
+(<modelo>.mmap.joblib); as cargas seguintes usam joblib.load(mmap_mode='r'),
+então os arrays (idf, coeficientes) são páginas do arquivo: a carga não
+copia nada e vários workers da API compartilham as mesmas páginas pelo
+cache do sistema operacional
+
+O vocabulário do vetorizador é um dict Python e não pode ser mapeado; ele
+é compartilhado entre workers com fork após a carga (gunicorn --preload +
+gc.freeze na API)
+
+A cópia deve ser gerada no build/deploy (--build), antes de subir os
+workers; se faltar, o primeiro worker que carregar o modelo a cria
+
+Uso:
+  python model_mmap.py --build --model out/modelo_otimizado_20251010_150123.pkl
+  python model_mmap.py --model out/modelo_otimizado_20251010_150123.pkl --repeats 5
+"""
+
+import os
+import json
+import time
+import argparse
+import tempfile
+import importlib
+import multiprocessing as mp
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+from run_manifest import register_artifact
+
+MMAP_SUFFIX = '.mmap.joblib'
+DEFAULT_MMAP_MODE = 'r'
+BENCHMARK_TEXTS = ['Você é um idiota', 'Olá mundo', 'Vai se foder', 'Orgulho de ser quem eu sou']
+
+def mmap_path(model_path):
+    """Caminho da cópia mapeável de um modelo"""
+    return os.path.splitext(model_path)[0] + MMAP_SUFFIX
+
+def save_mmap_model(model, path):
+    """Grava sem compressão (arrays em blocos mapeáveis), de forma atômica
+
+    O temporário é único (mkstemp no mesmo diretório): workers gravando ao
+    mesmo tempo não truncam nem renomeiam o arquivo um do outro, e o
+    os.replace final troca o arquivo inteiro (quem já mapeou o anterior
+    continua lendo as páginas dele).
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    os.close(fd)
+    try:
+        joblib.dump(model, tmp_path, compress=0)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+def is_up_to_date(model_path, cached=None):
+    """A cópia mapeável existe e não é mais antiga que o modelo original"""
+    cached = cached or mmap_path(model_path)
+    try:
+        return os.path.getmtime(cached) >= os.path.getmtime(model_path)
+    except OSError:
+        return False
+
+def build_mmap_model(model_path, force=False):
+    """Gera a cópia mapeável (passo de build/deploy); mantém a atual se estiver em dia"""
+    cached = mmap_path(model_path)
+    if not force and is_up_to_date(model_path, cached):
+        return cached, False
+    return save_mmap_model(joblib.load(model_path), cached), True
+
+def load_pipeline(model_path, mmap_mode=DEFAULT_MMAP_MODE):
+    """Carrega o pipeline; com mmap_mode usa (e cria, se preciso) a cópia mapeável
+
+    A cópia é refeita quando o modelo original é mais novo que ela. Se a
+    gravação falhar mas outro processo já tiver deixado uma cópia em dia,
+    ela é usada; sem cópia (disco só de leitura), carrega o original normalmente.
+    """
+    if mmap_mode is None:
+        return joblib.load(model_path)
+    if model_path.endswith(MMAP_SUFFIX):
+        return joblib.load(model_path, mmap_mode=mmap_mode)
+
+    cached = mmap_path(model_path)
+    if is_up_to_date(model_path, cached):
+        return joblib.load(cached, mmap_mode=mmap_mode)
+
+    model = joblib.load(model_path)
+    try:
+        save_mmap_model(model, cached)
+    except OSError as e:
+        if not is_up_to_date(model_path, cached):
+            print(f"⚠️  Cópia mapeável não gravada ({e}); usando carga normal")
+            return model
+    return joblib.load(cached, mmap_mode=mmap_mode)
+
+# --- Benchmark de carga ---
+def memory_status():
+    """RSS anônimo (privado) e de arquivo (compartilhável) em MB — Linux"""
+    status = {}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'RssAnon', 'RssFile'):
+                    status[key] = int(value.split()[0]) / 1024
+    except OSError:
+        pass
+    return status
+
+def estimator_modules(model):
+    """Módulos das classes do pipeline (importados antes de medir a carga)"""
+    steps = getattr(model, 'named_steps', {}).values()
+    return sorted({type(model).__module__, *(type(step).__module__ for step in steps)})
+
+def _measure_load(model_path, mmap_mode, modules):
+    """Carga + primeira predição num processo novo"""
+    for module in modules:
+        importlib.import_module(module)
+    before = memory_status()
+    start = time.perf_counter()
+    model = load_pipeline(model_path, mmap_mode)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    probabilities = model.predict_proba(BENCHMARK_TEXTS)[:, 1]
+    first_predict_seconds = time.perf_counter() - start
+    after = memory_status()
+    return {
+        'load_seconds': load_seconds,
+        'first_predict_seconds': first_predict_seconds,
+        **{f"{key}_delta_mb": after[key] - before.get(key, 0.0) for key in after},
+        'probabilities': probabilities.tolist()
+    }
+
+def run_benchmark(model_path, repeats=3):
+    """Carga normal x mapeada, cada repetição num processo novo (spawn)"""
+    print(f"🧪 BENCHMARK DE CARGA DO MODELO ({model_path}, {repeats} repetições)")
+    print("=" * 60)
+
+    # A cópia mapeável é criada fora da medida; o import do sklearn também
+    modules = estimator_modules(load_pipeline(model_path))
+    context = mp.get_context('spawn')
+    results = {}
+    for label, mmap_mode in (('joblib', None), ('mmap', DEFAULT_MMAP_MODE)):
+        runs = []
+        for _ in range(repeats):
+            with context.Pool(1) as pool:
+                runs.append(pool.apply(_measure_load, (model_path, mmap_mode, modules)))
+        results[label] = {
+            'load_seconds': float(np.median([run['load_seconds'] for run in runs])),
+            'first_predict_seconds': float(np.median([run['first_predict_seconds'] for run in runs])),
+            'rss_delta_mb': float(np.median([run.get('VmRSS_delta_mb', 0.0) for run in runs])),
+            'rss_anon_delta_mb': float(np.median([run.get('RssAnon_delta_mb', 0.0) for run in runs])),
+            'rss_file_delta_mb': float(np.median([run.get('RssFile_delta_mb', 0.0) for run in runs])),
+            'probabilities': runs[0]['probabilities']
+        }
+        result = results[label]
+        print(f"   - {label:6s}: carga {result['load_seconds']*1000:8.1f} ms | 1ª predição "
+              f"{result['first_predict_seconds']*1000:6.1f} ms | RSS +{result['rss_delta_mb']:,.1f} MB "
+              f"(privado {result['rss_anon_delta_mb']:,.1f} MB, arquivo/compartilhável {result['rss_file_delta_mb']:,.1f} MB)")
+
+    identical = np.allclose(results['joblib']['probabilities'], results['mmap']['probabilities'], rtol=0, atol=0)
+    speedup = results['joblib']['load_seconds'] / max(results['mmap']['load_seconds'], 1e-9)
+    print(f"\n⚡ Carga mapeada {speedup:.1f}x mais rápida | predições {'✅ idênticas' if identical else '❌ DIFERENTES'}")
+    return {'results': results, 'speedup': speedup, 'identical': bool(identical)}
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de carga do pipeline sklearn (joblib x mmap)')
+    parser.add_argument('--model', default='out/modelo_otimizado_20251010_150123.pkl', help='Modelo .pkl')
+    parser.add_argument('--repeats', type=int, default=3, help='Repetições por modo (processo novo cada)')
+    parser.add_argument('--build', action='store_true', help='Só gerar a cópia mapeável (build/deploy) e sair')
+    parser.add_argument('--force', action='store_true', help='Com --build, regravar mesmo se estiver em dia')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f"❌ Modelo não encontrado: {args.model}")
+        exit(1)
+
+    if args.build:
+        cached, written = build_mmap_model(args.model, args.force)
+        print(f"{'✅ Cópia mapeável gerada' if written else '♻️  Cópia mapeável já em dia'}: {cached}")
+        return
+
+    report = run_benchmark(args.model, args.repeats)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs('out', exist_ok=True)
+    report_file = f"out/benchmark_carga_modelo_{timestamp}.json"
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({'timestamp': timestamp, 'model': args.model, 'mmap_model': mmap_path(args.model),
+                   'repeats': args.repeats, **report}, f, indent=2, ensure_ascii=False)
+    register_artifact(report_file, 'benchmark_carga_modelo', run=timestamp)
+    print(f"💾 Benchmark salvo: {report_file}")
+    if not report['identical']:
+        exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Detecção de quase-duplicatas com MinHash + LSH
+Comentários copiados e colados com pequenas variações (um emoji, uma
+menção, pontuação) caem no mesmo cluster: o texto é normalizado (perfil
+'space' sem placeholders), quebrado em shingles de caracteres e resumido
+numa assinatura MinHash; o LSH por bandas encontra candidatos e a
+similaridade estimada pela assinatura confirma o par
+
+O representante de cada cluster é a primeira linha adicionada ao índice,
+então ids de cluster ficam estáveis quando linhas novas são anexadas
+
+Textos cuja forma normalizada é vazia ou menor que um shingle (só emojis,
+pontuação, menções ou URLs) não têm assinatura: ficam sozinhos no próprio
+cluster e não entram no LSH. O cluster indica semelhança de texto, não de
+rótulo: as variações diferem justamente no que as regras do Space e o
+modelo veem (emojis, pontuação, menções, caixa, palavras), então o cluster
+é reportado como sinal de campanha e cada comentário é classificado por si
+"""
+
+import re
+import zlib
+
+import numpy as np
+
+from text_normalization import normalize_space
+
+SHINGLE_SIZE = 5  # Caracteres por shingle
+NUM_PERM = 128  # Funções de hash da assinatura
+BANDS = 16  # 16 bandas x 8 linhas: pares com Jaccard >= ~0.7 viram candidatos
+SIMILARITY_THRESHOLD = 0.8  # Jaccard estimado mínimo para unir dois textos
+HASH_PRIME = 4294967311  # Primo > 2^32 (a*x + b cabe em uint64)
+MAX_HASH = np.uint64(0xFFFFFFFF)
+SEED = 42
+SIGNATURE_VERSION = 2  # Muda quando a regra de assinatura muda (invalida assinaturas salvas)
+
+_PLACEHOLDERS = re.compile(r'\[(?:URL|MENTION|HASHTAG)\]')
+
+def near_duplicate_text(text):
+    """Forma normalizada usada na comparação (sem caixa, pontuação, emojis, URLs e menções)"""
+    return " ".join(_PLACEHOLDERS.sub(' ', normalize_space(text)).split())
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Hashes (crc32) dos shingles de caracteres do texto normalizado"""
+    text = near_duplicate_text(text)
+    if len(text) < size:
+        return np.empty(0, dtype=np.uint64)
+    grams = {text[i:i + size] for i in range(len(text) - size + 1)}
+    return np.fromiter((zlib.crc32(gram.encode('utf-8')) for gram in grams), dtype=np.uint64, count=len(grams))
+
+class MinHasher:
+    """Assinaturas MinHash com hashes universais (a*x + b) mod p"""
+
+    def __init__(self, num_perm=NUM_PERM, seed=SEED):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)[:, None]
+        self.b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)[:, None]
+
+    def signature(self, text):
+        """Assinatura de um texto (uint32 x num_perm); sem shingles vira assinatura vazia (máxima)"""
+        values = shingles(text)
+        if not len(values):
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint32)
+        hashed = ((self.a * values[None, :] + self.b) % np.uint64(HASH_PRIME)) & MAX_HASH
+        return hashed.min(axis=1).astype(np.uint32)
+
+    def signatures(self, texts):
+        """Matriz de assinaturas (len(texts) x num_perm)"""
+        if not len(texts):
+            return np.empty((0, self.num_perm), dtype=np.uint32)
+        return np.vstack([self.signature(text) for text in texts])
+
+def is_empty_signature(signature):
+    """Assinatura de texto sem shingles (não entra no LSH)"""
+    return bool((signature == MAX_HASH).all())
+
+def estimated_similarity(signature_a, signature_b):
+    """Jaccard estimado: fração de posições iguais nas assinaturas"""
+    return float(np.mean(signature_a == signature_b))
+
+class NearDuplicateIndex:
+    """Índice LSH incremental com união dos pares confirmados (union-find)
+
+    Cada banda mapeia o trecho da assinatura para a primeira linha que o
+    usou (âncora); uma linha nova é comparada só com as âncoras dos seus
+    buckets, então o custo por linha é O(bandas).
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, threshold=SIMILARITY_THRESHOLD):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) precisa ser múltiplo de bands ({bands})")
+        self.rows_per_band = num_perm // bands
+        self.bands = bands
+        self.threshold = threshold
+        self._buckets = [{} for _ in range(bands)]
+        self._signatures = []
+        self._parent = []
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _find(self, position):
+        root = position
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[position] != root:
+            self._parent[position], position = root, self._parent[position]
+        return root
+
+    def _union(self, first, second):
+        # A raiz é sempre a linha mais antiga (representante estável)
+        root_first, root_second = self._find(first), self._find(second)
+        if root_first != root_second:
+            self._parent[max(root_first, root_second)] = min(root_first, root_second)
+
+    def add(self, signature):
+        """Adiciona uma assinatura e a une às âncoras semelhantes (vazia fica sozinha)"""
+        position = len(self._signatures)
+        self._signatures.append(signature)
+        self._parent.append(position)
+        if is_empty_signature(signature):
+            return position
+
+        for band, buckets in enumerate(self._buckets):
+            start = band * self.rows_per_band
+            band_key = signature[start:start + self.rows_per_band].tobytes()
+            anchor = buckets.setdefault(band_key, position)
+            if anchor != position and self._find(anchor) != self._find(position):
+                if estimated_similarity(self._signatures[anchor], signature) >= self.threshold:
+                    self._union(anchor, position)
+        return position
+
+    def add_many(self, signatures):
+        for signature in signatures:
+            self.add(signature)
+
+    def clusters(self):
+        """Para cada linha: (posição do representante, tamanho do cluster, similaridade ao representante)"""
+        roots = np.array([self._find(position) for position in range(len(self._signatures))], dtype=np.int64)
+        sizes = np.bincount(roots, minlength=len(roots))[roots] if len(roots) else np.empty(0, dtype=np.int64)
+        similarities = np.array([
+            1.0 if root == position else estimated_similarity(self._signatures[root], self._signatures[position])
+            for position, root in enumerate(roots)
+        ])
+        return roots, sizes, similarities
+
+def cluster_texts(texts, hasher=None):
+    """Atalho: agrupa uma lista de textos (retorna representantes, tamanhos, similaridades)"""
+    hasher = hasher or MinHasher()
+    index = NearDuplicateIndex(num_perm=hasher.num_perm)
+    index.add_many(hasher.signatures(texts))
+    return index.clusters()
@@ -6,20 +6,31 @@ Usa o modelo otimizado treinado para classificar novos textos
 
 import pandas as pd
 import numpy as np
-import joblib
 import os
-import re
 from datetime import datetime
 import json
+from text_normalization import normalize_sklearn
+from model_mmap import DEFAULT_MMAP_MODE, load_pipeline
+from feature_cache import FeatureCache, FEATURE_CACHE_MB, split_pipeline
+
+MIN_TEXT_LENGTH = 3  # Textos normalizados mais curtos não passam pelo modelo
+PREDICT_CHUNK_SIZE = 2000  # Textos por chamada de predict_proba no caminho em lote
 
 class HateSpeechDetector:
-    """Classe para detecção de discurso de ódio"""
+    """Classe para detecção de discurso de ódio (também usada pela API Flask)"""
     
-    def __init__(self, model_path=None, threshold_path=None):
-        """Inicializa o detector com modelo e threshold"""
+    def __init__(self, model_path=None, threshold_path=None, mmap_mode=DEFAULT_MMAP_MODE,
+                 feature_cache_size=0, feature_cache_mb=FEATURE_CACHE_MB):
+        """Inicializa o detector com modelo e threshold (mmap_mode=None desliga o mapeamento,
+        feature_cache_size > 0 liga o cache de features, ver feature_cache.py)"""
         self.model = None
+        self.classifier = None
+        self.feature_cache = None
         self.threshold = 0.5
         self.model_path = model_path
+        self.mmap_mode = mmap_mode
+        self.feature_cache_size = feature_cache_size
+        self.feature_cache_mb = feature_cache_mb
         self.threshold_path = threshold_path
         
         # Carregar modelo e threshold se especificados
@@ -30,11 +41,20 @@ class HateSpeechDetector:
             self.load_threshold(threshold_path)
     
     def load_model(self, model_path):
-        """Carrega modelo treinado"""
+        """Carrega modelo treinado (arrays mapeados em memória, ver model_mmap.py)"""
         try:
-            self.model = joblib.load(model_path)
+            self.model = load_pipeline(model_path, self.mmap_mode)
             self.model_path = model_path
             print(f"✅ Modelo carregado: {model_path}")
+            
+            # Vetorização com cache; sem Pipeline divisível usa o modelo inteiro
+            parts = split_pipeline(self.model) if self.feature_cache_size else None
+            if parts:
+                features, self.classifier = parts
+                self.feature_cache = FeatureCache(features, self.feature_cache_size, self.feature_cache_mb)
+            else:
+                self.classifier = None
+                self.feature_cache = None
             return True
         except Exception as e:
             print(f"❌ Erro ao carregar modelo: {e}")
@@ -53,27 +73,8 @@ class HateSpeechDetector:
             return False
     
     def normalize_text(self, text):
-        """Normaliza texto para análise"""
-        if pd.isna(text) or text == "":
-            return ""
-        
-        # Converter para string e limpar
-        text = str(text).strip()
-        
-        # Remover URLs
-        text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
-        
-        # Remover menções e hashtags
-        text = re.sub(r'@\w+', '', text)
-        text = re.sub(r'#\w+', '', text)
-        
-        # Remover caracteres especiais excessivos
-        text = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)]', ' ', text)
-        
-        # Normalizar espaços
-        text = re.sub(r'\s+', ' ', text)
-        
-        return text.strip()
+        """Normaliza texto para análise (perfil de treino do pipeline sklearn)"""
+        return normalize_sklearn(text)
     
     def predict_single(self, text):
         """Prediz se um texto é discurso de ódio"""
@@ -83,7 +84,7 @@ class HateSpeechDetector:
         # Normalizar texto
         normalized_text = self.normalize_text(text)
         
-        if len(normalized_text) < 3:
+        if len(normalized_text) < MIN_TEXT_LENGTH:
             return {
                 'text': text,
                 'normalized_text': normalized_text,
@@ -93,9 +94,8 @@ class HateSpeechDetector:
                 'warning': 'Texto muito curto'
             }
         
-        # Obter probabilidades
-        probabilities = self.model.predict_proba([normalized_text])
-        hate_probability = probabilities[0][1]
+        # Obter probabilidade
+        hate_probability = self.hate_probabilities([normalized_text])[0]
         
         # Aplicar threshold
         is_hate = 1 if hate_probability >= self.threshold else 0
@@ -117,24 +117,99 @@ class HateSpeechDetector:
             'threshold_used': self.threshold
         }
     
-    def predict_batch(self, texts):
-        """Prediz múltiplos textos"""
+    def hate_probabilities(self, normalized_texts):
+        """Probabilidade de hate de textos normalizados: vetoriza (com cache, se ligado) e pontua num lote"""
+        if self.feature_cache is not None:
+            return self.classifier.predict_proba(self.feature_cache.transform(normalized_texts))[:, 1]
+        return self.model.predict_proba(normalized_texts)[:, 1]
+    
+    def confidence_levels(self, probabilities):
+        """Faixas de confiança de um vetor de probabilidades (mesmas de predict_single)"""
+        return np.select([probabilities < 0.3, probabilities > 0.7], ['low', 'high'], default='medium')
+    
+    def score_batch(self, texts, chunk_size=PREDICT_CHUNK_SIZE):
+        """Colunas de predição (arrays) para vários textos
+        
+        Normaliza cada texto uma vez e chama predict_proba em blocos só com os
+        textos válidos. Textos curtos e com erro recebem os mesmos valores do
+        caminho texto a texto; se um bloco falhar, seus textos são refeitos
+        um a um para isolar o erro.
+        """
         if not self.model:
             raise ValueError("Modelo não carregado")
         
-        results = []
-        for text in texts:
+        total = len(texts)
+        normalized = np.empty(total, dtype=object)
+        errors = np.full(total, None, dtype=object)
+        for i, text in enumerate(texts):
             try:
-                result = self.predict_single(text)
-                results.append(result)
+                normalized[i] = self.normalize_text(text)
             except Exception as e:
+                normalized[i] = ''
+                errors[i] = str(e)
+        
+        lengths = np.fromiter((len(text) for text in normalized), dtype=np.int64, count=total)
+        valid = np.flatnonzero((lengths >= MIN_TEXT_LENGTH) & pd.isna(errors))
+        probabilities = np.zeros(total)
+        for start in range(0, len(valid), chunk_size):
+            chunk = valid[start:start + chunk_size]
+            try:
+                probabilities[chunk] = self.hate_probabilities(normalized[chunk].tolist())
+            except Exception:
+                for i in chunk:
+                    try:
+                        probabilities[i] = self.hate_probabilities([normalized[i]])[0]
+                    except Exception as e:
+                        normalized[i] = ''
+                        errors[i] = str(e)
+        
+        failed = pd.notna(errors)
+        scored = np.zeros(total, dtype=bool)
+        scored[valid] = True
+        scored &= ~failed
+        probabilities[~scored] = 0.0
+        confidence = np.where(scored, self.confidence_levels(probabilities), 'low')
+        return {
+            'normalized_text': normalized,
+            'is_hate': (scored & (probabilities >= self.threshold)).astype(int),
+            'hate_probability': probabilities,
+            'confidence': np.where(failed, 'error', confidence).astype(object),
+            'scored': scored,
+            'error': errors
+        }
+    
+    def predict_batch(self, texts):
+        """Prediz múltiplos textos (predict_proba em lote, ver score_batch)"""
+        scores = self.score_batch(texts)
+        
+        results = []
+        for i, text in enumerate(texts):
+            if scores['error'][i] is not None:
                 results.append({
                     'text': text,
                     'normalized_text': '',
                     'is_hate': 0,
                     'hate_probability': 0.0,
                     'confidence': 'error',
-                    'error': str(e)
+                    'error': scores['error'][i]
+                })
+            elif not scores['scored'][i]:
+                results.append({
+                    'text': text,
+                    'normalized_text': scores['normalized_text'][i],
+                    'is_hate': 0,
+                    'hate_probability': 0.0,
+                    'confidence': 'low',
+                    'warning': 'Texto muito curto'
+                })
+            else:
+                results.append({
+                    'text': text,
+                    'normalized_text': scores['normalized_text'][i],
+                    'is_hate': int(scores['is_hate'][i]),
+                    'hate_probability': float(scores['hate_probability'][i]),
+                    'confidence': scores['confidence'][i],
+                    'threshold_used': self.threshold
                 })
         
         return results
@@ -152,15 +227,12 @@ class HateSpeechDetector:
         
         print(f"📊 Processando {len(df)} textos...")
         
-        # Predizer
-        results = self.predict_batch(df[text_column].tolist())
-        
-        # Adicionar resultados ao DataFrame
-        for i, result in enumerate(results):
-            df.loc[i, 'predicted_hate'] = result['is_hate']
-            df.loc[i, 'hate_probability'] = result['hate_probability']
-            df.loc[i, 'confidence'] = result['confidence']
-            df.loc[i, 'normalized_text'] = result['normalized_text']
+        # Predizer e adicionar resultados ao DataFrame (colunas inteiras)
+        scores = self.score_batch(df[text_column].tolist())
+        df['predicted_hate'] = scores['is_hate']
+        df['hate_probability'] = scores['hate_probability']
+        df['confidence'] = scores['confidence']
+        df['normalized_text'] = scores['normalized_text']
         
         # Salvar resultado
         if output_file is None:
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Agregação única para os relatórios finais
+Um único groupby sobre as linhas de resultado gera um "cubo" pequeno de
+contagens (plataforma x rótulo x método x classe x faixa de confiança);
+totais, taxas, distribuições por plataforma/método/classe e histogramas de
+confiança são derivados desse cubo e salvos num resumo JSON ao lado do
+arquivo de resultados, de onde os relatórios são renderizados
+"""
+
+import os
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from results_io import read_results
+
+# Colunas necessárias para o resumo (o resto do arquivo não é carregado)
+AGGREGATE_COLUMNS = ['platform', 'text', 'predicted_label', 'method', 'specialized_class', 'confidence']
+GROUP_KEYS = ['platform', 'predicted_label', 'method', 'specialized_class', 'confidence_bin']
+CONFIDENCE_BINS = [0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
+LABELS = ['HATE', 'NÃO-HATE']
+EXAMPLE_MIN_CONFIDENCE = 0.9
+EXAMPLES_PER_LABEL = 5
+ALL_SCOPE = '__all__'
+
+def summary_path(results_path):
+    """Caminho do resumo agregado de um arquivo de resultados"""
+    return os.path.splitext(results_path)[0] + '.resumo.json'
+
+def confidence_bins(confidence):
+    """Índice da faixa de confiança de cada linha (-1 quando ausente)"""
+    values = pd.to_numeric(confidence, errors='coerce').to_numpy(dtype=float)
+    bins = np.clip(np.digitize(values, CONFIDENCE_BINS) - 1, 0, len(CONFIDENCE_BINS) - 2)
+    return np.where(np.isnan(values), -1, bins)
+
+def build_cube(df):
+    """Cubo de contagens: um único groupby sobre todas as linhas"""
+    missing = pd.Series(np.nan, index=df.index, dtype=object)
+    work = pd.DataFrame({
+        'platform': df['platform'] if 'platform' in df.columns else missing,
+        'predicted_label': df['predicted_label'] if 'predicted_label' in df.columns else missing,
+        'method': df['method'] if 'method' in df.columns else missing,
+        'specialized_class': df['specialized_class'] if 'specialized_class' in df.columns else missing,
+        'confidence_bin': confidence_bins(df['confidence']) if 'confidence' in df.columns else -1,
+        'text_length': df['text'].str.len() if 'text' in df.columns else np.nan
+    })
+    return work.groupby(GROUP_KEYS, dropna=False, observed=True, sort=False).agg(
+        rows=('text_length', 'size'),
+        text_count=('text_length', 'count'),
+        text_chars=('text_length', 'sum'),
+        text_min=('text_length', 'min'),
+        text_max=('text_length', 'max')
+    ).reset_index()
+
+def _counts(cube, column):
+    """Contagens por valor de uma coluna do cubo (ordem decrescente, sem nulos)"""
+    counts = cube.dropna(subset=[column]).groupby(column, observed=True)['rows'].sum()
+    counts = counts[counts > 0].sort_values(ascending=False, kind='stable')
+    return {str(key): int(value) for key, value in counts.items()}
+
+def _histogram(cube):
+    """Contagem por faixa de confiança"""
+    counts = cube[cube['confidence_bin'] >= 0].groupby('confidence_bin')['rows'].sum()
+    return [int(value) for value in counts.reindex(range(len(CONFIDENCE_BINS) - 1), fill_value=0)]
+
+def _scope_summary(cube, has_label):
+    """Totais e distribuições de um recorte do cubo (geral ou uma plataforma)"""
+    labels = cube['predicted_label']
+    hate_cube = cube[labels == 'HATE'] if has_label else cube
+    text_count = int(cube['text_count'].sum())
+
+    return {
+        'total': int(cube['rows'].sum()),
+        'hate': int(cube.loc[labels == 'HATE', 'rows'].sum()),
+        'nao_hate': int(cube.loc[labels == 'NÃO-HATE', 'rows'].sum()),
+        'hate_rows': int(hate_cube['rows'].sum()),
+        'text_length': {
+            'mean': float(cube['text_chars'].sum() / text_count) if text_count else None,
+            'min': int(cube['text_min'].min()) if text_count else None,
+            'max': int(cube['text_max'].max()) if text_count else None
+        },
+        'methods': _counts(cube, 'method'),
+        'hate_classes': _counts(hate_cube, 'specialized_class'),
+        'confidence_histogram': {
+            'all': _histogram(cube),
+            **{label: _histogram(cube[labels == label]) for label in LABELS}
+        }
+    }
+
+def _examples(df):
+    """Primeiros casos de alta confiança de cada rótulo"""
+    if not {'predicted_label', 'confidence'}.issubset(df.columns):
+        return {label: [] for label in LABELS}
+
+    confident = df[pd.to_numeric(df['confidence'], errors='coerce') >= EXAMPLE_MIN_CONFIDENCE]
+    columns = [column for column in ['platform', 'text', 'confidence', 'method'] if column in df.columns]
+    examples = {}
+    for label in LABELS:
+        rows = confident.loc[confident['predicted_label'] == label, columns].head(EXAMPLES_PER_LABEL)
+        examples[label] = [
+            {column: (None if pd.isna(value) else value.item() if hasattr(value, 'item') else value)
+             for column, value in row.items()}
+            for row in rows.to_dict('records')
+        ]
+    return examples
+
+def build_summary(df, source=None):
+    """Resumo completo dos resultados a partir de um único groupby"""
+    cube = build_cube(df)
+    has_label = 'predicted_label' in df.columns
+
+    summary = {
+        'source': source,
+        'created_at': datetime.now().isoformat(),
+        'columns': [column for column in AGGREGATE_COLUMNS if column in df.columns],
+        'confidence_bins': CONFIDENCE_BINS,
+        'scopes': {ALL_SCOPE: _scope_summary(cube, has_label)},
+        'examples': _examples(df)
+    }
+    for platform, platform_cube in cube.dropna(subset=['platform']).groupby('platform', observed=True, sort=False):
+        summary['scopes'][str(platform)] = _scope_summary(platform_cube, has_label)
+    return summary
+
+def save_summary(summary, path):
+    """Grava o resumo em JSON"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return path
+
+def load_or_build_summary(results_path):
+    """Resumo do arquivo de resultados (recalculado se o arquivo for mais novo)"""
+    path = summary_path(results_path)
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(results_path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    df = read_results(results_path, columns=AGGREGATE_COLUMNS)
+    summary = build_summary(df, source=results_path)
+    save_summary(summary, path)
+    return summary
+
+def confidence_count(histogram, low=0.0, high=1.0):
+    """Linhas com confiança em [low, high) a partir do histograma (high=1.0 inclui 1.0)"""
+    return sum(
+        count for count, start, end in zip(histogram, CONFIDENCE_BINS, CONFIDENCE_BINS[1:])
+        if start >= low and end <= high
+    )
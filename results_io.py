@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Leitura e escrita dos resultados de análise em Parquet
+- Colunas de valores repetidos (método, classe, rótulos, contexto) viram
+  categóricas, gravadas com dictionary encoding
+- Booleanos e floats ficam tipados (nada de 'True'/'0.95' como texto)
+- Os relatórios leem só as colunas que usam
+"""
+
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+PARQUET_COMPRESSION = 'zstd'
+
+# Colunas sempre categóricas quando presentes
+CATEGORICAL_COLUMNS = {
+    'platform', 'predicted_label', 'true_label', 'method', 'rule_applied',
+    'specialized_class', 'context_analysis', 'linguistic_features', 'validation_status',
+    'space_label', 'space_method', 'space_specialized_class', 'redundancy_label',
+    'redundancy_context_analysis', 'redundancy_linguistic_features', 'case_type',
+    'space_vs_redundancy', 'confidence_level', 'method_type'
+}
+CATEGORY_MAX_RATIO = 0.5  # Demais colunas de texto: categóricas se únicos/linhas <= este valor
+FREE_TEXT_COLUMNS = {'text', 'comment_text', 'Comment Text'}
+
+def optimize_dtypes(df):
+    """Tipos compactos: categóricas para valores repetidos, bool/float tipados"""
+    df = df.copy()
+    for column in df.columns:
+        series = df[column]
+        if series.dtype != object and not pd.api.types.is_string_dtype(series):
+            continue
+
+        values = series.dropna()
+        if len(values) and values.map(type).isin([bool]).all():
+            df[column] = series.astype('boolean') if series.isna().any() else series.astype(bool)
+        elif column in FREE_TEXT_COLUMNS:
+            df[column] = series.astype('string')
+        elif column in CATEGORICAL_COLUMNS or (len(df) and series.nunique() / len(df) <= CATEGORY_MAX_RATIO):
+            df[column] = series.astype(str).where(series.notna()).astype('category')
+        else:
+            df[column] = series.astype(str).where(series.notna()).astype('string')
+    return df
+
+def write_results(df, path):
+    """Grava um DataFrame de resultados em Parquet (dictionary encoding nas categóricas)"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    optimize_dtypes(df).to_parquet(path, index=False, compression=PARQUET_COMPRESSION)
+    return path
+
+def read_results(path, columns=None):
+    """Lê resultados (Parquet ou CSV) carregando apenas as colunas pedidas"""
+    if path.endswith('.parquet'):
+        if columns is not None:
+            available = set(pq.read_schema(path).names)
+            columns = [column for column in columns if column in available]
+        return pd.read_parquet(path, columns=columns)
+
+    usecols = (lambda column: column in columns) if columns is not None else None
+    return pd.read_csv(path, usecols=usecols)
+
+def find_latest_results(directory, prefix, formats=('.parquet', '.csv')):
+    """Arquivo de resultados mais recente com o prefixo, só nos formatos pedidos
+
+    Quando a mesma execução gerou mais de um formato, vale a ordem de formats
+    (Parquet tem prioridade sobre CSV no padrão).
+    """
+    if not os.path.isdir(directory):
+        return None
+    formats = tuple(formats)
+    files = [f for f in os.listdir(directory) if f.startswith(prefix) and f.endswith(formats)]
+    if not files:
+        return None
+
+    stems = {}
+    for file_name in files:
+        stem, ext = os.path.splitext(file_name)
+        if stem not in stems or formats.index(ext) < formats.index(os.path.splitext(stems[stem])[1]):
+            stems[stem] = file_name
+    return os.path.join(directory, stems[sorted(stems)[-1]])
+
+class ResultsParquetWriter:
+    """Escrita incremental em Parquet (um row group por bloco) com schema fixo
+
+    Colunas categóricas viram dictionary<string>, colunas numéricas da
+    lista de floats ficam float64 e o resto é gravado como string, para que
+    blocos de plataformas diferentes compartilhem o mesmo schema.
+    """
+
+    def __init__(self, path, columns, float_columns=(), int_columns=(), bool_columns=()):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.columns = list(columns)
+        fields = []
+        for column in self.columns:
+            if column in float_columns:
+                fields.append(pa.field(column, pa.float64()))
+            elif column in int_columns:
+                fields.append(pa.field(column, pa.int64()))
+            elif column in bool_columns:
+                fields.append(pa.field(column, pa.bool_()))
+            elif column in CATEGORICAL_COLUMNS:
+                fields.append(pa.field(column, pa.dictionary(pa.int32(), pa.string())))
+            else:
+                fields.append(pa.field(column, pa.string()))
+        self.schema = pa.schema(fields)
+        self._writer = pq.ParquetWriter(path, self.schema, compression=PARQUET_COMPRESSION)
+
+    def write(self, df):
+        """Anexa um bloco convertendo as colunas para o schema do arquivo"""
+        df = df.reindex(columns=self.columns)
+        arrays = []
+        for field in self.schema:
+            series = df[field.name]
+            if pa.types.is_dictionary(field.type) or pa.types.is_string(field.type):
+                values = [None if pd.isna(value) else str(value) for value in series]
+                array = pa.array(values, type=pa.string())
+                if pa.types.is_dictionary(field.type):
+                    array = array.dictionary_encode()
+            else:
+                array = pa.array(series.tolist(), type=field.type, from_pandas=True)
+            arrays.append(array)
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
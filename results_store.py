@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Tabela persistente de resultados para análise incremental
+Cada resultado fica registrado por plataforma + id do comentário, com o
+hash do texto e a versão do pipeline (regras/modelo) que o produziu; numa
+nova execução só são classificados comentários novos, com texto alterado
+ou de uma versão anterior
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+from datetime import datetime
+
+RESULTS_DB = "out/results_store.sqlite"
+QUERY_CHUNK = 500  # Parâmetros por consulta (limite do SQLite é 999 em versões antigas)
+
+# Código cuja alteração muda as predições (versão do pipeline):
+# regras, normalização, tokenização, lotes em dois estágios, early exit e deduplicação
+PIPELINE_FILES = [
+    'app_space_version.py', 'text_normalization.py', 'tokenization_cache.py',
+    'two_stage_scheduler.py', 'early_exit_bert.py', 'dedup_inference.py'
+]
+
+# Subpastas dos modelos no repositório MODEL_PATH e arquivos que os definem
+MODEL_SUBFOLDERS = ['model-binary-expanded-with-toldbr', 'model-specialized-expanded']
+MODEL_FILES = ['config.json', 'model.safetensors', 'pytorch_model.bin']
+
+def source_version(paths, extra=None):
+    """Versão do pipeline: hash do código-fonte + parâmetros extras"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    for value in extra or []:
+        digest.update(str(value).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+def file_digest(path):
+    """SHA-256 de um arquivo, lido em blocos (pesos têm centenas de MB)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def model_file(subfolder, filename, revision=None):
+    """Caminho local de um arquivo do modelo (pasta local ou cache do Hub) ou None"""
+    from app_space_version import MODEL_PATH
+
+    if os.path.isdir(MODEL_PATH):
+        path = os.path.join(MODEL_PATH, subfolder, filename)
+        return path if os.path.exists(path) else None
+    from huggingface_hub import try_to_load_from_cache
+    path = try_to_load_from_cache(MODEL_PATH, f"{subfolder}/{filename}", revision=revision)
+    return path if isinstance(path, str) else None
+
+def model_revision():
+    """Revisão dos modelos carregados: commit resolvido no Hub + hash dos pesos
+
+    Sem modelos (app em modo fallback) as predições vêm só das palavras-chave.
+    """
+    import app_space_version as app
+
+    if not hasattr(app, 'model_scheduler'):
+        return ['fallback']
+    values = []
+    for subfolder, model in zip(MODEL_SUBFOLDERS, (app.model_binary, app.model_specialized)):
+        config = getattr(model, 'model', model).config  # EarlyExitBert envolve o modelo binário
+        commit = getattr(config, '_commit_hash', None)
+        values.append(f"{subfolder}@{commit}")
+        for filename in MODEL_FILES:
+            path = model_file(subfolder, filename, commit)
+            if path:
+                values.append(f"{subfolder}/{filename}:{file_digest(path)}")
+    if app.EARLY_EXIT_HEADS and os.path.exists(app.EARLY_EXIT_HEADS):
+        values.append(f"early_exit:{file_digest(app.EARLY_EXIT_HEADS)}")
+    return values
+
+def pipeline_version():
+    """Versão das regras + modelos (muda quando o código ou os pesos mudam)
+
+    Usada na tabela incremental e no manifesto por todos os scripts de
+    análise, para que as versões sejam comparáveis entre eles.
+    """
+    from app_space_version import MODEL_PATH
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    paths = [os.path.join(base_dir, path) for path in PIPELINE_FILES]
+    return source_version(paths, [MODEL_PATH, *model_revision()])
+
+def _json_default(value):
+    """Converte escalares numpy/torch para tipos nativos"""
+    return value.item() if hasattr(value, 'item') else str(value)
+
+class ResultsStore:
+    """Resultados por (plataforma, id do comentário) em SQLite"""
+
+    def __init__(self, db_path=RESULTS_DB):
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                platform TEXT NOT NULL,
+                comment_id TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                version TEXT NOT NULL,
+                result TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (platform, comment_id)
+            )
+        """)
+        self.conn.commit()
+
+    def lookup(self, platform, comment_ids, text_hashes, version):
+        """Resultados ainda válidos: mesmo id, mesmo texto e mesma versão
+
+        Retorna dict (comment_id, text_hash) -> resultado.
+        """
+        wanted = set(zip(comment_ids, text_hashes))
+        unique_ids = list(dict.fromkeys(comment_ids))
+        found = {}
+
+        for start in range(0, len(unique_ids), QUERY_CHUNK):
+            chunk = unique_ids[start:start + QUERY_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT comment_id, text_hash, result FROM results "
+                f"WHERE platform = ? AND version = ? AND comment_id IN ({placeholders})",
+                [platform, version, *chunk]
+            )
+            for comment_id, text_hash, result in rows:
+                if (comment_id, text_hash) in wanted:
+                    found[(comment_id, text_hash)] = json.loads(result)
+        return found
+
+    def upsert(self, platform, rows, version):
+        """Grava/atualiza resultados: rows é iterável de (comment_id, text_hash, resultado)"""
+        now = datetime.now().isoformat()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO results (platform, comment_id, text_hash, version, result, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (platform, comment_id, text_hash, version, json.dumps(result, ensure_ascii=False, default=_json_default), now)
+                for comment_id, text_hash, result in rows
+            ]
+        )
+        self.conn.commit()
+
+    def count(self, platform=None, version=None):
+        """Quantidade de resultados (opcionalmente por plataforma/versão)"""
+        query, params = "SELECT COUNT(*) FROM results WHERE 1=1", []
+        if platform is not None:
+            query += " AND platform = ?"
+            params.append(platform)
+        if version is not None:
+            query += " AND version = ?"
+            params.append(version)
+        return self.conn.execute(query, params).fetchone()[0]
+
+    def close(self):
+        self.conn.close()
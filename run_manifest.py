@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Manifesto das execuções de análise
+Cada execução registra seus arquivos de saída (tipo, dataset, plataforma,
+versão do modelo/regras, nº de linhas e checksum) num índice SQLite; os
+scripts seguintes consultam o artefato mais recente por tipo/plataforma em
+vez de varrer out/ com os.listdir
+"""
+
+import os
+import sqlite3
+import hashlib
+from datetime import datetime
+
+from results_io import find_latest_results
+
+MANIFEST_DB = "out/run_manifest.sqlite"
+CHECKSUM_BLOCK = 1 << 20  # Leitura do arquivo em blocos de 1 MB
+FORMAT_PREFERENCE = ('.parquet', '.csv')  # Parquet tem prioridade quando a mesma execução gerou os dois
+LOOKUP_CANDIDATES = 10  # Registros recentes verificados quando arquivos foram apagados
+
+def run_id():
+    """Identificador de execução (mesmo formato dos timestamps nos nomes de arquivo)"""
+    return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+def file_checksum(path):
+    """SHA-256 do conteúdo do arquivo"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHECKSUM_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class RunManifest:
+    """Índice de artefatos por (tipo, plataforma, execução) em SQLite"""
+
+    def __init__(self, db_path=MANIFEST_DB):
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS artifacts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                platform TEXT NOT NULL DEFAULT '',
+                run_id TEXT NOT NULL,
+                path TEXT NOT NULL,
+                format TEXT NOT NULL,
+                dataset TEXT,
+                version TEXT,
+                row_count INTEGER,
+                checksum TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_artifacts_lookup ON artifacts (kind, platform, run_id)"
+        )
+        self.conn.commit()
+
+    def register(self, path, kind, platform=None, run=None, dataset=None, version=None, row_count=None):
+        """Registra um arquivo de saída (o checksum é calculado aqui)"""
+        record = {
+            'kind': kind,
+            'platform': platform or '',
+            'run_id': run or run_id(),
+            'path': os.path.normpath(path),
+            'format': os.path.splitext(path)[1].lower(),
+            'dataset': dataset,
+            'version': version,
+            'row_count': None if row_count is None else int(row_count),
+            'checksum': file_checksum(path),
+            'created_at': datetime.now().isoformat()
+        }
+        self.conn.execute(
+            f"INSERT INTO artifacts ({', '.join(record)}) VALUES ({', '.join('?' * len(record))})",
+            list(record.values())
+        )
+        self.conn.commit()
+        return record
+
+    def latest(self, kind, platform=None, formats=FORMAT_PREFERENCE):
+        """Registro mais recente do tipo (e plataforma) cujo arquivo ainda existe"""
+        formats = [fmt.lower() for fmt in formats]
+        rank = " ".join(f"WHEN ? THEN {position}" for position in range(len(formats)))
+        self.conn.row_factory = sqlite3.Row
+        rows = self.conn.execute(
+            f"SELECT * FROM artifacts WHERE kind = ? AND platform = ? "
+            f"AND format IN ({', '.join('?' * len(formats))}) "
+            f"ORDER BY run_id DESC, CASE format {rank} END, id DESC LIMIT ?",
+            [kind, platform or '', *formats, *formats, LOOKUP_CANDIDATES]
+        ).fetchall()
+        self.conn.row_factory = None
+        for row in rows:
+            if os.path.exists(row['path']):
+                return dict(row)
+        return None
+
+    def close(self):
+        self.conn.close()
+
+def register_artifact(path, kind, platform=None, run=None, dataset=None, version=None, row_count=None,
+                      db_path=MANIFEST_DB):
+    """Atalho: registra um arquivo no manifesto padrão"""
+    manifest = RunManifest(db_path)
+    try:
+        return manifest.register(path, kind, platform=platform, run=run, dataset=dataset,
+                                 version=version, row_count=row_count)
+    finally:
+        manifest.close()
+
+def latest_artifact(kind, platform=None, directory='out', formats=FORMAT_PREFERENCE, db_path=MANIFEST_DB):
+    """Caminho do artefato mais recente do tipo
+
+    Arquivos gerados antes do manifesto existir não estão registrados; nesse
+    caso cai na busca por prefixo ("<tipo>_") no diretório, nos mesmos formatos.
+    """
+    if os.path.exists(db_path):
+        manifest = RunManifest(db_path)
+        try:
+            record = manifest.latest(kind, platform=platform, formats=formats)
+        finally:
+            manifest.close()
+        if record:
+            return record['path']
+    if directory is None:
+        return None
+    return find_latest_results(directory, f"{kind}_", formats)
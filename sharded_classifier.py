@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Classificação em lote com vários processos
+Divide o dataset em shards, cada processo mantém o próprio EnsembleSystem
+com threads do torch ajustadas (núcleos / processos) e classifica seu shard
+em lotes; o merger grava os resultados na ordem original
+
+Uso:
+  python sharded_classifier.py --input base.csv --column "Comment Text" --sep ";" --workers 4
+  python sharded_classifier.py --benchmark --workers 1,2,4,8 --samples 2000
+"""
+
+import os
+import json
+import time
+import argparse
+import multiprocessing as mp
+from datetime import datetime
+
+import pandas as pd
+
+from inference_config import available_cpus
+
+BINARY_MODEL_DIR = "model-binary-expanded"
+SPECIALIZED_MODEL_DIR = "model-specialized-expanded"
+SHARD_SIZE = 1000  # Linhas por shard (vários shards por processo equilibram a carga)
+BATCH_SIZE = 32
+
+OUTPUT_COLUMNS = [
+    'id', 'comment_text', 'is_hate', 'binary_confidence',
+    'specialized_class', 'specialized_confidence', 'ensemble_confidence'
+]
+
+# Estado de cada processo (inicializado uma vez por worker)
+_ensemble = None
+_batch_size = BATCH_SIZE
+_load_error = None
+
+def threads_per_worker(workers):
+    """Divide os núcleos disponíveis (afinidade + cgroup) entre os processos (mínimo 1 thread cada)"""
+    return max(1, available_cpus() // workers)
+
+def _init_worker(binary_model_dir, specialized_model_dir, num_threads, batch_size, ready):
+    """Carrega os modelos no processo com o número de threads ajustado
+
+    Espera na barreira `ready` ao final, para a medida começar só com todos
+    os processos carregados e aquecidos. Erros de carga são reportados por
+    _classify_shard (exceção no initializer faz o Pool recriar o processo sem fim).
+    """
+    global _ensemble, _batch_size, _load_error
+    try:
+        import torch
+        torch.set_num_threads(num_threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # Já definido neste processo
+
+        from apply_ensemble_to_clean_base import EnsembleSystem
+        _ensemble = EnsembleSystem(binary_model_dir, specialized_model_dir)
+        _batch_size = batch_size
+        _ensemble.predict_batch(["aquecimento do modelo"], batch_size=batch_size)
+    except Exception as e:
+        _ensemble = None
+        _load_error = str(e)
+    finally:
+        ready.wait()
+
+def _classify_shard(shard):
+    """Classifica um shard (shard_id, ids, textos) no processo atual"""
+    shard_id, ids, texts = shard
+    if _ensemble is None:
+        raise RuntimeError(f"modelos não carregados no processo: {_load_error}")
+    predictions = _ensemble.predict_batch(texts, batch_size=_batch_size)
+    rows = [
+        {'id': comment_id, 'comment_text': text, **prediction}
+        for comment_id, text, prediction in zip(ids, texts, predictions)
+    ]
+    return shard_id, rows
+
+def make_shards(ids, texts, shard_size=SHARD_SIZE):
+    """Divide ids/textos em shards contíguos"""
+    for shard_id, start in enumerate(range(0, len(texts), shard_size)):
+        yield shard_id, ids[start:start + shard_size], texts[start:start + shard_size]
+
+def run_sharded(ids, texts, output_file=None, workers=2, shard_size=SHARD_SIZE, batch_size=BATCH_SIZE,
+                binary_model_dir=BINARY_MODEL_DIR, specialized_model_dir=SPECIALIZED_MODEL_DIR):
+    """Classifica em N processos; o merger grava os shards na ordem original
+
+    Retorna (total de linhas, segundos de classificação). O tempo de carga
+    dos modelos nos workers fica fora da medida.
+    """
+    num_threads = threads_per_worker(workers)
+    context = mp.get_context('spawn')
+    written = 0
+
+    if output_file and os.path.exists(output_file):
+        os.remove(output_file)
+
+    ready = context.Barrier(workers + 1)
+    with context.Pool(workers, initializer=_init_worker,
+                      initargs=(binary_model_dir, specialized_model_dir, num_threads, batch_size, ready)) as pool:
+        # Espera todos os workers carregarem e aquecerem os modelos (em paralelo)
+        ready.wait()
+
+        start_time = time.time()
+        # imap devolve os shards na ordem de envio: a gravação fica ordenada
+        for shard_id, rows in pool.imap(_classify_shard, make_shards(ids, texts, shard_size)):
+            if output_file:
+                pd.DataFrame(rows, columns=OUTPUT_COLUMNS).to_csv(
+                    output_file, mode='a', header=(written == 0), index=False, sep=';'
+                )
+            written += len(rows)
+        elapsed = time.time() - start_time
+
+    return written, elapsed
+
+def run_benchmark(texts, worker_counts, shard_size, batch_size):
+    """Comentários/segundo por número de processos"""
+    print(f"🧪 BENCHMARK DE PROCESSOS ({len(texts):,} comentários, {os.cpu_count()} núcleos)")
+    print("=" * 60)
+
+    ids = list(range(len(texts)))
+    results = []
+    for workers in worker_counts:
+        total, elapsed = run_sharded(ids, texts, None, workers, shard_size, batch_size)
+        rate = total / elapsed if elapsed > 0 else 0.0
+        results.append({
+            'workers': workers,
+            'threads_per_worker': threads_per_worker(workers),
+            'comments': total,
+            'seconds': elapsed,
+            'comments_per_second': rate
+        })
+        print(f"   - {workers:2d} processo(s) x {threads_per_worker(workers):2d} thread(s): "
+              f"{rate:8.1f} com/s ({elapsed:.1f}s)")
+
+    baseline = results[0]['comments_per_second']
+    for result in results:
+        result['speedup'] = result['comments_per_second'] / baseline if baseline > 0 else 0.0
+
+    best = max(results, key=lambda r: r['comments_per_second'])
+    print(f"\n🏆 Melhor configuração: {best['workers']} processo(s) ({best['comments_per_second']:.1f} com/s, {best['speedup']:.2f}x)")
+    return results
+
+def load_texts(file_path, column, sep, id_column='id', samples=None):
+    """Carrega ids e textos do CSV (só as colunas necessárias)"""
+    df = pd.read_csv(file_path, sep=sep, usecols=lambda c: c in (column, id_column))
+    if samples:
+        df = df.head(samples)
+    ids = df[id_column].tolist() if id_column in df.columns else list(range(1, len(df) + 1))
+    return ids, df[column].tolist()
+
+def main():
+    parser = argparse.ArgumentParser(description='Classificação em lote com vários processos')
+    parser.add_argument('--input', default='clean-annotated-data/export_1757023553205_limpa.csv', help='CSV de entrada')
+    parser.add_argument('--column', default='Comment Text', help='Coluna de texto')
+    parser.add_argument('--sep', default=';', help='Separador do CSV')
+    parser.add_argument('--output', help='CSV de saída (padrão: out/avaliacoes_sharded_<timestamp>.csv)')
+    parser.add_argument('--workers', default='2', help='Processos (lista separada por vírgula no benchmark)')
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE, help='Linhas por shard')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Tamanho do lote no modelo')
+    parser.add_argument('--benchmark', action='store_true', help='Medir comentários/s por número de processos')
+    parser.add_argument('--samples', type=int, help='Limitar a quantidade de comentários')
+    args = parser.parse_args()
+
+    worker_counts = [int(w) for w in args.workers.split(',')]
+    ids, texts = load_texts(args.input, args.column, args.sep, samples=args.samples)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs('out', exist_ok=True)
+
+    if args.benchmark:
+        try:
+            results = run_benchmark(texts, worker_counts, args.shard_size, args.batch_size)
+        except RuntimeError as e:
+            print(f"❌ Benchmark interrompido: {e}")
+            exit(1)
+        report_file = f"out/benchmark_sharded_{timestamp}.json"
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'timestamp': timestamp,
+                'cpu_count': os.cpu_count(),
+                'comments': len(texts),
+                'shard_size': args.shard_size,
+                'batch_size': args.batch_size,
+                'results': results
+            }, f, indent=2)
+        print(f"💾 Benchmark salvo: {report_file}")
+        return
+
+    output_file = args.output or f"out/avaliacoes_sharded_{timestamp}.csv"
+    print(f"🚀 Classificando {len(texts):,} comentários com {worker_counts[0]} processo(s)...")
+    try:
+        total, elapsed = run_sharded(ids, texts, output_file, worker_counts[0], args.shard_size, args.batch_size)
+    except RuntimeError as e:
+        print(f"❌ Classificação interrompida: {e}")
+        exit(1)
+    print(f"✅ {total:,} comentários em {elapsed:.1f}s ({total/max(elapsed, 1e-9):.1f} com/s)")
+    print(f"💾 Resultados salvos: {output_file}")
+
+if __name__ == "__main__":
+    main()
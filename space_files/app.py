@@ -8,23 +8,80 @@ import json
 import re
 import hashlib
 import os
+import time
 import warnings
+from text_normalization import normalize_space
+from tokenization_cache import TokenizationCache
+from two_stage_scheduler import TwoStageScheduler
+from inference_config import configure_inference, describe
 
 warnings.filterwarnings("ignore")
 
 # --- Configurações ---
-DEVICE = "cpu"  # Simplificado para evitar problemas de GPU
+# Threads do torch e do tokenizer por modo de implantação (INFERENCE_MODE,
+# padrão single; ver inference_config.py), antes de carregar os modelos
+INFERENCE_PLAN = configure_inference()
+DEVICE = INFERENCE_PLAN['device']
 MODEL_PATH = "Veronyka/radar-social-lgbtqia"
+EARLY_EXIT_HEADS = os.environ.get("EARLY_EXIT_HEADS")  # Cabeças de early exit do modelo binário (opcional, ver early_exit_bert.py)
+
+# --- Política de Tamanho de Entrada ---
+# Vários padrões usam múltiplos '.*' não ancorados (custo polinomial no tamanho
+# do texto), então as regras só avaliam uma janela limitada do comentário.
+RULE_MAX_CHARS = 1000  # Janela máxima (início + fim) avaliada pelas regras
+RULE_TIME_BUDGET = 0.25  # Orçamento de tempo (s) por comentário no motor de regras
+MODEL_MAX_CHARS = 20000  # Corte antes da normalização (o tokenizer trunca em 512 tokens)
+
+# --- Threshold do Modelo Binário ---
+THRESHOLD = 0.05  # Reduzido de 0.15 para 0.05
+
+# Contadores da política de entrada (consultar com get_rule_guard_stats)
+RULE_GUARD_STATS = {
+    'total': 0,
+    'windowed': 0,
+    'budget_exceeded': 0
+}
 
 # --- Normalização de Texto ---
 def normalize_text(text):
-    text = str(text).lower()
-    text = re.sub(r"http\S+|www\S+|https\S+", "[URL]", text, flags=re.MULTILINE)
-    text = re.sub(r"@\w+", "[MENTION]", text)
-    text = re.sub(r"#\w+", "[HASHTAG]", text)
-    text = re.sub(r"[^\w\s\[\]]", "", text) # Remove pontuação, mas mantém []
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+    """Normaliza texto com o perfil de treino dos modelos do Space"""
+    return normalize_space(text)
+
+def window_rule_text(text, max_chars=RULE_MAX_CHARS):
+    """Limita o texto avaliado pelas regras a uma janela de início + fim
+    
+    Início e fim são unidos por quebra de linha: '.' não casa com '\n',
+    então padrões com '.*' não atravessam a junção. Padrões com '\s', '\W'
+    ou classes negadas ([^...]) casam com '\n' e podem juntar o fim do
+    início ao começo do fim (nenhum separador escapa a todos os padrões);
+    nesses textos longos um casamento na junção é possível.
+    """
+    text = str(text)
+    if len(text) <= max_chars:
+        return text
+    
+    half = max_chars // 2
+    return text[:half] + "\n" + text[-half:]
+
+def rule_budget_exceeded(deadline):
+    """Verifica se o orçamento de tempo das regras foi excedido
+    
+    Checado só entre grupos de regras: uma regex lenta dentro de um grupo
+    não é interrompida e pode passar do RULE_TIME_BUDGET. O limite de fato
+    do pior caso é a janela de RULE_MAX_CHARS (window_rule_text).
+    """
+    if time.perf_counter() <= deadline:
+        return False
+    RULE_GUARD_STATS['budget_exceeded'] += 1
+    return True
+
+def get_rule_guard_stats():
+    """Retorna os contadores da política de tamanho de entrada"""
+    stats = dict(RULE_GUARD_STATS)
+    total = stats['total'] or 1
+    stats['windowed_rate'] = stats['windowed'] / total
+    stats['budget_exceeded_rate'] = stats['budget_exceeded'] / total
+    return stats
 
 # --- REGRAS ESPECÍFICAS PARA CASOS PROBLEMÁTICOS ---
 def detect_neutral_language_opposition(text):
@@ -1112,6 +1169,7 @@ def is_lgbtqia_pattern(text):
 
 # --- Carregamento dos Modelos Reais ---
 print("🔄 Carregando modelos reais...")
+print(f"🧵 Inferência {describe(INFERENCE_PLAN)}")
 
 try:
     # Carregar modelo binário (usando subpasta)
@@ -1124,6 +1182,20 @@ try:
     tokenizer_specialized = AutoTokenizer.from_pretrained(MODEL_PATH, subfolder="model-specialized-expanded")
     model_specialized = AutoModelForSequenceClassification.from_pretrained(MODEL_PATH, subfolder="model-specialized-expanded")
     
+    # Cache LRU de tokenização (comentários repetidos não são re-tokenizados)
+    token_cache_binary = TokenizationCache(tokenizer_binary, max_length=512)
+    token_cache_specialized = TokenizationCache(tokenizer_specialized, max_length=512)
+    
+    # Early exit no modelo binário: só ativo se as cabeças calibradas existirem
+    if EARLY_EXIT_HEADS and os.path.exists(EARLY_EXIT_HEADS):
+        from early_exit_bert import EarlyExitBert
+        model_binary = EarlyExitBert.from_heads(model_binary, EARLY_EXIT_HEADS)
+        print(f"⚡ Early exit ativo no modelo binário: {EARLY_EXIT_HEADS}")
+    
+    # Análise em lote: binário em lotes e especializado só com lotes cheios
+    # (criado depois do early exit para usar o mesmo modelo binário)
+    model_scheduler = TwoStageScheduler(model_binary, model_specialized, tokenizer_binary, tokenizer_specialized)
+    
     print("✅ Modelos ensemble corretos carregados com sucesso!")
     
 except Exception as e:
@@ -1450,9 +1522,76 @@ def detect_mocking_laughter_with_offensive_terms(text):
     
     return has_offensive_terms and has_mocking_laughter
 
-def predict_hate_speech(text):
-    """Predição usando regras contextuais + modelo real treinado"""
+def predict_with_model(text, budget_exceeded=False):
+    """Predição pelo modelo ensemble (binário + especializado)"""
+    rule_text = window_rule_text(text)
+    
+    # Normalizar texto (com corte de tamanho; o tokenizer trunca em 512 tokens)
+    normalized_text = normalize_text(str(text)[:MODEL_MAX_CHARS])
+    
+    # Tokenizar
+    inputs = token_cache_binary.encode(normalized_text)
+    
+    # Predição binária
+    with torch.no_grad():
+        outputs_binary = model_binary(**inputs)
+        binary_probs = torch.softmax(outputs_binary.logits, dim=-1)
+        hate_probability = binary_probs[0][1].item()
+    
+    # Verificar se é um falso positivo potencial
+    if (hate_probability >= THRESHOLD and 
+        is_lgbtqia_pattern(rule_text) and 
+        has_positive_adjective(rule_text)):
+        
+        # Reduzir drasticamente a probabilidade para adjetivos positivos
+        hate_probability = 0.01  # 1% - praticamente NÃO-HATE
+    
+    is_hate = hate_probability >= THRESHOLD
+    
+    # Se é hate, fazer predição especializada
+    if is_hate:
+        inputs_specialized = token_cache_specialized.encode(normalized_text)
+        with torch.no_grad():
+            outputs_specialized = model_specialized(**inputs_specialized)
+            specialized_probs = torch.softmax(outputs_specialized.logits, dim=-1)
+            specialized_pred = torch.argmax(specialized_probs, dim=-1)
+        
+        # Mapear classes especializadas
+        class_mapping = {0: "Transfobia", 1: "Assédio/Insulto"}
+        specialized_class = class_mapping.get(specialized_pred.item(), "Assédio/Insulto")
+    else:
+        specialized_class = "N/A"
+    
+    confidence = max(hate_probability, 1-hate_probability)
+    
+    return {
+        'is_hate': is_hate,
+        'hate_probability': hate_probability,
+        'specialized_class': specialized_class,
+        'confidence': confidence,
+        'method': 'model_prediction',
+        'rule_budget_exceeded': budget_exceeded
+    }
+
+def predict_hate_speech(text, model_predict=None):
+    """Predição usando regras contextuais + modelo real treinado
+    
+    model_predict substitui predict_with_model quando nenhuma regra decide
+    (usado pela análise em lote para adiar o modelo)
+    
+    As regras avaliam window_rule_text(text); o RULE_TIME_BUDGET é checado
+    entre grupos de regras (ver rule_budget_exceeded), não dentro de uma regex.
+    """
+    model_predict = model_predict or predict_with_model
     try:
+        # Política de tamanho: as regras avaliam apenas uma janela do texto
+        RULE_GUARD_STATS['total'] += 1
+        full_text = text
+        text = window_rule_text(full_text)
+        if len(text) != len(str(full_text)):
+            RULE_GUARD_STATS['windowed'] += 1
+        deadline = time.perf_counter() + RULE_TIME_BUDGET
+        
         # 0. PRIMEIRO: Verificar casos que devem ser SEMPRE NÃO-HATE (ALTA PRIORIDADE)
         
         # Contexto positivo com emojis de apoio
@@ -1545,6 +1684,9 @@ def predict_hate_speech(text):
                 'method': 'positive_context_with_punctuation_rule'
             }
         
+        if rule_budget_exceeded(deadline):
+            return model_predict(full_text, budget_exceeded=True)
+        
         # 1. SEGUNDO: Verificar casos que devem ser SEMPRE HATE (ALTA PRIORIDADE)
         
         # Risadas de deboche com termos ofensivos
@@ -1597,6 +1739,9 @@ def predict_hate_speech(text):
                 'method': 'pathologizing_with_laughter_rule'
             }
         
+        if rule_budget_exceeded(deadline):
+            return model_predict(full_text, budget_exceeded=True)
+        
         # 2. TERCEIRO: Verificar machismo através de genitais masculinos (ALTA PRIORIDADE)
         
         if detect_enhanced_male_genital_machismo(text):
@@ -1619,6 +1764,9 @@ def predict_hate_speech(text):
                 'method': 'enhanced_neutral_language_hate_rule'
             }
         
+        if rule_budget_exceeded(deadline):
+            return model_predict(full_text, budget_exceeded=True)
+        
         # 2. TERCEIRO: Verificar casos que devem ser NÃO-HATE (alta prioridade para reduzir falsos positivos)
         
         if detect_care_expressions(text):
@@ -1675,6 +1823,9 @@ def predict_hate_speech(text):
                 'method': 'neutral_language_specific_cases_rule'
             }
         
+        if rule_budget_exceeded(deadline):
+            return model_predict(full_text, budget_exceeded=True)
+        
         # 1. SEGUNDO: Verificar casos específicos problemáticos identificados pelo usuário
         
         # Casos que devem ser HATE
@@ -1771,6 +1922,9 @@ def predict_hate_speech(text):
                 'method': 'religious_neutral_expressions_rule'
             }
         
+        if rule_budget_exceeded(deadline):
+            return model_predict(full_text, budget_exceeded=True)
+        
         # 1. SEGUNDO: Verificar emojis de hate (sempre hate)
         # Esta tem prioridade máxima para detectar ódio explícito
         if detect_hate_emojis(text):
@@ -1833,6 +1987,9 @@ def predict_hate_speech(text):
                 'method': 'pathologizing_terms_rule'
             }
         
+        if rule_budget_exceeded(deadline):
+            return model_predict(full_text, budget_exceeded=True)
+        
         # 7. SÉTIMO: Verificar hate disfarçado (geralmente hate)
         if detect_disguised_hate(text):
             return {
@@ -1913,6 +2070,9 @@ def predict_hate_speech(text):
                 'method': 'direct_insults_rule'
             }
         
+        if rule_budget_exceeded(deadline):
+            return model_predict(full_text, budget_exceeded=True)
+        
         # 4. QUARTO: Aplicar regras contextuais para termos de gênero
         contextual_result = enhanced_hybrid_rules(text)
         
@@ -1942,58 +2102,78 @@ def predict_hate_speech(text):
             }
         
         # 2. SEGUNDO: Se não há regra contextual, usar modelo normal
-        # Normalizar texto
-        normalized_text = normalize_text(text)
+        return model_predict(full_text)
         
-        # Tokenizar
-        inputs = tokenizer_binary(normalized_text, return_tensors="pt", padding=True, truncation=True, max_length=512)
-        
-        # Predição binária
-        with torch.no_grad():
-            outputs_binary = model_binary(**inputs)
-            binary_probs = torch.softmax(outputs_binary.logits, dim=-1)
-            hate_probability = binary_probs[0][1].item()
-        
-        # Threshold otimizado baseado nos testes
-        THRESHOLD = 0.05  # Reduzido de 0.15 para 0.05
-        
-        # Verificar se é um falso positivo potencial
-        if (hate_probability >= THRESHOLD and 
-            is_lgbtqia_pattern(text) and 
-            has_positive_adjective(text)):
-            
-            # Reduzir drasticamente a probabilidade para adjetivos positivos
-            hate_probability = 0.01  # 1% - praticamente NÃO-HATE
-        
-        is_hate = hate_probability >= THRESHOLD
-        
-        # Se é hate, fazer predição especializada
-        if is_hate:
-            inputs_specialized = tokenizer_specialized(normalized_text, return_tensors="pt", padding=True, truncation=True, max_length=512)
-            with torch.no_grad():
-                outputs_specialized = model_specialized(**inputs_specialized)
-                specialized_probs = torch.softmax(outputs_specialized.logits, dim=-1)
-                specialized_pred = torch.argmax(specialized_probs, dim=-1)
-            
-            # Mapear classes especializadas
-            class_mapping = {0: "Transfobia", 1: "Assédio/Insulto"}
-            specialized_class = class_mapping.get(specialized_pred.item(), "Assédio/Insulto")
+    except Exception as e:
+        print(f"Erro na predição: {e}")
+        return simulate_hate_detection(text)
+
+def predict_with_model_batch(texts, budget_flags=None):
+    """Predição pelo modelo ensemble para vários textos (dois estágios)"""
+    budget_flags = budget_flags or [False] * len(texts)
+    rule_texts = [window_rule_text(text) for text in texts]
+    normalized_texts = [normalize_text(str(text)[:MODEL_MAX_CHARS]) for text in texts]
+    hate_probabilities = {}
+    
+    def hate_decision(indices, binary_probs):
+        decisions = []
+        for j, index in enumerate(indices):
+            hate_probability = binary_probs[j][1].item()
+            # Mesmo ajuste de falso positivo de predict_with_model
+            if (hate_probability >= THRESHOLD and
+                is_lgbtqia_pattern(rule_texts[index]) and
+                has_positive_adjective(rule_texts[index])):
+                hate_probability = 0.01
+            hate_probabilities[index] = hate_probability
+            decisions.append(hate_probability >= THRESHOLD)
+        return decisions
+    
+    class_mapping = {0: "Transfobia", 1: "Assédio/Insulto"}
+    records = model_scheduler.run_texts(normalized_texts, tokenizer_binary, tokenizer_specialized,
+                                        max_length=512, hate_decision=hate_decision)
+    
+    results = []
+    for record in records:
+        index = record['index']
+        hate_probability = hate_probabilities[index]
+        if record['is_hate']:
+            specialized_pred = torch.argmax(record['specialized_probs']).item()
+            specialized_class = class_mapping.get(specialized_pred, "Assédio/Insulto")
         else:
             specialized_class = "N/A"
         
-        confidence = max(hate_probability, 1-hate_probability)
-        
-        return {
-            'is_hate': is_hate,
+        results.append({
+            'is_hate': record['is_hate'],
             'hate_probability': hate_probability,
             'specialized_class': specialized_class,
-            'confidence': confidence,
-            'method': 'model_prediction'
-        }
-        
+            'confidence': max(hate_probability, 1-hate_probability),
+            'method': 'model_prediction',
+            'rule_budget_exceeded': budget_flags[index]
+        })
+    return results
+
+def predict_hate_speech_batch(texts):
+    """Predição em lote: regras por texto, modelo só para os não resolvidos"""
+    def defer_to_model(text, budget_exceeded=False):
+        return {'deferred': True, 'rule_budget_exceeded': budget_exceeded}
+    
+    results = [predict_hate_speech(text, model_predict=defer_to_model) for text in texts]
+    model_rows = [i for i, result in enumerate(results) if result.get('deferred')]
+    if not model_rows:
+        return results
+    
+    try:
+        model_results = predict_with_model_batch(
+            [texts[i] for i in model_rows],
+            [results[i]['rule_budget_exceeded'] for i in model_rows]
+        )
     except Exception as e:
-        print(f"Erro na predição: {e}")
-        return simulate_hate_detection(text)
+        print(f"Erro na predição em lote: {e}")
+        model_results = [predict_hate_speech(texts[i]) for i in model_rows]
+    
+    for i, result in zip(model_rows, model_results):
+        results[i] = result
+    return results
 
 # --- Funções de Análise ---
 def analyze_single_text(text):
@@ -2040,9 +2220,9 @@ def analyze_batch_text(texts):
     results = []
     hate_count = 0
     
-    for i, text in enumerate(text_list, 1):
-        result = predict_hate_speech(text)
-        
+    predictions = predict_hate_speech_batch(text_list)
+    
+    for i, (text, result) in enumerate(zip(text_list, predictions), 1):
         if result['is_hate']:
             emoji = "🔴"
             status = "HATE"
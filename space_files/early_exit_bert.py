@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Inferência binária com saída antecipada (early exit)
+Classificadores pequenos em camadas intermediárias do BERT binário: a
+inferência para na primeira camada cuja confiança passa de um limiar
+calibrado; a última camada usa o classificador original do modelo
+
+Uso:
+  python early_exit_bert.py --train    # treina cabeças + calibra limiares
+  python early_exit_bert.py --report   # taxas de saída e accuracy por camada
+"""
+
+import os
+import json
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import torch
+from torch import nn
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from transformers.modeling_outputs import SequenceClassifierOutput
+
+from text_normalization import normalize_many
+
+DEFAULT_MODEL_DIR = "model-binary-expanded-with-toldbr"
+DEFAULT_HEADS_PATH = "out/early_exit/early_exit_heads.pt"
+ANNOTATED_FILE = "clean-annotated-data/Scrapping_insta_annotated_GLOBAL_REVISADO.csv"
+
+DEFAULT_EXIT_LAYERS = (4, 8)
+DECISION_THRESHOLD = 0.05  # Mesmo THRESHOLD do predict_hate_speech
+TARGET_AGREEMENT = 0.99  # Concordância mínima com o modelo completo ao calibrar
+MAX_LENGTH = 512
+
+# --- Modelo com saída antecipada ---
+class ExitHead(nn.Module):
+    """Cabeça de classificação sobre o [CLS] de uma camada intermediária"""
+
+    def __init__(self, hidden_size, num_labels):
+        super().__init__()
+        self.dense = nn.Linear(hidden_size, hidden_size)
+        self.activation = nn.Tanh()
+        self.classifier = nn.Linear(hidden_size, num_labels)
+
+    def forward(self, cls_hidden):
+        return self.classifier(self.activation(self.dense(cls_hidden)))
+
+class EarlyExitBert(nn.Module):
+    """BertForSequenceClassification com cabeças de saída intermediárias
+
+    Compatível com a chamada do modelo original (model(**inputs).logits);
+    a saída inclui também exit_layers, a camada em que cada texto parou.
+    """
+
+    def __init__(self, model, exit_layers=DEFAULT_EXIT_LAYERS, thresholds=None):
+        super().__init__()
+        self.model = model
+        self.bert = model.bert
+        self.num_layers = model.config.num_hidden_layers
+        self.exit_layers = sorted(layer for layer in exit_layers if 0 < layer < self.num_layers)
+        self.heads = nn.ModuleDict({
+            str(layer): ExitHead(model.config.hidden_size, model.config.num_labels)
+            for layer in self.exit_layers
+        })
+        # Limiar > 1 desliga a saída na camada (até ser calibrado)
+        self.thresholds = dict(thresholds or {layer: 1.01 for layer in self.exit_layers})
+
+    def _encoder_mask(self, attention_mask, embedding_output):
+        """Máscara de atenção no formato esperado pelas camadas do encoder"""
+        if hasattr(self.bert, '_create_attention_masks'):  # transformers >= 5
+            mask, _ = self.bert._create_attention_masks(
+                attention_mask=attention_mask,
+                encoder_attention_mask=None,
+                embedding_output=embedding_output,
+                encoder_hidden_states=None,
+                past_key_values=None
+            )
+            return mask
+        return self.bert.get_extended_attention_mask(attention_mask, attention_mask.shape)
+
+    def _final_logits(self, hidden_states):
+        """Classificador original (pooler + classifier) da última camada"""
+        pooled = self.bert.pooler(hidden_states)
+        return self.model.classifier(self.model.dropout(pooled))
+
+    @torch.no_grad()
+    def forward(self, input_ids, attention_mask=None, token_type_ids=None, **kwargs):
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+
+        hidden_states = self.bert.embeddings(input_ids=input_ids, token_type_ids=token_type_ids)
+        mask = self._encoder_mask(attention_mask, hidden_states)
+
+        batch_size = input_ids.shape[0]
+        logits = torch.zeros(batch_size, self.model.config.num_labels, dtype=hidden_states.dtype)
+        exit_layers = torch.full((batch_size,), self.num_layers, dtype=torch.long)
+        active = torch.arange(batch_size)
+
+        for index, layer in enumerate(self.bert.encoder.layer, start=1):
+            output = layer(hidden_states, attention_mask=mask)
+            hidden_states = output[0] if isinstance(output, tuple) else output
+
+            if index == self.num_layers:
+                logits[active] = self._final_logits(hidden_states)
+                break
+
+            if index not in self.thresholds:
+                continue
+
+            layer_logits = self.heads[str(index)](hidden_states[:, 0])
+            confidence = torch.softmax(layer_logits, dim=-1).max(dim=-1).values
+            done = confidence >= self.thresholds[index]
+            if not done.any():
+                continue
+
+            logits[active[done]] = layer_logits[done]
+            exit_layers[active[done]] = index
+
+            # Remove do lote os textos que já saíram
+            keep = ~done
+            if not keep.any():
+                break
+            active = active[keep]
+            hidden_states = hidden_states[keep]
+            if mask is not None:
+                mask = mask[keep]
+
+        output = SequenceClassifierOutput(logits=logits)
+        output['exit_layers'] = exit_layers
+        return output
+
+    def save_heads(self, path, metadata=None):
+        """Salva cabeças intermediárias e limiares calibrados"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        torch.save({
+            'exit_layers': self.exit_layers,
+            'thresholds': self.thresholds,
+            'state_dict': self.heads.state_dict(),
+            'metadata': metadata or {}
+        }, path)
+
+    @classmethod
+    def from_heads(cls, model, path):
+        """Carrega cabeças salvas sobre um modelo binário já carregado"""
+        checkpoint = torch.load(path, map_location='cpu')
+        thresholds = {int(layer): value for layer, value in checkpoint['thresholds'].items()}
+        early_exit = cls(model, checkpoint['exit_layers'], thresholds)
+        early_exit.heads.load_state_dict(checkpoint['state_dict'])
+        early_exit.eval()
+        return early_exit
+
+# --- Treino e calibração ---
+@torch.no_grad()
+def extract_cls_features(model, tokenizer, texts, exit_layers, batch_size=32):
+    """[CLS] das camadas de saída e probabilidades do modelo completo"""
+    features = {layer: [] for layer in exit_layers}
+    final_probs = []
+
+    for start in range(0, len(texts), batch_size):
+        inputs = tokenizer(texts[start:start + batch_size], return_tensors="pt",
+                           padding=True, truncation=True, max_length=MAX_LENGTH)
+        outputs = model(**inputs, output_hidden_states=True)
+        final_probs.append(torch.softmax(outputs.logits, dim=-1))
+        for layer in exit_layers:
+            # hidden_states[0] são os embeddings; hidden_states[k] é a saída da camada k
+            features[layer].append(outputs.hidden_states[layer][:, 0])
+
+    return {layer: torch.cat(chunks) for layer, chunks in features.items()}, torch.cat(final_probs)
+
+def train_exit_heads(early_exit, features, teacher_probs, epochs=30, lr=1e-3, batch_size=64):
+    """Treina as cabeças por destilação das probabilidades do modelo completo"""
+    for layer in early_exit.exit_layers:
+        head = early_exit.heads[str(layer)]
+        head.train()
+        optimizer = torch.optim.Adam(head.parameters(), lr=lr)
+        x = features[layer]
+
+        for epoch in range(epochs):
+            permutation = torch.randperm(len(x))
+            total_loss = 0.0
+            for start in range(0, len(x), batch_size):
+                idx = permutation[start:start + batch_size]
+                log_probs = torch.log_softmax(head(x[idx]), dim=-1)
+                loss = -(teacher_probs[idx] * log_probs).sum(dim=-1).mean()
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+                total_loss += loss.item() * len(idx)
+
+        head.eval()
+        print(f"   - Camada {layer:2d}: perda final {total_loss/len(x):.4f}")
+
+@torch.no_grad()
+def head_probabilities(early_exit, features):
+    """Probabilidades de hate de cada cabeça intermediária"""
+    return {
+        layer: torch.softmax(early_exit.heads[str(layer)](features[layer]), dim=-1)[:, 1].numpy()
+        for layer in early_exit.exit_layers
+    }
+
+def calibrate_thresholds(layer_probs, final_probs, decision_threshold=DECISION_THRESHOLD,
+                         target_agreement=TARGET_AGREEMENT, min_exits=20):
+    """Escolhe, camada a camada, o menor limiar de confiança que mantém a
+    concordância com a decisão do modelo completo acima do alvo"""
+    final_decision = final_probs >= decision_threshold
+    remaining = np.ones(len(final_probs), dtype=bool)
+    thresholds = {}
+
+    for layer in sorted(layer_probs):
+        probs = layer_probs[layer]
+        confidence = np.maximum(probs, 1 - probs)[remaining]
+        agree = ((probs >= decision_threshold) == final_decision)[remaining]
+
+        # Concordância acumulada dos mais confiantes para os menos confiantes
+        order = np.argsort(-confidence)
+        cumulative = np.cumsum(agree[order]) / np.arange(1, len(order) + 1)
+        valid = np.nonzero((cumulative >= target_agreement) & (np.arange(1, len(order) + 1) >= min_exits))[0]
+
+        if len(valid) == 0:
+            thresholds[layer] = 1.01  # Camada desligada
+            continue
+
+        thresholds[layer] = float(confidence[order][valid[-1]])
+        exits = np.zeros(len(probs), dtype=bool)
+        exits[remaining] = np.maximum(probs, 1 - probs)[remaining] >= thresholds[layer]
+        remaining &= ~exits
+
+    return thresholds
+
+# --- Dados anotados ---
+def load_annotated_instagram(file_path=ANNOTATED_FILE):
+    """Carrega o conjunto anotado do Instagram (texto + rótulo binário)"""
+    df = pd.read_csv(file_path, sep=';', encoding='utf-8')
+    df = df.dropna(subset=['Comment Text'])
+    df = df[df['Comment Text'].str.strip() != '']
+    return df['Comment Text'].tolist(), (df['avaliacao'] == 'odio').to_numpy()
+
+def split_indices(n, seed=42):
+    """Divisão fixa 60/20/20 em treino, calibração e teste"""
+    permutation = np.random.RandomState(seed).permutation(n)
+    a, b = int(n * 0.6), int(n * 0.8)
+    return permutation[:a], permutation[a:b], permutation[b:]
+
+def load_binary_model(model_dir, subfolder=None):
+    """Carrega tokenizer e modelo binário"""
+    kwargs = {'subfolder': subfolder} if subfolder else {}
+    tokenizer = AutoTokenizer.from_pretrained(model_dir, **kwargs)
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir, **kwargs)
+    model.eval()
+    return tokenizer, model
+
+# --- Relatório ---
+@torch.no_grad()
+def evaluate_early_exit(early_exit, tokenizer, texts, labels, decision_threshold=DECISION_THRESHOLD, batch_size=32):
+    """Taxa de saída, accuracy por camada e custo médio (camadas executadas)"""
+    exit_layers, hate_probs = [], []
+    start_time = time.time()
+    for start in range(0, len(texts), batch_size):
+        inputs = tokenizer(texts[start:start + batch_size], return_tensors="pt",
+                           padding=True, truncation=True, max_length=MAX_LENGTH)
+        outputs = early_exit(**inputs)
+        hate_probs.append(torch.softmax(outputs.logits, dim=-1)[:, 1])
+        exit_layers.append(outputs['exit_layers'])
+    elapsed = time.time() - start_time
+
+    exit_layers = torch.cat(exit_layers).numpy()
+    predictions = torch.cat(hate_probs).numpy() >= decision_threshold
+    correct = predictions == labels
+
+    per_layer = []
+    for layer in early_exit.exit_layers + [early_exit.num_layers]:
+        selected = exit_layers == layer
+        per_layer.append({
+            'layer': int(layer),
+            'exits': int(selected.sum()),
+            'exit_rate': float(selected.mean()),
+            'accuracy': float(correct[selected].mean()) if selected.any() else None,
+            'hate_rate': float(predictions[selected].mean()) if selected.any() else None
+        })
+
+    return {
+        'total': len(texts),
+        'accuracy': float(correct.mean()),
+        'avg_layers': float(exit_layers.mean()),
+        'relative_cost': float(exit_layers.mean() / early_exit.num_layers),
+        'seconds': elapsed,
+        'per_layer': per_layer,
+        'predictions': predictions
+    }
+
+def print_report(name, report):
+    """Exibe o relatório de uma avaliação"""
+    print(f"\n📊 {name}:")
+    print(f"   - Textos: {report['total']:,}")
+    print(f"   - Accuracy: {report['accuracy']:.1%}")
+    print(f"   - Camadas executadas (média): {report['avg_layers']:.2f} ({report['relative_cost']:.0%} do custo)")
+    print(f"   - Tempo: {report['seconds']:.1f}s ({report['total']/max(report['seconds'], 1e-9):.1f} textos/s)")
+    for row in report['per_layer']:
+        accuracy = f"{row['accuracy']:.1%}" if row['accuracy'] is not None else "-"
+        print(f"   - Camada {row['layer']:2d}: {row['exits']:,} saídas ({row['exit_rate']:.1%}) | accuracy {accuracy}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Early exit para o modelo binário')
+    parser.add_argument('--train', action='store_true', help='Treinar cabeças e calibrar limiares')
+    parser.add_argument('--report', action='store_true', help='Relatório no conjunto anotado do Instagram')
+    parser.add_argument('--model', default=DEFAULT_MODEL_DIR, help='Diretório/ID do modelo binário')
+    parser.add_argument('--subfolder', help='Subpasta do modelo no Hub')
+    parser.add_argument('--heads', default=DEFAULT_HEADS_PATH, help='Arquivo das cabeças intermediárias')
+    parser.add_argument('--layers', default=','.join(map(str, DEFAULT_EXIT_LAYERS)), help='Camadas de saída')
+    parser.add_argument('--target', type=float, default=TARGET_AGREEMENT, help='Concordância mínima na calibração')
+    parser.add_argument('--data', default=ANNOTATED_FILE, help='CSV anotado do Instagram')
+    args = parser.parse_args()
+
+    if not args.train and not args.report:
+        parser.error("use --train e/ou --report")
+
+    tokenizer, model = load_binary_model(args.model, args.subfolder)
+    texts, labels = load_annotated_instagram(args.data)
+    texts = normalize_many(texts, 'space')
+    train_idx, calib_idx, test_idx = split_indices(len(texts))
+    print(f"📂 Conjunto anotado: {len(texts):,} textos (treino {len(train_idx):,} | calibração {len(calib_idx):,} | teste {len(test_idx):,})")
+
+    if args.train:
+        exit_layers = [int(layer) for layer in args.layers.split(',')]
+        early_exit = EarlyExitBert(model, exit_layers)
+
+        print("🔄 Extraindo representações das camadas intermediárias...")
+        train_features, train_probs = extract_cls_features(model, tokenizer, [texts[i] for i in train_idx], early_exit.exit_layers)
+        print("🎯 Treinando cabeças de saída (destilação do modelo completo)...")
+        train_exit_heads(early_exit, train_features, train_probs)
+
+        print("📏 Calibrando limiares...")
+        calib_features, calib_probs = extract_cls_features(model, tokenizer, [texts[i] for i in calib_idx], early_exit.exit_layers)
+        early_exit.thresholds = calibrate_thresholds(head_probabilities(early_exit, calib_features),
+                                                     calib_probs[:, 1].numpy(), target_agreement=args.target)
+        for layer, threshold in early_exit.thresholds.items():
+            print(f"   - Camada {layer:2d}: limiar de confiança {threshold:.4f}")
+
+        early_exit.save_heads(args.heads, {
+            'base_model': args.model,
+            'subfolder': args.subfolder,
+            'target_agreement': args.target,
+            'decision_threshold': DECISION_THRESHOLD,
+            'trained_at': datetime.now().isoformat()
+        })
+        print(f"💾 Cabeças salvas: {args.heads}")
+
+    if args.report:
+        early_exit = EarlyExitBert.from_heads(model, args.heads)
+        test_texts = [texts[i] for i in test_idx]
+        test_labels = labels[test_idx]
+
+        early_report = evaluate_early_exit(early_exit, tokenizer, test_texts, test_labels)
+        full_model = EarlyExitBert(model, [])  # Sem saídas intermediárias = modelo completo
+        full_report = evaluate_early_exit(full_model, tokenizer, test_texts, test_labels)
+
+        print_report("Modelo completo (12 camadas)", full_report)
+        print_report("Early exit", early_report)
+        agreement = (early_report['predictions'] == full_report['predictions']).mean()
+        print(f"\n🔁 Concordância com o modelo completo: {agreement:.2%}")
+        print(f"📉 Delta de accuracy: {(early_report['accuracy'] - full_report['accuracy'])*100:+.2f} p.p.")
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        report_file = f"out/early_exit/relatorio_early_exit_{timestamp}.json"
+        os.makedirs(os.path.dirname(report_file), exist_ok=True)
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'heads': args.heads,
+                'thresholds': {str(k): v for k, v in early_exit.thresholds.items()},
+                'agreement_with_full_model': float(agreement),
+                'full_model': {k: v for k, v in full_report.items() if k != 'predictions'},
+                'early_exit': {k: v for k, v in early_report.items() if k != 'predictions'}
+            }, f, indent=2)
+        print(f"💾 Relatório salvo: {report_file}")
+
+if __name__ == "__main__":
+    main()
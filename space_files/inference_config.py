@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Configuração de threads para inferência em CPU
+Detecta os núcleos realmente disponíveis (afinidade do processo + limite de
+CPU do cgroup, v2 e v1) e ajusta o pool intra-op e inter-op do torch, o
+paralelismo do tokenizer (TOKENIZERS_PARALLELISM) e os pools BLAS/OpenMP
+(threadpoolctl, se instalado) conforme o modo de implantação, para não
+empilhar o pool do torch sobre threads de requisição ou processos
+
+Modos (INFERENCE_MODE):
+- single: uma requisição por vez (Space/Gradio) — todos os núcleos numa predição
+- batch: lotes grandes num processo — todos os núcleos, tokenizer paralelo
+- multi_worker: N processos/threads concorrentes (INFERENCE_WORKERS, Flask
+  threaded=True, gunicorn) — núcleos divididos entre eles
+
+TORCH_NUM_THREADS e TORCH_INTEROP_THREADS sobrepõem o plano (por exemplo,
+com o resultado do auto-tune)
+
+Uso:
+  python inference_config.py                      # mostra o plano de cada modo
+  python inference_config.py --autotune --mode batch --samples 300
+  python inference_config.py --autotune --mode multi_worker --workers 2
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing as mp
+from datetime import datetime
+
+MODES = ('single', 'batch', 'multi_worker')
+DEFAULT_MODE = 'single'
+DEVICE = "cpu"  # Inferência só em CPU (sem dependência de GPU no Space/API)
+AUTOTUNE_SAMPLES = 200
+BATCH_SIZE = 32
+WARMUP = 3
+
+# --- Detecção de CPUs ---
+def cgroup_cpu_limit():
+    """Limite de CPUs do cgroup (cota / período) ou None se não houver"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()[:2]
+        if quota != 'max':
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+            quota = int(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period = int(f.read())
+        return quota / period if quota > 0 and period > 0 else None
+    except (OSError, ValueError):
+        return None
+
+def available_cpus():
+    """Núcleos utilizáveis: afinidade do processo limitada pela cota do cgroup"""
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, int(limit))  # Cota fracionária arredonda para baixo (evita throttling)
+    return max(1, cpus)
+
+# --- Plano de threads ---
+def thread_plan(mode=None, workers=None, cpus=None):
+    """Threads intra-op/inter-op e paralelismo do tokenizer para um modo"""
+    mode = mode or os.environ.get('INFERENCE_MODE', DEFAULT_MODE)
+    if mode not in MODES:
+        raise ValueError(f"Modo de inferência desconhecido: {mode} (disponíveis: {', '.join(MODES)})")
+    cpus = cpus or available_cpus()
+
+    if mode == 'multi_worker':
+        workers = workers or int(os.environ.get('INFERENCE_WORKERS', cpus))
+        intra_op = max(1, cpus // workers)
+    else:
+        workers = 1
+        intra_op = cpus
+
+    return {
+        'mode': mode,
+        'device': DEVICE,
+        'cpus': cpus,
+        'cgroup_limit': cgroup_cpu_limit(),
+        'workers': workers,
+        'intra_op': int(os.environ.get('TORCH_NUM_THREADS', intra_op)),
+        'inter_op': int(os.environ.get('TORCH_INTEROP_THREADS', 1)),
+        # Só o modo batch tokeniza listas grandes; nos outros o pool do
+        # tokenizer disputaria núcleos com o torch (e avisa após fork)
+        'tokenizers_parallelism': mode == 'batch'
+    }
+
+def configure_inference(mode=None, workers=None):
+    """Aplica o plano ao processo atual e o retorna
+
+    O torch só é ajustado se já tiver sido importado (a API sklearn não
+    carrega o torch só por isso). O inter-op só pode ser definido antes
+    do primeiro trabalho paralelo; se já tiver sido, o valor atual fica.
+    """
+    plan = thread_plan(mode, workers)
+    os.environ.setdefault('TOKENIZERS_PARALLELISM', 'true' if plan['tokenizers_parallelism'] else 'false')
+
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=plan['intra_op'])
+    except ImportError:
+        pass
+
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        torch.set_num_threads(plan['intra_op'])
+        try:
+            torch.set_num_interop_threads(plan['inter_op'])
+        except RuntimeError:
+            plan['inter_op'] = torch.get_num_interop_threads()
+    return plan
+
+def describe(plan):
+    return (f"{plan['mode']}: {plan['intra_op']} thread(s) intra-op, {plan['inter_op']} inter-op, "
+            f"{plan['workers']} worker(s), {plan['cpus']} CPU(s) disponíveis")
+
+# --- Auto-tune ---
+_predict = None
+_unit_size = 1
+
+def _init_tune_worker(mode, intra_op, inter_op, ready):
+    """Processo novo com o candidato aplicado antes de carregar o app
+
+    Espera na barreira `ready` ao final, para a medida começar só com todos
+    os processos carregados e aquecidos. Erros de carga são reportados por
+    _run_shard (exceção no initializer faz o Pool recriar o processo sem fim).
+    """
+    global _predict, _unit_size
+    os.environ['TORCH_NUM_THREADS'] = str(intra_op)
+    os.environ['TORCH_INTEROP_THREADS'] = str(inter_op)
+    os.environ['INFERENCE_MODE'] = 'batch' if mode == 'batch' else 'single'
+    os.environ.pop('TOKENIZERS_PARALLELISM', None)
+
+    try:
+        import app_space_version as app
+        if hasattr(app, 'model_scheduler'):
+            if mode == 'batch':
+                _predict, _unit_size = app.predict_hate_speech_batch, BATCH_SIZE
+            else:
+                _predict = lambda texts: [app.predict_hate_speech(text) for text in texts]
+            _predict(["aquecimento do modelo"] * WARMUP)
+    except Exception:
+        _predict = None
+    finally:
+        ready.wait()
+
+def _run_shard(texts):
+    """Latência por unidade (texto ou lote) de um shard no processo atual"""
+    if _predict is None:
+        raise RuntimeError("modelos não carregados (app em modo fallback)")
+    latencies = []
+    for start in range(0, len(texts), _unit_size):
+        begin = time.perf_counter()
+        _predict(texts[start:start + _unit_size])
+        latencies.append(time.perf_counter() - begin)
+    return latencies
+
+def candidate_settings(mode, cpus, workers):
+    """(intra-op, inter-op) testados: potências de 2 até o limite do modo + o plano"""
+    limit = cpus if mode != 'multi_worker' else max(1, cpus // workers) * 2
+    intra = {1, limit, thread_plan(mode, workers, cpus)['intra_op']}
+    value = 2
+    while value < limit:
+        intra.add(value)
+        value *= 2
+    inter = (1, 2) if cpus >= 4 else (1,)
+    return [(intra_op, inter_op) for intra_op in sorted(intra) for inter_op in inter]
+
+def autotune(texts, mode='single', workers=None):
+    """Mede cada candidato em processos novos e escolhe o de maior vazão"""
+    import numpy as np
+
+    cpus = available_cpus()
+    workers = workers or (min(4, cpus) if mode == 'multi_worker' else 1)
+    processes = workers if mode == 'multi_worker' else 1
+    shards = [texts[i::processes] for i in range(processes)]
+    context = mp.get_context('spawn')
+
+    print(f"🧪 AUTO-TUNE DE THREADS ({mode}, {len(texts):,} textos, {processes} processo(s), {cpus} CPU(s))")
+    print("=" * 60)
+    results = []
+    for intra_op, inter_op in candidate_settings(mode, cpus, workers):
+        ready = context.Barrier(processes + 1)
+        with context.Pool(processes, initializer=_init_tune_worker, initargs=(mode, intra_op, inter_op, ready)) as pool:
+            ready.wait()
+            start = time.perf_counter()
+            latencies = [latency for shard in pool.map(_run_shard, shards) for latency in shard]
+            elapsed = time.perf_counter() - start
+        result = {
+            'intra_op': intra_op,
+            'inter_op': inter_op,
+            'oversubscribed': intra_op * processes > cpus,
+            'seconds': elapsed,
+            'texts_per_second': len(texts) / max(elapsed, 1e-9),
+            'p50_ms': float(np.percentile(latencies, 50) * 1000),
+            'p95_ms': float(np.percentile(latencies, 95) * 1000)
+        }
+        results.append(result)
+        flag = " ⚠️ sobreinscrito" if result['oversubscribed'] else ""
+        print(f"   - intra {intra_op:2d} / inter {inter_op}: {result['texts_per_second']:8.1f} textos/s | "
+              f"p50 {result['p50_ms']:7.1f} ms | p95 {result['p95_ms']:7.1f} ms{flag}")
+
+    # Modo single prioriza a latência; os demais, a vazão
+    if mode == 'single':
+        best = min(results, key=lambda result: result['p50_ms'])
+    else:
+        best = max(results, key=lambda result: result['texts_per_second'])
+    print(f"\n🏆 Melhor: INFERENCE_MODE={mode} TORCH_NUM_THREADS={best['intra_op']} "
+          f"TORCH_INTEROP_THREADS={best['inter_op']}"
+          + (f" INFERENCE_WORKERS={workers}" if mode == 'multi_worker' else ""))
+    return {'mode': mode, 'cpus': cpus, 'workers': workers, 'results': results, 'best': best}
+
+def main():
+    parser = argparse.ArgumentParser(description='Configuração de threads para inferência em CPU')
+    parser.add_argument('--mode', choices=MODES, default=DEFAULT_MODE, help='Modo de implantação')
+    parser.add_argument('--workers', type=int, help='Processos/threads concorrentes (multi_worker)')
+    parser.add_argument('--autotune', action='store_true', help='Medir candidatos e recomendar o melhor')
+    parser.add_argument('--samples', type=int, default=AUTOTUNE_SAMPLES, help='Textos do auto-tune')
+    parser.add_argument('--input', help='CSV alternativo ao dataset das três plataformas')
+    parser.add_argument('--column', default='text', help='Coluna de texto do CSV alternativo')
+    parser.add_argument('--sep', default=',', help='Separador do CSV alternativo')
+    args = parser.parse_args()
+
+    if not args.autotune:
+        print(f"🧵 CPUs: {available_cpus()} (afinidade {len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()}, "
+              f"cgroup {cgroup_cpu_limit() or 'sem limite'})")
+        for mode in MODES:
+            print(f"   - {describe(thread_plan(mode, args.workers if mode == 'multi_worker' else None))}")
+        return
+
+    from benchmark_inference import load_texts
+    from run_manifest import register_artifact
+
+    dataset, texts = load_texts(args.input, args.column, args.sep, args.samples)
+    try:
+        report = autotune(texts, args.mode, args.workers)
+    except RuntimeError as e:
+        print(f"❌ Auto-tune interrompido: {e}")
+        exit(1)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs('out', exist_ok=True)
+    report_file = f"out/autotune_threads_{args.mode}_{timestamp}.json"
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({'timestamp': timestamp, 'dataset': dataset, 'samples': len(texts), **report},
+                  f, indent=2, ensure_ascii=False)
+    register_artifact(report_file, f"autotune_threads_{args.mode}", run=timestamp, dataset=dataset,
+                      row_count=len(texts))
+    print(f"💾 Auto-tune salvo: {report_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Normalização de texto unificada para todos os modelos do projeto
+Implementação única com padrões pré-compilados e um perfil por modelo,
+reproduzindo exatamente a normalização usada no treino de cada um
+"""
+
+import re
+import pandas as pd
+
+# --- Perfis disponíveis ---
+# 'space':    modelos BERT do Space (app_space_version.py) - minúsculas,
+#             placeholders [URL]/[MENTION]/[HASHTAG] e remoção de pontuação
+# 'sklearn':  pipeline joblib do HateSpeechDetector - mantém caixa, remove
+#             URLs/menções/hashtags e troca caracteres especiais por espaço
+# 'ensemble': EnsembleSystem (apply_ensemble_to_clean_base.py) - mantém caixa,
+#             placeholders e limite de 1.000 caracteres
+PROFILES = ('space', 'sklearn', 'ensemble')
+
+ENSEMBLE_MAX_CHARS = 1000
+
+# --- Padrões pré-compilados ---
+_SPACE_URL = r'http\S+|www\S+|https\S+'
+_FULL_URL = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
+
+# Perfil 'space': passada única para URL, menção e hashtag. Menções e
+# hashtags param antes de uma URL (que tem prioridade nas passadas
+# originais), mantendo a saída idêntica à das passadas sequenciais.
+_SPACE_PATTERN = re.compile(
+    rf'(?P<url>{_SPACE_URL})'
+    rf'|(?P<mention>@(?:(?!{_SPACE_URL})\w)+)'
+    rf'|(?P<hashtag>#(?:(?!{_SPACE_URL})\w)+)'
+)
+_SPACE_PUNCT = re.compile(r'[^\w\s\[\]]+')
+_SPACE_REPLACEMENTS = {
+    'url': '[URL]',
+    'mention': '[MENTION]',
+    'hashtag': '[HASHTAG]'
+}
+
+# Perfil 'ensemble': passada única para URL, menção e hashtag
+_ENSEMBLE_PATTERN = re.compile(
+    rf'(?P<url>{_FULL_URL})'
+    rf'|(?P<mention>@(?:(?!{_FULL_URL})\w)+)'
+    rf'|(?P<hashtag>#(?:(?!{_FULL_URL})\w)+)'
+)
+_ENSEMBLE_REPLACEMENTS = {
+    'url': '[URL]',
+    'mention': '[MENTION]',
+    'hashtag': '[HASHTAG]'
+}
+
+# Perfil 'sklearn': a remoção de URL (substituição vazia) pode unir menções
+# ao texto seguinte, então ela fica numa passada própria; o resto é combinado
+_SKLEARN_URL = re.compile(_FULL_URL)
+_SKLEARN_PATTERN = re.compile(
+    r'(?P<mention>@\w+)'
+    r'|(?P<hashtag>#\w+)'
+    r'|(?P<special>[^\w\s\.\,\!\?\;\:\-\(\)@#]+|[@#])'
+)
+_SKLEARN_REPLACEMENTS = {
+    'mention': '',
+    'hashtag': '',
+    'special': ' '
+}
+
+# Caminho rápido: sem menção/hashtag basta uma substituição simples
+_SKLEARN_SPECIAL = re.compile(r'[^\w\s\.\,\!\?\;\:\-\(\)]+')
+
+def _has_markers(text):
+    """Indica se o texto pode conter URL, menção ou hashtag"""
+    return '@' in text or '#' in text or 'http' in text or 'www' in text
+
+def _replacer(replacements):
+    """Cria função de substituição baseada no grupo que casou"""
+    def replace(match):
+        return replacements[match.lastgroup]
+    return replace
+
+_space_sub = _SPACE_PATTERN.sub
+_space_punct_sub = _SPACE_PUNCT.sub
+_sklearn_special_sub = _SKLEARN_SPECIAL.sub
+_ensemble_sub = _ENSEMBLE_PATTERN.sub
+_sklearn_url_sub = _SKLEARN_URL.sub
+_sklearn_sub = _SKLEARN_PATTERN.sub
+_space_repl = _replacer(_SPACE_REPLACEMENTS)
+_ensemble_repl = _replacer(_ENSEMBLE_REPLACEMENTS)
+_sklearn_repl = _replacer(_SKLEARN_REPLACEMENTS)
+
+# --- Normalização por perfil ---
+def normalize_space(text):
+    """Normalização dos modelos BERT do Space"""
+    text = str(text).lower()
+    if _has_markers(text):
+        text = _space_sub(_space_repl, text)
+    text = _space_punct_sub('', text)
+    # Equivalente a re.sub(r"\s+", " ", text).strip()
+    return " ".join(text.split())
+
+def normalize_sklearn(text):
+    """Normalização do pipeline sklearn (HateSpeechDetector)"""
+    if pd.isna(text) or text == "":
+        return ""
+
+    text = str(text).strip()
+    if 'http' in text:
+        text = _sklearn_url_sub('', text)
+    if '@' in text or '#' in text:
+        text = _sklearn_sub(_sklearn_repl, text)
+    else:
+        text = _sklearn_special_sub(' ', text)
+    return " ".join(text.split())
+
+def normalize_ensemble(text):
+    """Normalização do EnsembleSystem (placeholders + limite de tamanho)"""
+    if not isinstance(text, str) or pd.isna(text):
+        return ""
+
+    if _has_markers(text):
+        text = _ensemble_sub(_ensemble_repl, text)
+    text = " ".join(text.split())
+    if len(text) > ENSEMBLE_MAX_CHARS:
+        text = text[:ENSEMBLE_MAX_CHARS] + "..."
+    return text
+
+_NORMALIZERS = {
+    'space': normalize_space,
+    'sklearn': normalize_sklearn,
+    'ensemble': normalize_ensemble
+}
+
+def get_normalizer(profile='space'):
+    """Retorna a função de normalização de um perfil"""
+    try:
+        return _NORMALIZERS[profile]
+    except KeyError:
+        raise ValueError(f"Perfil de normalização desconhecido: {profile} (disponíveis: {', '.join(PROFILES)})")
+
+def normalize_text(text, profile='space'):
+    """Normaliza um texto segundo o perfil do modelo"""
+    return get_normalizer(profile)(text)
+
+def normalize_many(texts, profile='space'):
+    """Normaliza uma coleção de textos (lista, Series ou iterável)"""
+    normalize = get_normalizer(profile)
+    return [normalize(text) for text in texts]
@@ -5,124 +5,11 @@ Binário + Especializado com dados expandidos
 """
 
 import pandas as pd
-import numpy as np
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import joblib
 import json
 from datetime import datetime
 import os
-
-def normalize_text(text):
-    """Normalizar texto: URLs, menções, hashtags para placeholders"""
-    import re
-    
-    # Verificar se é string válida
-    if not isinstance(text, str) or pd.isna(text):
-        return ""
-    
-    # URLs
-    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '[URL]', text)
-    
-    # Menções
-    text = re.sub(r'@\w+', '[MENTION]', text)
-    
-    # Hashtags
-    text = re.sub(r'#\w+', '[HASHTAG]', text)
-    
-    # Múltiplos espaços
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Limitar tamanho máximo
-    text = text.strip()
-    if len(text) > 1000:
-        text = text[:1000] + "..."
-    
-    return text
-
-class EnsembleSystem:
-    def __init__(self, binary_model_dir, specialized_model_dir):
-        """Inicializar sistema ensemble"""
-        self.binary_model_dir = binary_model_dir
-        self.specialized_model_dir = specialized_model_dir
-        
-        # Carregar modelo binário
-        print("🔄 Carregando modelo binário...")
-        self.binary_tokenizer = AutoTokenizer.from_pretrained(binary_model_dir)
-        self.binary_model = AutoModelForSequenceClassification.from_pretrained(binary_model_dir)
-        self.binary_model.eval()
-        
-        # Carregar modelo especializado
-        print("🔄 Carregando modelo especializado...")
-        self.specialized_tokenizer = AutoTokenizer.from_pretrained(specialized_model_dir)
-        self.specialized_model = AutoModelForSequenceClassification.from_pretrained(specialized_model_dir)
-        self.specialized_model.eval()
-        
-        # Carregar label encoder
-        self.label_encoder = joblib.load(os.path.join(specialized_model_dir, 'label_encoder.pkl'))
-        
-        print("✅ Sistema ensemble carregado!")
-    
-    def predict_ensemble(self, text):
-        """Predição completa do sistema ensemble"""
-        # Normalizar texto
-        normalized_text = normalize_text(text)
-        
-        # 1º: Predição binária
-        binary_inputs = self.binary_tokenizer(
-            normalized_text,
-            return_tensors="pt",
-            truncation=True,
-            padding=True,
-            max_length=256
-        )
-        
-        with torch.no_grad():
-            binary_outputs = self.binary_model(**binary_inputs)
-            binary_probs = torch.softmax(binary_outputs.logits, dim=-1)
-            binary_pred = torch.argmax(binary_probs, dim=-1).item()
-            binary_confidence = binary_probs[0][binary_pred].item()
-        
-        # Se não é hate, retornar resultado
-        if binary_pred == 0:  # não-hate
-            return {
-                'text': text,
-                'is_hate': False,
-                'binary_confidence': binary_confidence,
-                'specialized_class': None,
-                'specialized_confidence': None,
-                'ensemble_confidence': binary_confidence
-            }
-        
-        # 2º: Predição especializada (apenas se é hate)
-        specialized_inputs = self.specialized_tokenizer(
-            normalized_text,
-            return_tensors="pt",
-            truncation=True,
-            padding=True,
-            max_length=256
-        )
-        
-        with torch.no_grad():
-            specialized_outputs = self.specialized_model(**specialized_inputs)
-            specialized_probs = torch.softmax(specialized_outputs.logits, dim=-1)
-            specialized_pred = torch.argmax(specialized_probs, dim=-1).item()
-            specialized_confidence = specialized_probs[0][specialized_pred].item()
-        
-        # Converter predição para nome da classe
-        specialized_class = self.label_encoder.inverse_transform([specialized_pred])[0]
-        
-        # Confiança ensemble (média ponderada)
-        ensemble_confidence = (binary_confidence + specialized_confidence) / 2
-        
-        return {
-            'text': text,
-            'is_hate': True,
-            'binary_confidence': binary_confidence,
-            'specialized_class': specialized_class,
-            'specialized_confidence': specialized_confidence,
-            'ensemble_confidence': ensemble_confidence
-        }
+from apply_ensemble_to_clean_base import EnsembleSystem
+from tokenization_cache import load_or_build_pretokenized
 
 def test_ensemble_system():
     """Testar sistema ensemble completo"""
@@ -159,10 +46,23 @@ def test_ensemble_system():
     print("\n🔍 TESTANDO COM TEXTOS DE EXEMPLO:")
     print("-" * 60)
     
+    # Pré-tokenizar (mesmo artefato e caminho em lotes da base limpa)
+    binary_dataset = load_or_build_pretokenized(
+        test_texts, ensemble.binary_tokenizer, 'ensemble_textos_teste',
+        max_length=256, profile='ensemble'
+    )
+    specialized_dataset = None
+    if not ensemble.scheduler.share_tokenization:
+        specialized_dataset = load_or_build_pretokenized(
+            test_texts, ensemble.specialized_tokenizer, 'ensemble_textos_teste',
+            max_length=256, profile='ensemble'
+        )
+    predictions = ensemble.predict_pretokenized(binary_dataset, specialized_dataset)
+    
     results = []
-    for i, text in enumerate(test_texts, 1):
+    for i, (text, prediction) in enumerate(zip(test_texts, predictions), 1):
         print(f"\n{i}. Texto: '{text}'")
-        result = ensemble.predict_ensemble(text)
+        result = {'text': text, **prediction}
         results.append(result)
         
         print(f"   • É hate: {result['is_hate']}")
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Varredura de limiares e calibração sobre probabilidades já gravadas
+Junta as probabilidades armazenadas (snapshot golden ou análise do
+Instagram) às anotações manuais e calcula precisão/recall/F1 e matriz de
+confusão para milhares de limiares de uma vez (contagens por
+searchsorted nas probabilidades ordenadas), curva de calibração e uma
+tabela de pontos de operação — sem rodar a inferência de novo
+
+Limiares avaliados:
+- THRESHOLD do modelo binário em app_space_version.py (0.05): só muda a
+  decisão das linhas decididas pelo modelo; linhas decididas por regra
+  entram como contagens fixas
+- faixas 0.3/0.7 de apply_validation_logic: sobre as probabilidades do
+  BERT gravadas (linhas decididas pelo modelo)
+- faixas 0.3/0.7 de HateSpeechDetector.predict_single: sobre as
+  probabilidades do pipeline sklearn (score_batch nos textos anotados),
+  que é o modelo que essas faixas classificam
+
+Uso:
+  python threshold_calibration.py
+  python threshold_calibration.py --predictions out/ANALISE_INSTAGRAM_CORRIGIDO_<ts>.csv --steps 10001
+  python threshold_calibration.py --sklearn-model out/modelo_otimizado_<ts>.pkl
+"""
+
+import os
+import json
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from dedup_inference import text_hash
+from golden_corpus import GOLDEN_FILE
+from results_io import read_results
+from run_manifest import latest_artifact, register_artifact
+
+ANNOTATED_FILE = 'clean-annotated-data/Scrapping_insta_annotated_GLOBAL_REVISADO.csv'
+HATE_ANNOTATION = 'odio'
+MODEL_METHOD = 'model_prediction'
+CURRENT_THRESHOLD = 0.05  # THRESHOLD em app_space_version.py
+CURRENT_BANDS = (0.3, 0.7)  # Faixas de predict_single / apply_validation_logic
+SKLEARN_MODEL = 'out/modelo_otimizado_20251010_150123.pkl'  # Pipeline do HateSpeechDetector
+SKLEARN_THRESHOLD = 'out/threshold_info_20251010_150123.json'
+REFERENCE_THRESHOLDS = (0.3, 0.5, 0.7)
+THRESHOLD_STEPS = 2001
+CALIBRATION_BINS = 10
+TARGET = 0.9  # Meta de recall/precisão nos pontos de operação e nas faixas sugeridas
+
+def load_annotations(file_path=ANNOTATED_FILE):
+    """Texto e rótulo verdadeiro por hash do texto (avaliacao == 'odio' é hate)"""
+    df = pd.read_csv(file_path, sep=';', usecols=['Comment Text', 'avaliacao'])
+    df = df.dropna(subset=['Comment Text'])
+    df['text'] = df['Comment Text'].astype(str)
+    df['key'] = [text_hash(text) for text in df['text']]
+    df['true_hate'] = df['avaliacao'].astype(str).str.strip().str.lower() == HATE_ANNOTATION
+    return df.drop_duplicates('key')[['key', 'text', 'true_hate']]
+
+def resolve_predictions(file_path=None):
+    """Snapshot golden (se existir) ou a análise do Instagram mais recente"""
+    if file_path:
+        return file_path
+    if os.path.exists(GOLDEN_FILE):
+        return GOLDEN_FILE
+    return latest_artifact('ANALISE_INSTAGRAM_CORRIGIDO', platform='Instagram')
+
+def load_predictions(file_path):
+    """Probabilidade, decisão e método gravados, com chave pelo hash do texto"""
+    df = read_results(file_path, columns=['text', 'hate_probability', 'method', 'is_hate', 'predicted_label'])
+    df = df.dropna(subset=['text', 'hate_probability'])
+    if 'is_hate' in df.columns:
+        predicted = df['is_hate'].astype(bool)
+    else:
+        df = df[df['predicted_label'].isin(['HATE', 'NÃO-HATE'])]
+        predicted = df['predicted_label'] == 'HATE'
+    return pd.DataFrame({
+        'key': [text_hash(str(text)) for text in df['text']],
+        'hate_probability': df['hate_probability'].astype(float).to_numpy(),
+        'predicted_hate': predicted.to_numpy(),
+        'model_row': (df['method'].astype(str) == MODEL_METHOD).to_numpy() if 'method' in df.columns
+                     else np.ones(len(df), dtype=bool)
+    }).drop_duplicates('key')
+
+# --- Cálculos vetorizados ---
+def sweep(probabilities, labels, thresholds, fixed=(0, 0, 0, 0)):
+    """Matriz de confusão para cada limiar (previsto hate se p >= limiar)
+
+    fixed: contagens (tp, fp, fn, tn) que não dependem do limiar (linhas
+    decididas por regra). Retorna dict de arrays alinhados a thresholds.
+    """
+    labels = np.asarray(labels, dtype=bool)
+    positives = np.sort(probabilities[labels])
+    negatives = np.sort(probabilities[~labels])
+    tp = len(positives) - np.searchsorted(positives, thresholds, side='left')
+    fp = len(negatives) - np.searchsorted(negatives, thresholds, side='left')
+    fn = len(positives) - tp
+    tn = len(negatives) - fp
+
+    fixed_tp, fixed_fp, fixed_fn, fixed_tn = fixed
+    tp, fp, fn, tn = tp + fixed_tp, fp + fixed_fp, fn + fixed_fn, tn + fixed_tn
+    precision = np.divide(tp, tp + fp, out=np.zeros(len(thresholds)), where=(tp + fp) > 0)
+    recall = np.divide(tp, tp + fn, out=np.zeros(len(thresholds)), where=(tp + fn) > 0)
+    f1 = np.divide(2 * precision * recall, precision + recall, out=np.zeros(len(thresholds)),
+                   where=(precision + recall) > 0)
+    npv = np.divide(tn, tn + fn, out=np.zeros(len(thresholds)), where=(tn + fn) > 0)
+    total = tp + fp + fn + tn
+    return {
+        'threshold': thresholds, 'tp': tp, 'fp': fp, 'fn': fn, 'tn': tn,
+        'precision': precision, 'recall': recall, 'f1': f1, 'npv': npv,
+        'accuracy': (tp + tn) / np.maximum(total, 1), 'positive_rate': (tp + fp) / np.maximum(total, 1)
+    }
+
+def calibration_curve(probabilities, labels, bins=CALIBRATION_BINS):
+    """Probabilidade média x taxa real de hate por faixa, ECE e Brier"""
+    labels = np.asarray(labels, dtype=float)
+    edges = np.linspace(0.0, 1.0, bins + 1)
+    index = np.clip(np.digitize(probabilities, edges[1:-1]), 0, bins - 1)
+    counts = np.bincount(index, minlength=bins)
+    mean_probability = np.divide(np.bincount(index, probabilities, minlength=bins), counts,
+                                 out=np.zeros(bins), where=counts > 0)
+    hate_rate = np.divide(np.bincount(index, labels, minlength=bins), counts, out=np.zeros(bins), where=counts > 0)
+    total = max(len(probabilities), 1)
+    return {
+        'bins': [
+            {'low': float(edges[b]), 'high': float(edges[b + 1]), 'count': int(counts[b]),
+             'mean_probability': float(mean_probability[b]), 'hate_rate': float(hate_rate[b])}
+            for b in range(bins)
+        ],
+        'ece': float(np.sum(counts / total * np.abs(mean_probability - hate_rate))),
+        'brier': float(np.mean((probabilities - labels) ** 2)) if len(probabilities) else 0.0
+    }
+
+def _point(curves, index, name):
+    """Linha da tabela de pontos de operação"""
+    point = {'ponto': name}
+    for field in ('threshold', 'precision', 'recall', 'f1', 'accuracy', 'positive_rate'):
+        point[field] = float(curves[field][index])
+    point['confusion_matrix'] = [[int(curves['tn'][index]), int(curves['fp'][index])],
+                                 [int(curves['fn'][index]), int(curves['tp'][index])]]
+    return point
+
+def operating_points(curves, target=TARGET):
+    """Limiar atual, melhor F1, metas de recall/precisão e limiares de referência"""
+    thresholds = curves['threshold']
+    nearest = lambda value: int(np.argmin(np.abs(thresholds - value)))
+    points = [_point(curves, nearest(CURRENT_THRESHOLD), f"atual (THRESHOLD={CURRENT_THRESHOLD})"),
+              _point(curves, int(np.argmax(curves['f1'])), "melhor F1")]
+
+    recall_ok = np.flatnonzero(curves['recall'] >= target)
+    if len(recall_ok):
+        points.append(_point(curves, recall_ok[np.argmax(curves['precision'][recall_ok])],
+                             f"recall ≥ {target:.2f} (máx. precisão)"))
+    precision_ok = np.flatnonzero(curves['precision'] >= target)
+    if len(precision_ok):
+        points.append(_point(curves, precision_ok[np.argmax(curves['recall'][precision_ok])],
+                             f"precisão ≥ {target:.2f} (máx. recall)"))
+    for value in REFERENCE_THRESHOLDS:
+        points.append(_point(curves, nearest(value), f"referência {value}"))
+    return points
+
+def evaluate_bands(probabilities, labels, bands=CURRENT_BANDS, target=TARGET, model_curves=None):
+    """Faixas baixa/alta: ocupação e acerto de cada região + faixas sugeridas pela meta"""
+    labels = np.asarray(labels, dtype=bool)
+    low, high = bands
+    regions = {
+        'baixa': probabilities < low,
+        'média': (probabilities >= low) & (probabilities <= high),
+        'alta': probabilities > high
+    }
+    total = max(len(probabilities), 1)
+    result = {'bands': list(bands), 'regions': {}}
+    for name, mask in regions.items():
+        count = int(mask.sum())
+        result['regions'][name] = {
+            'count': count,
+            'share': count / total,
+            'hate_rate': float(labels[mask].mean()) if count else 0.0
+        }
+
+    # Sugestão: faixa alta = menor limiar com precisão >= meta; baixa = maior limiar com NPV >= meta
+    if model_curves is not None:
+        thresholds = model_curves['threshold']
+        high_ok = np.flatnonzero((model_curves['precision'] >= target) & ((model_curves['tp'] + model_curves['fp']) > 0))
+        low_ok = np.flatnonzero((model_curves['npv'] >= target) & ((model_curves['tn'] + model_curves['fn']) > 0))
+        result['suggested'] = {
+            'low': float(thresholds[low_ok.max()]) if len(low_ok) else None,
+            'high': float(thresholds[high_ok.min()]) if len(high_ok) else None,
+            'target': target
+        }
+    return result
+
+def sklearn_bands(annotations, thresholds, model_path=SKLEARN_MODEL, threshold_path=SKLEARN_THRESHOLD, target=TARGET):
+    """Faixas de predict_single sobre as probabilidades do pipeline sklearn
+
+    Pontua os textos anotados com HateSpeechDetector.score_batch (textos
+    curtos demais não são pontuados e ficam fora). None sem o modelo.
+    """
+    from predict_hate_speech import HateSpeechDetector
+
+    if not model_path or not os.path.exists(model_path):
+        return None
+    detector = HateSpeechDetector(model_path, threshold_path)
+    if detector.model is None:
+        return None
+
+    scores = detector.score_batch(annotations['text'].tolist())
+    scored = scores['scored']
+    probabilities = scores['hate_probability'][scored]
+    labels = annotations['true_hate'].to_numpy(dtype=bool)[scored]
+    curves = sweep(probabilities, labels, thresholds)
+    result = evaluate_bands(probabilities, labels, CURRENT_BANDS, target, curves)
+    result.update({
+        'model': model_path,
+        'threshold': detector.threshold,
+        'rows': int(scored.sum()),
+        'unscored_rows': int((~scored).sum())
+    })
+    return result
+
+# --- Relatório ---
+def calibrate(predictions_file, annotated_file=ANNOTATED_FILE, steps=THRESHOLD_STEPS, target=TARGET,
+              sklearn_model=SKLEARN_MODEL, sklearn_threshold=SKLEARN_THRESHOLD):
+    """Varredura completa; retorna (relatório, tabela da varredura)"""
+    annotations = load_annotations(annotated_file)
+    predictions = load_predictions(predictions_file)
+    data = predictions.merge(annotations[['key', 'true_hate']], on='key', how='inner')
+    if data.empty:
+        raise ValueError("nenhum texto das predições encontrado nas anotações")
+
+    probabilities = data['hate_probability'].to_numpy(dtype=float)
+    labels = data['true_hate'].to_numpy(dtype=bool)
+    model_rows = data['model_row'].to_numpy(dtype=bool)
+    rule_predicted = data['predicted_hate'].to_numpy(dtype=bool)[~model_rows]
+    rule_labels = labels[~model_rows]
+    fixed = (int((rule_predicted & rule_labels).sum()), int((rule_predicted & ~rule_labels).sum()),
+             int((~rule_predicted & rule_labels).sum()), int((~rule_predicted & ~rule_labels).sum()))
+
+    thresholds = np.unique(np.concatenate([
+        np.linspace(0.0, 1.0, steps), [CURRENT_THRESHOLD, *CURRENT_BANDS, *REFERENCE_THRESHOLDS]
+    ]))
+
+    start = time.perf_counter()
+    system_curves = sweep(probabilities[model_rows], labels[model_rows], thresholds, fixed)
+    model_curves = sweep(probabilities[model_rows], labels[model_rows], thresholds)
+    calibration = calibration_curve(probabilities[model_rows], labels[model_rows])
+    bands = evaluate_bands(probabilities[model_rows], labels[model_rows], CURRENT_BANDS, target, model_curves)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    sklearn = sklearn_bands(annotations, thresholds, sklearn_model, sklearn_threshold, target)
+
+    report = {
+        'predictions': predictions_file,
+        'annotations': annotated_file,
+        'rows': len(data),
+        'model_rows': int(model_rows.sum()),
+        'rule_rows': int((~model_rows).sum()),
+        'hate_rate': float(labels.mean()),
+        'thresholds': len(thresholds),
+        'sweep_ms': elapsed_ms,
+        'operating_points': {
+            'sistema': operating_points(system_curves, target),
+            'modelo': operating_points(model_curves, target)
+        },
+        'calibration': calibration,
+        'bands': {'source': 'apply_validation_logic (probabilidade do BERT)', **bands},
+        'sklearn_bands': sklearn and {'source': 'predict_single (probabilidade do sklearn)', **sklearn}
+    }
+    table = pd.DataFrame(system_curves)
+    table.insert(1, 'model_f1', model_curves['f1'])
+    return report, table
+
+def print_report(report):
+    print(f"📊 {report['rows']:,} textos anotados ({report['model_rows']:,} decididos pelo modelo, "
+          f"{report['rule_rows']:,} por regras) | hate real: {report['hate_rate']*100:.1f}%")
+    print(f"⚡ {report['thresholds']:,} limiares avaliados em {report['sweep_ms']:.1f} ms")
+
+    print("\n🎯 PONTOS DE OPERAÇÃO (sistema completo: regras fixas + limiar do modelo):")
+    print(f"   {'ponto':38s} {'limiar':>7s} {'prec.':>6s} {'recall':>6s} {'F1':>6s} {'acur.':>6s}  [[TN FP] [FN TP]]")
+    for point in report['operating_points']['sistema']:
+        print(f"   {point['ponto']:38s} {point['threshold']:7.4f} {point['precision']:6.3f} {point['recall']:6.3f} "
+              f"{point['f1']:6.3f} {point['accuracy']:6.3f}  {point['confusion_matrix']}")
+
+    calibration = report['calibration']
+    print(f"\n📈 CALIBRAÇÃO DO MODELO (ECE {calibration['ece']:.3f} | Brier {calibration['brier']:.3f}):")
+    for bin_info in calibration['bins']:
+        if bin_info['count']:
+            print(f"   - [{bin_info['low']:.1f}, {bin_info['high']:.1f}): {bin_info['count']:6,} textos | "
+                  f"prob. média {bin_info['mean_probability']:.3f} | hate real {bin_info['hate_rate']:.3f}")
+
+    print_bands(report['bands'])
+    if report['sklearn_bands']:
+        sklearn = report['sklearn_bands']
+        print_bands(sklearn)
+        print(f"   ({sklearn['rows']:,} textos anotados pontuados por {sklearn['model']}, "
+              f"{sklearn['unscored_rows']:,} curtos demais)")
+    else:
+        print("\n⚠️  Pipeline sklearn não encontrado: faixas de predict_single não avaliadas")
+
+def print_bands(bands):
+    print(f"\n🎚️  FAIXAS {bands['bands'][0]}/{bands['bands'][1]} — {bands['source']}:")
+    for name, region in bands['regions'].items():
+        print(f"   - {name:5s}: {region['count']:6,} textos ({region['share']*100:5.1f}%) | hate real {region['hate_rate']*100:5.1f}%")
+    suggested = bands.get('suggested')
+    if suggested:
+        print(f"   💡 Faixas para meta de {suggested['target']:.0%}: baixa < {suggested['low']} | alta ≥ {suggested['high']}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Varredura de limiares e calibração sobre probabilidades gravadas')
+    parser.add_argument('--predictions', help='Resultados com text/hate_probability/method (padrão: snapshot golden)')
+    parser.add_argument('--annotations', default=ANNOTATED_FILE, help='CSV anotado (coluna avaliacao)')
+    parser.add_argument('--steps', type=int, default=THRESHOLD_STEPS, help='Limiares na grade de 0 a 1')
+    parser.add_argument('--target', type=float, default=TARGET, help='Meta de precisão/recall')
+    parser.add_argument('--sklearn-model', default=SKLEARN_MODEL, help='Pipeline sklearn das faixas de predict_single')
+    parser.add_argument('--sklearn-threshold', default=SKLEARN_THRESHOLD, help='Threshold do pipeline sklearn')
+    args = parser.parse_args()
+
+    predictions_file = resolve_predictions(args.predictions)
+    if not predictions_file:
+        print("❌ Nenhuma predição gravada encontrada (rode golden_corpus.py snapshot ou analyze_instagram_corrected.py)")
+        exit(1)
+    print(f"📂 Predições: {predictions_file}")
+
+    report, table = calibrate(predictions_file, args.annotations, args.steps, args.target,
+                              args.sklearn_model, args.sklearn_threshold)
+    print_report(report)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    os.makedirs('out', exist_ok=True)
+    report_file = f"out/calibracao_limiares_{timestamp}.json"
+    table_file = f"out/varredura_limiares_{timestamp}.csv"
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    table.to_csv(table_file, index=False, encoding='utf-8')
+    for path, kind in ((report_file, 'calibracao_limiares'), (table_file, 'varredura_limiares')):
+        register_artifact(path, kind, run=timestamp, dataset=predictions_file, row_count=report['rows'])
+    print(f"\n💾 Relatório salvo: {report_file}")
+    print(f"💾 Varredura salva: {table_file}")
+
+if __name__ == "__main__":
+    main()
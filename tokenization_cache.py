@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Cache de tokenização e artefatos de datasets pré-tokenizados
+- Pré-tokenização: grava input_ids de um dataset em arquivo memory-mapped,
+  identificado pelo hash do tokenizer, para que execuções seguintes
+  consumam os tokens direto do disco
+- TokenizationCache: LRU em memória de textos tokenizados (caminho de serving)
+"""
+
+import os
+import json
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import torch
+
+from text_normalization import normalize_many
+
+PRETOKENIZED_DIR = "out/pretokenized"
+BUILD_CHUNK_SIZE = 1000
+
+# --- Identificação do tokenizer ---
+def tokenizer_fingerprint(tokenizer):
+    """Hash estável do tokenizer (vocabulário + configuração)"""
+    digest = hashlib.sha256()
+    digest.update(type(tokenizer).__name__.encode('utf-8'))
+
+    backend = getattr(tokenizer, 'backend_tokenizer', None)
+    if backend is not None:
+        # Tokenizers "fast": serialização completa (vocab, normalizer, pré-tokenizer),
+        # sem truncation/padding, que mudam a cada chamada do tokenizer
+        state = json.loads(backend.to_str())
+        state.pop('truncation', None)
+        state.pop('padding', None)
+        digest.update(json.dumps(state, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    else:
+        vocab = sorted(tokenizer.get_vocab().items())
+        digest.update(json.dumps(vocab, ensure_ascii=False).encode('utf-8'))
+        digest.update(str(getattr(tokenizer, 'do_lower_case', None)).encode('utf-8'))
+
+    return digest.hexdigest()[:16]
+
+def artifact_key(tokenizer, max_length, profile):
+    """Chave do artefato: tokenizer + max_length + perfil de normalização"""
+    return f"{tokenizer_fingerprint(tokenizer)}_L{max_length}_{profile}"
+
+def texts_fingerprint(texts):
+    """Hash do conteúdo dos textos (detecta artefato desatualizado)"""
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(str(text).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:16]
+
+def _ids_dtype(tokenizer):
+    """Menor dtype inteiro que comporta o vocabulário"""
+    return np.uint16 if len(tokenizer) <= np.iinfo(np.uint16).max else np.int32
+
+# --- Dataset pré-tokenizado ---
+class PretokenizedDataset:
+    """Dataset pré-tokenizado lido via memory-map
+
+    Os tokens ficam concatenados em input_ids.bin e offsets.bin marca o início
+    de cada texto. A attention mask de cada texto é 1 em todos os seus tokens,
+    então ela é reconstruída a partir dos offsets ao montar os lotes (com
+    padding dinâmico até o maior texto do lote, não até max_length).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+
+        if self.meta['num_tokens'] > 0:
+            self.ids = np.memmap(os.path.join(path, 'input_ids.bin'), dtype=self.meta['dtype'], mode='r')
+        else:
+            self.ids = np.zeros(0, dtype=self.meta['dtype'])
+        self.offsets = np.memmap(os.path.join(path, 'offsets.bin'), dtype=np.int64, mode='r')
+        self.pad_token_id = self.meta['pad_token_id']
+        self.with_token_type_ids = 'token_type_ids' in self.meta['model_input_names']
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def lengths(self):
+        """Número de tokens de cada texto"""
+        return np.diff(self.offsets)
+
+    def get_ids(self, index):
+        """input_ids de um texto (view sobre o memory-map)"""
+        return self.ids[self.offsets[index]:self.offsets[index + 1]]
+
+    def get_batch(self, indices):
+        """Monta lote com input_ids/attention_mask/token_type_ids em tensores"""
+        rows = [self.get_ids(i) for i in indices]
+        width = max((len(r) for r in rows), default=0)
+
+        input_ids = np.full((len(rows), width), self.pad_token_id, dtype=np.int64)
+        attention_mask = np.zeros((len(rows), width), dtype=np.int64)
+        for j, row in enumerate(rows):
+            input_ids[j, :len(row)] = row
+            attention_mask[j, :len(row)] = 1
+
+        batch = {
+            'input_ids': torch.from_numpy(input_ids),
+            'attention_mask': torch.from_numpy(attention_mask)
+        }
+        if self.with_token_type_ids:
+            batch['token_type_ids'] = torch.zeros_like(batch['input_ids'])
+        return batch
+
+    def iter_batches(self, batch_size=32, indices=None):
+        """Itera (índices, lote) na ordem original do dataset (ou só nos índices dados)"""
+        indices = list(range(len(self))) if indices is None else list(indices)
+        for start in range(0, len(indices), batch_size):
+            batch_indices = indices[start:start + batch_size]
+            yield batch_indices, self.get_batch(batch_indices)
+
+def pretokenize_dataset(texts, tokenizer, output_dir, max_length=512, profile='space', source=None):
+    """Normaliza, tokeniza em lotes e grava o dataset em arquivos memory-mapped"""
+    os.makedirs(output_dir, exist_ok=True)
+    dtype = _ids_dtype(tokenizer)
+    texts = list(texts)
+
+    ids_path = os.path.join(output_dir, 'input_ids.bin')
+    offsets = [0]
+
+    # Escrita incremental: memória limitada ao tamanho de um bloco
+    with open(ids_path, 'wb') as ids_file:
+        for start in range(0, len(texts), BUILD_CHUNK_SIZE):
+            chunk = normalize_many(texts[start:start + BUILD_CHUNK_SIZE], profile)
+            encoded = tokenizer(chunk, truncation=True, max_length=max_length)
+            for ids in encoded['input_ids']:
+                np.asarray(ids, dtype=dtype).tofile(ids_file)
+                offsets.append(offsets[-1] + len(ids))
+
+    np.asarray(offsets, dtype=np.int64).tofile(os.path.join(output_dir, 'offsets.bin'))
+
+    meta = {
+        'tokenizer_fingerprint': tokenizer_fingerprint(tokenizer),
+        'tokenizer_class': type(tokenizer).__name__,
+        'max_length': max_length,
+        'profile': profile,
+        'dtype': np.dtype(dtype).name,
+        'pad_token_id': tokenizer.pad_token_id or 0,
+        'model_input_names': list(tokenizer.model_input_names),
+        'num_texts': len(texts),
+        'num_tokens': offsets[-1],
+        'texts_fingerprint': texts_fingerprint(texts),
+        'source': source,
+        'created_at': datetime.now().isoformat()
+    }
+    with open(os.path.join(output_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    return PretokenizedDataset(output_dir)
+
+def load_or_build_pretokenized(texts, tokenizer, name, max_length=512, profile='space',
+                               base_dir=PRETOKENIZED_DIR, source=None):
+    """Carrega o artefato do dataset para este tokenizer ou cria se não existir"""
+    path = os.path.join(base_dir, f"{name}_{artifact_key(tokenizer, max_length, profile)}")
+    meta_path = os.path.join(path, 'meta.json')
+
+    texts = list(texts)
+
+    if os.path.exists(meta_path):
+        dataset = PretokenizedDataset(path)
+        if dataset.meta.get('texts_fingerprint') == texts_fingerprint(texts):
+            print(f"♻️  Usando dataset pré-tokenizado: {path}")
+            return dataset
+        print(f"⚠️  Artefato desatualizado para {name}, recriando...")
+
+    print(f"🔄 Pré-tokenizando {len(texts):,} textos em {path}...")
+    return pretokenize_dataset(texts, tokenizer, path, max_length, profile, source)
+
+# --- Cache LRU para serving ---
+class TokenizationCache:
+    """LRU de textos normalizados -> tensores tokenizados"""
+
+    def __init__(self, tokenizer, max_length=512, maxsize=10000):
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, normalized_text):
+        """Tokeniza um texto já normalizado (lote de tamanho 1), usando o cache"""
+        with self._lock:
+            encoded = self._entries.get(normalized_text)
+            if encoded is not None:
+                self._entries.move_to_end(normalized_text)
+                self.hits += 1
+                return encoded
+
+        encoded = self.tokenizer(normalized_text, return_tensors="pt", padding=True,
+                                 truncation=True, max_length=self.max_length)
+
+        with self._lock:
+            self.misses += 1
+            self._entries[normalized_text] = encoded
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return encoded
+
+    def clear(self):
+        """Esvazia o cache e zera os contadores"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Estatísticas de uso do cache"""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+def main():
+    """Pré-tokeniza um CSV pela linha de comando"""
+    import pandas as pd
+    from transformers import AutoTokenizer
+
+    parser = argparse.ArgumentParser(description='Pré-tokenização de datasets')
+    parser.add_argument('--file', required=True, help='CSV com os comentários')
+    parser.add_argument('--column', default='text', help='Coluna de texto')
+    parser.add_argument('--sep', default=',', help='Separador do CSV')
+    parser.add_argument('--tokenizer', default='model-binary-expanded', help='Diretório/ID do tokenizer')
+    parser.add_argument('--max-length', type=int, default=512, help='Comprimento máximo em tokens')
+    parser.add_argument('--profile', default='space', help='Perfil de normalização')
+    parser.add_argument('--name', help='Nome do artefato (padrão: nome do arquivo)')
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.file, sep=args.sep, usecols=[args.column])
+    tokenizer = AutoTokenizer.from_pretrained(args.tokenizer)
+    name = args.name or os.path.splitext(os.path.basename(args.file))[0]
+
+    dataset = load_or_build_pretokenized(df[args.column].tolist(), tokenizer, name,
+                                         args.max_length, args.profile, source=args.file)
+    lengths = dataset.lengths()
+    print(f"✅ Dataset pré-tokenizado: {dataset.path}")
+    print(f"   - Textos: {len(dataset):,}")
+    print(f"   - Tokens: {int(lengths.sum()):,} (média {lengths.mean():.1f} por texto)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Escalonador em dois estágios para o ensemble binário + especializado
+- Estágio 1: modelo binário sobre lotes completos
+- Estágio 2: os casos de hate de vários lotes do estágio 1 são acumulados
+  até formar lotes cheios para o modelo especializado
+Quando os dois tokenizers são idênticos, o estágio 2 reaproveita os tokens
+do estágio 1 em vez de tokenizar o texto de novo
+"""
+
+from collections import deque
+
+import torch
+
+from tokenization_cache import tokenizer_fingerprint
+
+BATCH_SIZE = 32
+SPECIALIZED_BATCH_SIZE = 32
+MAX_WAIT_BATCHES = 8  # Lotes do estágio 1 que um caso de hate pode esperar pelo estágio 2
+
+def argmax_decision(indices, binary_probs):
+    """Decisão padrão do ensemble: classe binária mais provável"""
+    return (torch.argmax(binary_probs, dim=-1) != 0).tolist()
+
+def iter_text_batches(texts, tokenizer, batch_size=BATCH_SIZE, max_length=512):
+    """Tokeniza textos já normalizados em lotes (índices, inputs)"""
+    for start in range(0, len(texts), batch_size):
+        indices = list(range(start, min(start + batch_size, len(texts))))
+        inputs = tokenizer([texts[i] for i in indices], return_tensors="pt",
+                           padding=True, truncation=True, max_length=max_length)
+        yield indices, inputs
+
+class TwoStageScheduler:
+    """Agenda binário e especializado com lotes cheios no estágio 2"""
+
+    def __init__(self, binary_model, specialized_model, binary_tokenizer, specialized_tokenizer,
+                 specialized_batch_size=SPECIALIZED_BATCH_SIZE, max_wait_batches=MAX_WAIT_BATCHES):
+        self.binary_model = binary_model
+        self.specialized_model = specialized_model
+        self.specialized_batch_size = specialized_batch_size
+        self.max_wait_batches = max_wait_batches
+
+        self.share_tokenization = tokenizer_fingerprint(binary_tokenizer) == tokenizer_fingerprint(specialized_tokenizer)
+        self.pad_token_id = specialized_tokenizer.pad_token_id or 0
+        self.with_token_type_ids = 'token_type_ids' in specialized_tokenizer.model_input_names
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Zera os contadores de lotes"""
+        self.stats = {
+            'texts': 0,
+            'binary_batches': 0,
+            'hate_rows': 0,
+            'specialized_batches': 0,
+            'shared_tokenization': self.share_tokenization
+        }
+
+    def get_stats(self):
+        """Contadores + ocupação média dos lotes especializados"""
+        stats = dict(self.stats)
+        capacity = stats['specialized_batches'] * self.specialized_batch_size
+        stats['specialized_batch_fill'] = stats['hate_rows'] / capacity if capacity else 0.0
+        return stats
+
+    def _collate(self, rows):
+        """Monta lote especializado a partir dos tokens do estágio 1"""
+        width = max(len(row) for row in rows)
+        input_ids = torch.full((len(rows), width), self.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(rows), width), dtype=torch.long)
+        for j, row in enumerate(rows):
+            input_ids[j, :len(row)] = row
+            attention_mask[j, :len(row)] = 1
+
+        batch = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if self.with_token_type_ids:
+            batch['token_type_ids'] = torch.zeros_like(input_ids)
+        return batch
+
+    def _run_specialized(self, pending, specialized_inputs, records):
+        """Estágio 2 sobre um lote de casos de hate pendentes"""
+        indices = [index for index, _ in pending]
+        if self.share_tokenization:
+            inputs = self._collate([row for _, row in pending])
+        else:
+            inputs = specialized_inputs(indices)
+
+        with torch.no_grad():
+            outputs = self.specialized_model(**inputs)
+            specialized_probs = torch.softmax(outputs.logits, dim=-1)
+
+        self.stats['specialized_batches'] += 1
+        for k, index in enumerate(indices):
+            records[index]['specialized_probs'] = specialized_probs[k]
+
+    def run(self, binary_batches, specialized_inputs=None, hate_decision=argmax_decision):
+        """Executa os dois estágios e produz os resultados na ordem original
+
+        binary_batches: iterável de (índices, inputs do tokenizer binário)
+        specialized_inputs: função índices -> inputs do tokenizer especializado
+            (só usada quando os tokenizers são diferentes)
+        hate_decision: função (índices, probabilidades binárias) -> lista de bool
+
+        Produz dicts com index, binary_probs, is_hate e specialized_probs
+        (None quando o texto não é hate).
+        """
+        if not self.share_tokenization and specialized_inputs is None:
+            raise ValueError("Tokenizers diferentes: informe specialized_inputs para o estágio 2")
+
+        order = deque()
+        records = {}
+        pending = []
+        waited_batches = 0
+
+        for indices, inputs in binary_batches:
+            # Estágio 1: modelo binário sobre o lote inteiro
+            with torch.no_grad():
+                outputs = self.binary_model(**inputs)
+                binary_probs = torch.softmax(outputs.logits, dim=-1)
+            decisions = hate_decision(indices, binary_probs)
+
+            self.stats['binary_batches'] += 1
+            self.stats['texts'] += len(indices)
+            lengths = inputs['attention_mask'].sum(dim=-1).tolist() if self.share_tokenization else None
+
+            for j, index in enumerate(indices):
+                records[index] = {
+                    'index': index,
+                    'binary_probs': binary_probs[j],
+                    'is_hate': bool(decisions[j]),
+                    'specialized_probs': None
+                }
+                order.append(index)
+                if decisions[j]:
+                    row = inputs['input_ids'][j, :lengths[j]] if self.share_tokenization else None
+                    pending.append((index, row))
+            self.stats['hate_rows'] += sum(1 for decision in decisions if decision)
+
+            # Estágio 2: somente lotes cheios, ou tudo se a espera passou do limite
+            waited_batches = waited_batches + 1 if pending else 0
+            while len(pending) >= self.specialized_batch_size:
+                self._run_specialized(pending[:self.specialized_batch_size], specialized_inputs, records)
+                pending = pending[self.specialized_batch_size:]
+            if pending and waited_batches >= self.max_wait_batches:
+                self._run_specialized(pending, specialized_inputs, records)
+                pending = []
+            if not pending:
+                waited_batches = 0
+
+            # Libera na ordem original tudo que já está completo
+            waiting = {index for index, _ in pending}
+            while order and order[0] not in waiting:
+                yield records.pop(order.popleft())
+
+        if pending:
+            self._run_specialized(pending, specialized_inputs, records)
+        while order:
+            yield records.pop(order.popleft())
+
+    def run_texts(self, texts, binary_tokenizer, specialized_tokenizer=None, batch_size=BATCH_SIZE,
+                  max_length=512, hate_decision=argmax_decision):
+        """Atalho para textos já normalizados (tokenização em lotes)"""
+        def tokenize_specialized(indices):
+            return specialized_tokenizer([texts[i] for i in indices], return_tensors="pt",
+                                         padding=True, truncation=True, max_length=max_length)
+
+        specialized_inputs = None if self.share_tokenization else tokenize_specialized
+        batches = iter_text_batches(texts, binary_tokenizer, batch_size, max_length)
+        return self.run(batches, specialized_inputs, hate_decision)
@@ -6,97 +6,130 @@ Script para atualizar o dataset com dados das três redes sociais (Instagram, Ti
 import pandas as pd
 import os
 from datetime import datetime
+from results_io import write_results
+from run_manifest import latest_artifact, register_artifact
+
+# Carregar dados das três plataformas
+DATASETS = {
+    'Instagram': 'clean-annotated-data/export_1757023553205_limpa.csv',
+    'TikTok': 'clean-annotated-data/tiktok_consolidado_limpo_20251016_181651.csv',
+    'YouTube': 'clean-annotated-data/youtube_limpo_20251016_181656.csv'
+}
+
+# Datasets limpos registrados no manifesto (a versão mais recente substitui o caminho fixo)
+DATASET_KINDS = {
+    'TikTok': 'tiktok_consolidado_limpo',
+    'YouTube': 'youtube_limpo'
+}
+
+# Separador de cada dataset
+SEPARATORS = {
+    'Instagram': ';',
+    'TikTok': ',',
+    'YouTube': ','
+}
+
+# Schema único: coluna do dataset -> coluna de origem em cada plataforma
+PLATFORM_COLUMNS = {
+    'Instagram': {
+        'text': 'Comment Text',
+        'author_handle': 'Author Handle',
+        'like_count': 'Like Count',
+        'timestamp': 'Timestamp'
+    },
+    'TikTok': {
+        'text': 'text',
+        'author_handle': 'author_handle',
+        'like_count': 'like_count_visible',
+        'timestamp': 'timestamp_visible',
+        'video_id': 'video_id'
+    },
+    'YouTube': {
+        'text': 'text',
+        'author_handle': 'autor_handle',
+        'like_count': 'likes_comentario',
+        'timestamp': 'data',
+        'video_title': 'titulo_video'
+    }
+}
+
+DATASET_COLUMNS = [
+    'id', 'text', 'platform', 'source', 'date_collected',
+    'author_handle', 'like_count', 'timestamp', 'video_id', 'video_title'
+]
+
+def resolve_datasets():
+    """Caminho de cada dataset: último arquivo limpo registrado no manifesto ou o fixo"""
+    datasets = dict(DATASETS)
+    for platform, kind in DATASET_KINDS.items():
+        registered = latest_artifact(kind, platform=platform, directory=None, formats=('.csv',))
+        if registered:
+            datasets[platform] = registered
+    return datasets
+
+def load_platform(platform, file_path, date_collected):
+    """Lê só as colunas mapeadas e converte para o schema único (sem laço por linha)"""
+    mapping = PLATFORM_COLUMNS[platform]
+    source_columns = set(mapping.values())
+    df = pd.read_csv(file_path, sep=SEPARATORS[platform], dtype='string',
+                     usecols=lambda column: column in source_columns)
+    if mapping['text'] not in df.columns:
+        raise ValueError(f"coluna '{mapping['text']}' não encontrada")
+
+    # Renomear para o schema e completar as colunas que a plataforma não tem
+    platform_df = df.rename(columns={source: column for column, source in mapping.items()})
+    platform_df = platform_df.reindex(columns=DATASET_COLUMNS)
+    platform_df['id'] = f"{platform.lower()}_" + pd.Series(range(1, len(df) + 1), index=df.index).astype(str)
+    platform_df['platform'] = platform
+    platform_df['source'] = 'clean_annotated_data'
+    platform_df['date_collected'] = date_collected
+    return platform_df.astype('string')
 
 def update_dataset_with_three_platforms():
     """Atualiza o dataset com dados das três redes sociais"""
     
     print("🔄 Atualizando dataset com dados das três redes sociais...")
     
-    # Carregar dados das três plataformas
-    datasets = {
-        'Instagram': 'clean-annotated-data/export_1757023553205_limpa.csv',
-        'TikTok': 'clean-annotated-data/tiktok_consolidado_limpo_20251016_181651.csv',
-        'YouTube': 'clean-annotated-data/youtube_limpo_20251016_181656.csv'
-    }
-    
-    # Colunas de texto para cada dataset
-    text_columns = {
-        'Instagram': 'Comment Text',
-        'TikTok': 'text',
-        'YouTube': 'text'
-    }
-    
+    date_collected = datetime.now().strftime('%Y-%m-%d')
+    datasets = resolve_datasets()
     all_data = []
     
     for platform, file_path in datasets.items():
         print(f"📱 Processando {platform}...")
         
         try:
-            # Carregar dados com separador correto
-            if platform == 'Instagram':
-                df = pd.read_csv(file_path, sep=';')
-            else:
-                df = pd.read_csv(file_path)
-            
-            text_col = text_columns[platform]
-            
-            # Preparar dados para o dataset
-            for idx, row in df.iterrows():
-                text = str(row[text_col])
-                
-                # Criar entrada do dataset
-                entry = {
-                    'id': f"{platform.lower()}_{idx+1}",
-                    'text': text,
-                    'platform': platform,
-                    'source': 'clean_annotated_data',
-                    'date_collected': datetime.now().strftime('%Y-%m-%d')
-                }
-                
-                # Adicionar colunas específicas de cada plataforma
-                if platform == 'Instagram':
-                    entry.update({
-                        'author_handle': row.get('Author Handle', ''),
-                        'like_count': row.get('Like Count', ''),
-                        'timestamp': row.get('Timestamp', '')
-                    })
-                elif platform == 'TikTok':
-                    entry.update({
-                        'author_handle': row.get('author_handle', ''),
-                        'like_count_visible': row.get('like_count_visible', ''),
-                        'timestamp_visible': row.get('timestamp_visible', ''),
-                        'video_id': row.get('video_id', '')
-                    })
-                elif platform == 'YouTube':
-                    entry.update({
-                        'titulo_video': row.get('titulo_video', ''),
-                        'data': row.get('data', ''),
-                        'likes_comentario': row.get('likes_comentario', ''),
-                        'autor_handle': row.get('autor_handle', '')
-                    })
-                
-                all_data.append(entry)
-            
-            print(f"✅ {platform}: {len(df):,} comentários processados")
+            platform_df = load_platform(platform, file_path, date_collected)
+            all_data.append(platform_df)
+            print(f"✅ {platform}: {len(platform_df):,} comentários processados")
             
         except Exception as e:
             print(f"❌ Erro ao processar {platform}: {str(e)}")
             continue
     
+    if not all_data:
+        print("❌ Nenhum dataset foi processado com sucesso!")
+        return None, None
+    
     # Criar DataFrame consolidado
-    consolidated_df = pd.DataFrame(all_data)
+    consolidated_df = pd.concat(all_data, ignore_index=True)
     
     # Salvar dataset atualizado
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_file = f"datasets/dataset_three_platforms_{timestamp}.csv"
+    parquet_file = f"datasets/dataset_three_platforms_{timestamp}.parquet"
     
     # Criar diretório se não existir
     os.makedirs('datasets', exist_ok=True)
     
     consolidated_df.to_csv(output_file, index=False, encoding='utf-8')
+    write_results(consolidated_df, parquet_file)
+    for path in (output_file, parquet_file):
+        register_artifact(path, 'dataset_three_platforms', run=timestamp,
+                          dataset=','.join(datasets.values()), row_count=len(consolidated_df))
     
     print(f"\n📊 Dataset consolidado criado:")
     print(f"   - Arquivo: {output_file}")
+    print(f"   - Versão Parquet: {parquet_file}")
     print(f"   - Total de comentários: {len(consolidated_df):,}")
     
     # Estatísticas por plataforma
@@ -106,9 +139,11 @@ def update_dataset_with_three_platforms():
         print(f"   - {platform}: {count:,} comentários")
     
     # Salvar também versão limpa (apenas texto e ID)
-    clean_df = consolidated_df[['id', 'text', 'platform']].copy()
+    clean_df = consolidated_df[['id', 'text', 'platform']]
     clean_file = f"datasets/dataset_three_platforms_clean_{timestamp}.csv"
     clean_df.to_csv(clean_file, index=False, encoding='utf-8')
+    register_artifact(clean_file, 'dataset_three_platforms_clean', run=timestamp,
+                      dataset=output_file, row_count=len(clean_df))
     
     print(f"\n📄 Dataset limpo criado: {clean_file}")
     
@@ -125,6 +160,7 @@ def update_dataset_with_three_platforms():
 ## 📁 Arquivos
 
 - `dataset_three_platforms_{timestamp}.csv`: Dataset completo com metadados
+- `dataset_three_platforms_{timestamp}.parquet`: Mesmo dataset em Parquet (colunas tipadas)
 - `dataset_three_platforms_clean_{timestamp}.csv`: Dataset limpo (apenas texto e ID)
 
 ## 🔒 Privacidade
@@ -7,6 +7,15 @@ import os
 import shutil
 from datetime import datetime
 from huggingface_hub import HfApi, Repository
+from run_manifest import latest_artifact
+
+# Resultados mais recentes enviados ao Space (tipo no manifesto, plataforma)
+RESULT_ARTIFACTS = [
+    ("RELATORIO_FINAL_CONSOLIDADO_CORRIGIDO", None),
+    ("ANALISE_INSTAGRAM_CORRIGIDO", "Instagram"),
+    ("ANALISE_TIKTOK_CORRIGIDO", "TikTok"),
+    ("ANALISE_YOUTUBE_CORRIGIDO", "YouTube")
+]
 
 def upload_to_space():
     """Faz upload completo do projeto para o Space"""
@@ -39,6 +48,11 @@ def upload_to_space():
         essential_files = [
             # Aplicação principal
             "app_space_version.py",
+            "text_normalization.py",
+            "tokenization_cache.py",
+            "early_exit_bert.py",
+            "two_stage_scheduler.py",
+            "inference_config.py",
             
             # Modelos
             "model-binary-expanded/",
@@ -55,22 +69,29 @@ def upload_to_space():
             "analyze_all_datasets_corrected.py",
             "analyze_instagram_corrected.py",
             "create_final_report.py",
+            "dedup_inference.py",
+            "results_store.py",
+            "results_io.py",
+            "report_aggregates.py",
+            "run_manifest.py",
             
             # Dados limpos (amostra)
             "clean-annotated-data/",
             
-            # Resultados mais recentes
-            "out/RELATORIO_FINAL_CONSOLIDADO_CORRIGIDO_20251017_152113.csv",
-            "out/ANALISE_INSTAGRAM_CORRIGIDO_20251017_151953.csv",
-            "out/ANALISE_TIKTOK_CORRIGIDO_20251017_151617.csv",
-            "out/ANALISE_YOUTUBE_CORRIGIDO_20251017_151749.csv",
-            
             # Documentação
             "DOCUMENTACAO_COMPLETA_PROJETO.md",
             "DEPLOYMENT_GUIDE.md",
             "INSTALLATION_GUIDE.md"
         ]
         
+        # Resultados mais recentes (consultados no manifesto de execuções)
+        for kind, platform in RESULT_ARTIFACTS:
+            result_file = latest_artifact(kind, platform=platform, formats=(".csv",))
+            if result_file:
+                essential_files.append(result_file)
+            else:
+                print(f"⚠️  Resultado não encontrado no manifesto: {kind}")
+        
         print("📦 Preparando arquivos para upload...")
         
         # Criar diretório temporário para upload
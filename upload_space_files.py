@@ -21,6 +21,11 @@ def upload_space_files():
         # Lista de arquivos para upload
         files_to_upload = [
             "app.py",
+            "text_normalization.py",
+            "tokenization_cache.py",
+            "early_exit_bert.py",
+            "two_stage_scheduler.py",
+            "inference_config.py",
             "README.md", 
             "requirements.txt",
             "model-binary-expanded/",
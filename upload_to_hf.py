@@ -14,6 +14,11 @@ def upload_to_huggingface():
     # Arquivos principais para upload
     files_to_upload = [
         'app_space_version.py',
+        'text_normalization.py',
+        'tokenization_cache.py',
+        'early_exit_bert.py',
+        'two_stage_scheduler.py',
+        'inference_config.py',
         'requirements.txt',
         'README.md'
     ]